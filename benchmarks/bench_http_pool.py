@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+"""Compares per-request connections with the shared connection pool.
+
+Starts local BitBucket stand-in (bitbucket_stub) and sends static check
+results for a number of fake files twice: with plain requests calls
+(a new connection for every request) and with PRFile, that uses the
+shared pooled session.
+
+Usage:
+    python benchmarks/bench_http_pool.py [--files N] [--latency SECONDS]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import requests
+from requests.auth import HTTPBasicAuth
+
+import bitbucket_stub
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import jecket  # noqa: E402
+from jecket import http_pool  # noqa: E402
+
+
+def run_plain(base_url, files):
+    """Old behaviour: requests.get/post with new auth for every call."""
+    url = base_url + '/rest/api/1.0/projects/SLUG/repos/REPO/pull-requests/1/comments'
+    for name in files:
+        headers = {'X-Atlassian-Token': 'no-check'}
+        requests.get(url, params={'path': name}, headers=headers, auth=HTTPBasicAuth('user', 'passwd'))
+        requests.post(url, json={'text': 'x', 'anchor': {'path': name}}, headers=headers,
+                      auth=HTTPBasicAuth('user', 'passwd'))
+
+
+def run_pooled(files):
+    for name in files:
+        pr_file = jecket.PRFile(checked_file=name)
+        pr_file.send_static_check_results({'PMD errors: ': 0})
+
+
+def measure(server, func, *args):
+    server.reset_counters()
+    start = time.time()
+    func(*args)
+    return time.time() - start, server.connections
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--files', type=int, default=200, help='Number of fake checked files.')
+    parser.add_argument('--latency', type=float, default=0.0, help='Server latency per response in seconds.')
+    args = parser.parse_args()
+
+    server = bitbucket_stub.start_server(args.latency)
+    base_url = server.base_link
+    conf = tempfile.NamedTemporaryFile(suffix='.conf', delete=False)
+    conf.write('{0}\nuser\npasswd\n'.format(base_url))
+    conf.close()
+    jecket.PRFile.config = conf.name
+    os.environ.update({'SLUG': 'SLUG', 'PROJECT': 'REPO', 'PR_ID': '1'})
+
+    files = ['src/File{0}.java'.format(i) for i in range(args.files)]
+    try:
+        plain_time, plain_conn = measure(server, run_plain, base_url, files)
+        pooled_time, pooled_conn = measure(server, run_pooled, files)
+    finally:
+        http_pool.close_session()
+        server.shutdown()
+        os.remove(conf.name)
+
+    print('{0:<10} {1:>12} {2:>18}'.format('mode', 'connections', 'per-file ms'))
+    for mode, elapsed, conn in (('plain', plain_time, plain_conn), ('pooled', pooled_time, pooled_conn)):
+        print('{0:<10} {1:>12} {2:>18.3f}'.format(mode, conn, elapsed * 1000.0 / len(files)))
+
+
+if __name__ == '__main__':
+    main()
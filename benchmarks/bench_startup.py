@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+"""Measures bin/jecket startup time.
+
+Runs 'jecket --help' and 'jecket set-status -s' (against a local stand-in
+server) several times in fresh interpreters, prints median and maximum
+wall time, and import time breakdown of one run. Exits with code 1, if
+median is above --threshold-ms, or more than --tolerance above the saved
+baseline.
+
+Usage:
+    python benchmarks/bench_startup.py [--repeat N] [--threshold-ms MS]
+        [--baseline FILE [--save-baseline]] [--top N]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import bitbucket_stub
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+JECKET = os.path.join(ROOT, 'bin', 'jecket')
+
+# Runs script with __import__ wrapper, that records cumulative and self
+# time of every imported module. Python 2 has no '-X importtime'.
+BOOTSTRAP = r'''
+import __builtin__
+import json
+import sys
+import time
+
+original_import = __builtin__.__import__
+cumulative = {}
+self_time = {}
+stack = []
+
+
+def timed_import(name, globals=None, locals=None, fromlist=None, level=-1):
+    if name in sys.modules:
+        return original_import(name, globals, locals, fromlist, level)
+    stack.append(0.0)
+    start = time.time()
+    try:
+        return original_import(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = time.time() - start
+        children = stack.pop()
+        cumulative[name] = cumulative.get(name, 0.0) + elapsed
+        self_time[name] = self_time.get(name, 0.0) + elapsed - children
+        if stack:
+            stack[-1] += elapsed
+
+
+__builtin__.__import__ = timed_import
+script, output = sys.argv[1], sys.argv[2]
+sys.argv = [script] + sys.argv[3:]
+try:
+    execfile(script, {'__name__': '__main__', '__file__': script})
+except SystemExit:
+    pass
+finally:
+    with open(output, 'w') as f:
+        json.dump({'cumulative': cumulative, 'self': self_time}, f)
+'''
+
+
+def run_once(args, env):
+    start = time.time()
+    with open(os.devnull, 'w') as devnull:
+        subprocess.call([sys.executable, JECKET] + args, stdout=devnull, stderr=devnull, env=env)
+    return (time.time() - start) * 1000.0
+
+
+def import_breakdown(args, env):
+    output = tempfile.mktemp(suffix='.json')
+    with open(os.devnull, 'w') as devnull:
+        subprocess.call([sys.executable, '-c', BOOTSTRAP, JECKET, output] + args, stdout=devnull,
+                        stderr=devnull, env=env)
+    with open(output) as f:
+        timings = json.load(f)
+    os.remove(output)
+    return timings
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=10, help='Runs per command.')
+    parser.add_argument('--threshold-ms', type=float, default=None, help='Maximum allowed median in ms.')
+    parser.add_argument('--baseline', type=str, default=None, help='JSON file with baseline medians.')
+    parser.add_argument('--save-baseline', action='store_true', help='Write medians to baseline file.')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown against baseline.')
+    parser.add_argument('--top', type=int, default=10, help='Number of modules in import breakdown.')
+    args = parser.parse_args()
+
+    server = bitbucket_stub.start_server()
+    conf = tempfile.NamedTemporaryFile(suffix='.conf', delete=False)
+    conf.write('base_link: {0}\nusername: user\npassword: passwd\n'.format(server.base_link))
+    conf.close()
+    env = dict(os.environ, PYTHONPATH=ROOT, JECKET_CONFIG=conf.name, GIT_COMMIT='0' * 40)
+
+    commands = [('--help', ['--help']), ('set-status', ['set-status', '-s'])]
+    medians = {}
+    failed = False
+    try:
+        for name, command in commands:
+            times = [run_once(command, env) for _ in range(args.repeat)]
+            medians[name] = median(times)
+            print('{0:<12} median {1:8.1f} ms   max {2:8.1f} ms'.format(name, medians[name], max(times)))
+            timings = import_breakdown(command, env)
+            top = sorted(timings['cumulative'].items(), key=lambda item: -item[1])[:args.top]
+            for module, cumulative in top:
+                print('    {0:<40} {1:8.1f} ms cumulative {2:8.1f} ms self'.format(
+                    module, cumulative * 1000.0, timings['self'][module] * 1000.0))
+            if args.threshold_ms is not None and medians[name] > args.threshold_ms:
+                print('REGRESSION: {0} median is above {1} ms'.format(name, args.threshold_ms))
+                failed = True
+    finally:
+        server.shutdown()
+        os.remove(conf.name)
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(medians, f, indent=2)
+    elif args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for name, value in medians.items():
+            if name in baseline and value > baseline[name] * (1 + args.tolerance):
+                print('REGRESSION: {0} median {1:.1f} ms, baseline {2:.1f} ms'.format(name, value, baseline[name]))
+                failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
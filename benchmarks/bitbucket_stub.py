@@ -0,0 +1,181 @@
+"""Local stand-in for BitBucket REST API endpoints used by jecket.
+
+Implements pull request commits, activities and comments (with paging),
+comment create/update/delete and build status. Every response can be
+delayed by fixed latency, calls and TCP connections are counted.
+"""
+import json
+import re
+import threading
+import time
+import urlparse
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+
+PR_PATH = re.compile(r'^/rest/api/1\.0/projects/[^/]+/repos/[^/]+/pull-requests/[^/]+/(?P<resource>[a-z]+)'
+                     r'(?:/(?P<id>\d+))?/?$')
+STATUS_PATH = re.compile(r'^/rest/build-status/1\.0/commits/(?P<commit>[0-9A-Za-z_]+)$')
+
+
+class BitbucketStub(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, commits=None, page_size=25):
+        """
+        Args:
+            address (tuple): host and port to listen.
+            latency (float): delay of every response in seconds.
+            commits (list of str): pull request commits, newest first.
+            page_size (int): default page size of paged resources.
+        """
+        HTTPServer.__init__(self, address, StubHandler)
+        self.latency = latency
+        self.commits = list(commits or [])
+        self.page_size = page_size
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.calls = {}
+        # comment id -> comment dict with path
+        self.comments = {}
+        self.next_id = 1
+        self.statuses = {}
+
+    @property
+    def base_link(self):
+        return 'http://{0}:{1}'.format(*self.server_address)
+
+    def process_request(self, request, client_address):
+        with self.lock:
+            self.connections += 1
+        ThreadingMixIn.process_request(self, request, client_address)
+
+    def count(self, method, endpoint):
+        with self.lock:
+            key = '{0} {1}'.format(method, endpoint)
+            self.calls[key] = self.calls.get(key, 0) + 1
+
+    def reset_counters(self):
+        with self.lock:
+            self.connections = 0
+            self.calls = {}
+
+    def add_comment(self, path, text, author='jenkins'):
+        with self.lock:
+            comment = {'id': self.next_id, 'version': 0, 'text': text, 'author': {'name': author},
+                       'anchor': {'path': path}}
+            self.comments[self.next_id] = comment
+            self.next_id += 1
+            return comment
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Buffer the whole response and disable Nagle, otherwise keep-alive
+    # connections stall on delayed ACKs.
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, code, body=None):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        data = '' if body is None else json.dumps(body)
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def read_json(self):
+        length = int(self.headers.getheader('Content-Length', 0))
+        data = self.rfile.read(length) if length else ''
+        return json.loads(data) if data else {}
+
+    def parse(self):
+        url = urlparse.urlparse(self.path)
+        query = dict((key, values[-1]) for key, values in urlparse.parse_qs(url.query).items())
+        return url.path, query
+
+    def page(self, values, query):
+        start = int(query.get('start', 0))
+        limit = int(query.get('limit', self.server.page_size))
+        chunk = values[start:start + limit]
+        last = start + limit >= len(values)
+        body = {'values': chunk, 'start': start, 'limit': limit, 'size': len(chunk), 'isLastPage': last}
+        if not last:
+            body['nextPageStart'] = start + limit
+        return body
+
+    def do_GET(self):
+        path, query = self.parse()
+        match = PR_PATH.match(path)
+        if not match:
+            self.server.count('GET', 'unknown')
+            return self.reply(404, {'errors': [{'message': 'Not found.'}]})
+        resource = match.group('resource')
+        self.server.count('GET', resource)
+        with self.server.lock:
+            comments = sorted(self.server.comments.values(), key=lambda comment: -comment['id'])
+        if resource == 'commits':
+            values = [{'id': commit} for commit in self.server.commits]
+        elif resource == 'comments':
+            values = [comment for comment in comments if comment['anchor']['path'] == query.get('path')]
+        elif resource == 'activities':
+            values = [{'action': 'COMMENTED', 'comment': comment, 'commentAnchor': comment['anchor']}
+                      for comment in comments]
+        else:
+            return self.reply(404, {'errors': [{'message': 'Not found.'}]})
+        self.reply(200, self.page(values, query))
+
+    def do_POST(self):
+        path, _ = self.parse()
+        payload = self.read_json()
+        if STATUS_PATH.match(path):
+            self.server.count('POST', 'build-status')
+            self.server.statuses[STATUS_PATH.match(path).group('commit')] = payload
+            return self.reply(204)
+        match = PR_PATH.match(path)
+        if not match or match.group('resource') != 'comments':
+            self.server.count('POST', 'unknown')
+            return self.reply(404, {'errors': [{'message': 'Not found.'}]})
+        self.server.count('POST', 'comments')
+        comment = self.server.add_comment((payload.get('anchor') or {}).get('path'), payload.get('text', ''))
+        self.reply(201, comment)
+
+    def do_PUT(self):
+        path, _ = self.parse()
+        payload = self.read_json()
+        match = PR_PATH.match(path)
+        self.server.count('PUT', match.group('resource') if match else 'unknown')
+        with self.server.lock:
+            comment = self.server.comments.get(int(match.group('id') or 0)) if match else None
+            if comment is None:
+                return self.reply(404, {'errors': [{'message': 'Comment not found.'}]})
+            if payload.get('version') != comment['version']:
+                return self.reply(409, {'errors': [{'message': 'Version mismatch.'}]})
+            comment['text'] = payload.get('text', comment['text'])
+            comment['version'] += 1
+        self.reply(200, comment)
+
+    def do_DELETE(self):
+        path, _ = self.parse()
+        match = PR_PATH.match(path)
+        self.server.count('DELETE', match.group('resource') if match else 'unknown')
+        with self.server.lock:
+            removed = self.server.comments.pop(int(match.group('id') or 0), None) if match else None
+        self.reply(204 if removed else 404)
+
+
+def start_server(latency=0.0, commits=None, page_size=25):
+    """Starts stand-in server in background thread.
+
+    Returns:
+        server (BitbucketStub): running server, call shutdown() to stop.
+    """
+    server = BitbucketStub(('127.0.0.1', 0), latency, commits, page_size)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+"""Fake PMD, Checkstyle, Tailor and golint for benchmarks.
+
+Fakes accept the same arguments as jecket passes to the real tools and
+write reports in the same formats. Every line with VIOLATION marker is
+reported as violation, so results depend on file content only. Startup,
+per-file and per-line cost are simulated with FAKE_LINT_STARTUP,
+FAKE_LINT_PER_FILE and FAKE_LINT_PER_LINE environment variables
+(seconds).
+
+Usage:
+    python benchmarks/fake_linters.py {pmd,checkstyle,tailor,golint} ARGS
+"""
+import json
+import os
+import stat
+import sys
+import time
+from xml.sax.saxutils import quoteattr
+
+MARKER = 'VIOLATION'
+
+
+def violations(path):
+    """Returns line numbers with violation marker."""
+    with open(path) as f:
+        return [number for number, line in enumerate(f, 1) if MARKER in line]
+
+
+def simulate_cost(files):
+    per_line = float(os.environ.get('FAKE_LINT_PER_LINE', 0))
+    lines = sum(sum(1 for _ in open(name)) for name in files if os.path.isfile(name)) if per_line else 0
+    time.sleep(float(os.environ.get('FAKE_LINT_STARTUP', 0.05)) +
+               float(os.environ.get('FAKE_LINT_PER_FILE', 0.001)) * len(files) + per_line * lines)
+
+
+def option(argv, name):
+    return argv[argv.index(name) + 1] if name in argv else None
+
+
+def run_pmd(argv):
+    # pmd -l java --failOnViolation false -f xml -r REPORT (-d FILE | -filelist LIST) -R RULES
+    if '-filelist' in argv:
+        with open(option(argv, '-filelist')) as f:
+            files = [name for name in f.read().split(',') if name]
+    else:
+        files = [option(argv, '-d')]
+    simulate_cost(files)
+    with open(option(argv, '-r'), 'w') as report:
+        report.write('<?xml version="1.0" encoding="UTF-8"?>\n<pmd version="fake">\n')
+        for name in files:
+            lines = violations(name)
+            if not lines:
+                continue
+            report.write('<file name={0}>\n'.format(quoteattr(os.path.abspath(name))))
+            for line in lines:
+                report.write('<violation beginline="{0}" rule="FakeRule" priority="3">'
+                             'Fake violation</violation>\n'.format(line))
+            report.write('</file>\n')
+        report.write('</pmd>\n')
+    return 0
+
+
+def run_checkstyle(argv):
+    # java -jar checkstyle.jar -f xml -o REPORT -c RULES FILES
+    files = argv[argv.index('-c') + 2:]
+    simulate_cost(files)
+    with open(option(argv, '-o'), 'w') as report:
+        report.write('<?xml version="1.0" encoding="UTF-8"?>\n<checkstyle version="fake">\n')
+        for name in files:
+            report.write('<file name={0}>\n'.format(quoteattr(os.path.abspath(name))))
+            for line in violations(name):
+                report.write('<error line="{0}" severity="warning" message="Fake violation" '
+                             'source="com.puppycrawl.tools.checkstyle.checks.FakeCheck"/>\n'.format(line))
+            report.write('</file>\n')
+        report.write('</checkstyle>\n')
+    return 0
+
+
+def run_tailor(argv):
+    # tailor -f json FILES
+    files = argv[argv.index('-f') + 2:]
+    simulate_cost(files)
+    reports = [{'path': name, 'parsed': True,
+                'violations': [{'location': {'line': line}, 'rule': 'fake-rule', 'severity': 'warning',
+                                'message': 'Fake violation'} for line in violations(name)]}
+               for name in files]
+    json.dump({'files': reports, 'summary': {'analyzed': len(files)}}, sys.stdout)
+    return 0
+
+
+def run_golint(argv):
+    # golint -min_confidence 0.1 FILES
+    files = argv[argv.index('-min_confidence') + 2:]
+    simulate_cost(files)
+    for name in files:
+        for line in violations(name):
+            sys.stdout.write('{0}:{1}:1: fake violation\n'.format(name, line))
+    return 0
+
+
+TOOLS = {
+    'pmd': run_pmd,
+    'checkstyle': run_checkstyle,
+    'tailor': run_tailor,
+    'golint': run_golint,
+}
+
+
+def write_script(path, content):
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with open(path, 'w') as f:
+        f.write(content)
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+
+def install(directory):
+    """Installs fakes into directory, that is used as jecket working
+    directory: pmd/bin/run.sh and checkstyle.jar are called with relative
+    paths, java and golint are found in PATH, tailor in TAILOR_BIN.
+
+    Args:
+        directory (str): jecket working directory.
+
+    Returns:
+        env (dict): environment variables for jecket process.
+    """
+    script = os.path.abspath(__file__)
+    bin_dir = os.path.join(directory, '.fake_bin')
+
+    def wrapper(tool):
+        return '#!/bin/sh\nexec "{0}" "{1}" {2} "$@"\n'.format(sys.executable, script, tool)
+
+    # PMD script gets 'pmd' subcommand as the first argument.
+    write_script(os.path.join(directory, 'pmd', 'bin', 'run.sh'),
+                 '#!/bin/sh\nshift\nexec "{0}" "{1}" pmd "$@"\n'.format(sys.executable, script))
+    # 'java -jar checkstyle.jar ...', the jar itself is never read.
+    write_script(os.path.join(bin_dir, 'java'),
+                 '#!/bin/sh\nshift 2\nexec "{0}" "{1}" checkstyle "$@"\n'.format(sys.executable, script))
+    with open(os.path.join(directory, 'checkstyle.jar'), 'w'):
+        pass
+    write_script(os.path.join(bin_dir, 'golint'), wrapper('golint'))
+    write_script(os.path.join(bin_dir, 'tailor'), wrapper('tailor'))
+    return {
+        'PATH': '{0}{1}{2}'.format(bin_dir, os.pathsep, os.environ.get('PATH', '')),
+        'TAILOR_BIN': os.path.join(bin_dir, 'tailor'),
+    }
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] not in TOOLS:
+        sys.stderr.write(__doc__)
+        sys.exit(2)
+    sys.exit(TOOLS[sys.argv[1]](sys.argv[2:]))
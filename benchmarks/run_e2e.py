@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+"""End-to-end benchmark of static_check.check_pr.
+
+For every pull request size generates synthetic repository
+(synthetic_repo), installs fake linters (fake_linters), starts local
+BitBucket stand-in (bitbucket_stub) and runs check_pr in a fresh
+process, so peak RSS of one size does not hide the next. Prints
+throughput, p50/p99 per-file latency, BitBucket API calls and peak RSS
+of jecket process and linter subprocesses.
+
+Per-file latency is time of check_file_isolated (lint and publish), or
+of send_file_results_isolated with --batch, where linter runs once.
+
+Usage:
+    python benchmarks/run_e2e.py [--sizes 10,100,1000,5000] [--ext .java]
+        [--jobs N] [--batch] [--latency SECONDS] [--output FILE]
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import bitbucket_stub
+import fake_linters
+import synthetic_repo
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of values."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, int(round(fraction * len(values) + 0.5)) - 1))]
+
+
+def timed(func, latencies, lock):
+    """Wraps func to append its wall time to latencies."""
+    def wrapper(*args, **kwargs):
+        start = time.time()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.time() - start
+            with lock:
+                latencies.append(elapsed)
+    return wrapper
+
+
+def run_size(workdir, ext, jobs, batch, latency):
+    """Runs check_pr for repository generated in workdir in the current
+    process.
+
+    Returns:
+        report (dict): measurements.
+    """
+    repo = os.path.join(workdir, 'repo')
+    with open(os.path.join(workdir, 'commits.json')) as f:
+        pr_commits = json.load(f)
+    os.environ.update(fake_linters.install(repo))
+    server = bitbucket_stub.start_server(latency=latency, commits=pr_commits)
+    conf = os.path.join(workdir, 'jecket.conf')
+    with open(conf, 'w') as f:
+        f.write('base_link: {0}\nusername: user\npassword: passwd\n'.format(server.base_link))
+    os.environ.update({'JECKET_CONFIG': conf, 'GIT_COMMIT': pr_commits[0], 'SLUG': 'SLUG',
+                       'PROJECT': 'REPO', 'PR_ID': '1'})
+    os.chdir(repo)
+
+    sys.path.insert(0, ROOT)
+    import jecket
+    from jecket import http_pool
+    static_check = jecket.static_check
+
+    latencies = []
+    lock = threading.Lock()
+    static_check.check_file_isolated = timed(static_check.check_file_isolated, latencies, lock)
+    static_check.send_file_results_isolated = timed(static_check.send_file_results_isolated, latencies, lock)
+
+    start = time.time()
+    try:
+        summary = static_check.check_pr(ext, jobs=jobs, batch=batch)
+    finally:
+        elapsed = time.time() - start
+        # Keep-alive connections are closed first, so handler threads of
+        # the server finish before interpreter shutdown.
+        http_pool.close_session()
+        server.shutdown()
+        server.server_close()
+
+    files = summary['checked'] + summary['skipped']
+    # ru_maxrss is in kilobytes on Linux.
+    return {
+        'files': files,
+        'ext': ext,
+        'jobs': jobs,
+        'batch': batch,
+        'latency': latency,
+        'seconds': elapsed,
+        'files_per_second': files / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000.0,
+        'p99_ms': percentile(latencies, 0.99) * 1000.0,
+        'published': summary['published'],
+        'failed': summary['failed'],
+        'api_calls': dict(server.calls),
+        'connections': server.connections,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'children_peak_rss_kb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    }
+
+
+def run_in_subprocess(size, args):
+    """Generates repository in this process, so git processes are not
+    counted in peak RSS of linters, and runs check_pr in a new one.
+    """
+    workdir = tempfile.mkdtemp(prefix='jecket_e2e_')
+    try:
+        pr_commits = synthetic_repo.generate(os.path.join(workdir, 'repo'), size, args.ext, args.commits)
+        with open(os.path.join(workdir, 'commits.json'), 'w') as f:
+            json.dump(pr_commits, f)
+        command = [sys.executable, os.path.abspath(__file__), '--worker', workdir, '--ext', args.ext,
+                   '--jobs', str(args.jobs), '--latency', str(args.latency)]
+        if args.batch:
+            command.append('--batch')
+        output = subprocess.check_output(command)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def print_report(report):
+    print('{files:>6} files  {seconds:8.2f} s  {files_per_second:8.1f} files/s  p50 {p50_ms:8.1f} ms  '
+          'p99 {p99_ms:8.1f} ms  rss {peak_rss_kb:>7} KB  children rss {children_peak_rss_kb:>7} KB  '
+          'connections {connections}  failed {failed}'.format(**report))
+    for call, count in sorted(report['api_calls'].items()):
+        print('{0:>14}  {1:<24} {2}'.format('', call, count))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=str, default='10,100,1000', help='Comma separated pull request sizes.')
+    parser.add_argument('--ext', type=str, default='.java', choices=sorted(synthetic_repo.TEMPLATES))
+    parser.add_argument('--jobs', type=int, default=1, help='static-check --jobs value.')
+    parser.add_argument('--batch', action='store_true', help='static-check --batch mode.')
+    parser.add_argument('--latency', type=float, default=0.0, help='Stand-in server latency in seconds.')
+    parser.add_argument('--commits', type=int, default=5, help='Pull request commits.')
+    parser.add_argument('--output', type=str, default=None, help='Write JSON reports to file.')
+    parser.add_argument('--worker', type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        # jecket logs to stderr, the last stdout line is the report.
+        print(json.dumps(run_size(args.worker, args.ext, args.jobs, args.batch, args.latency)))
+        return
+
+    reports = []
+    for size in [int(size) for size in args.sizes.split(',') if size]:
+        report = run_in_subprocess(size, args)
+        print_report(report)
+        reports.append(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""Generates synthetic git repositories with pull request commits.
+
+Base commit contains untouched files, pull request commits change
+'size' files of the given extension spread over packages. Every changed
+file gets a few VIOLATION marker lines (see fake_linters).
+
+Usage:
+    python benchmarks/synthetic_repo.py DIRECTORY [--files N] [--ext .java]
+"""
+import argparse
+import os
+import random
+import subprocess
+
+TEMPLATES = {
+    '.java': 'package {package};\n\npublic class {name} {{\n{body}}}\n',
+    '.swift': 'import Foundation\n\nclass {name} {{\n{body}}}\n',
+    '.go': 'package {package}\n\n{body}',
+}
+BODY_LINES = {
+    '.java': '    int field{0} = {0};\n',
+    '.swift': '    var field{0} = {0}\n',
+    '.go': 'var field{0} = {0}\n',
+}
+
+
+def git(directory, *args):
+    with open(os.devnull, 'w') as devnull:
+        return subprocess.check_output(('git',) + args, cwd=directory, stderr=devnull).strip()
+
+
+def source(ext, package, name, lines, violations, seed):
+    body = ''.join(BODY_LINES[ext].format(i) for i in range(lines))
+    marks = ''.join('// VIOLATION {0} {1}\n'.format(seed, i) for i in range(violations))
+    return TEMPLATES[ext].format(package=package.replace('/', '.'), name=name, body=marks + body)
+
+
+def write(directory, path, content):
+    full_path = os.path.join(directory, path)
+    if not os.path.isdir(os.path.dirname(full_path)):
+        os.makedirs(os.path.dirname(full_path))
+    with open(full_path, 'w') as f:
+        f.write(content)
+
+
+def generate(directory, size, ext='.java', commits=5, files_per_package=20, lines=40, untouched=50, seed=1):
+    """Creates repository with base commit and pull request commits.
+
+    Args:
+        directory (str): new repository directory.
+        size (int): number of files changed by pull request.
+        ext (str): extension of changed files.
+        commits (int): number of pull request commits, files are spread
+            evenly over them.
+        files_per_package (int): files per directory.
+        lines (int): lines per file.
+        untouched (int): files in base commit, that pull request does not
+            change.
+        seed (int): random seed, the same seed gives the same files.
+
+    Returns:
+        commits (list of str): pull request commits SHA, newest first,
+            as BitBucket returns them.
+    """
+    rng = random.Random(seed)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    git(directory, 'init', '-q')
+    git(directory, 'config', 'user.email', 'bench@example.com')
+    git(directory, 'config', 'user.name', 'bench')
+
+    def path(kind, index):
+        package = 'src/{0}/pkg{1}'.format(kind, index // files_per_package)
+        return package, '{0}/File{1}{2}'.format(package, index, ext)
+
+    for index in range(untouched):
+        package, name = path('base', index)
+        write(directory, name, source(ext, package, 'File{0}'.format(index), lines, 0, seed))
+    write(directory, 'README', 'Synthetic repository.\n')
+    git(directory, 'add', '-A')
+    git(directory, 'commit', '-q', '-m', 'Base')
+
+    pr_commits = []
+    per_commit = max(1, -(-size // max(commits, 1)))
+    for start in range(0, size, per_commit):
+        for index in range(start, min(start + per_commit, size)):
+            package, name = path('pr', index)
+            write(directory, name, source(ext, package, 'File{0}'.format(index), lines, rng.randint(0, 3), seed))
+        git(directory, 'add', '-A')
+        git(directory, 'commit', '-q', '-m', 'Change files {0}-{1}'.format(start, index))
+        pr_commits.append(git(directory, 'rev-parse', 'HEAD'))
+    return list(reversed(pr_commits))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('directory', type=str)
+    parser.add_argument('--files', type=int, default=100, help='Files changed by pull request.')
+    parser.add_argument('--ext', type=str, default='.java', choices=sorted(TEMPLATES))
+    parser.add_argument('--commits', type=int, default=5, help='Pull request commits.')
+    args = parser.parse_args()
+    for commit in generate(args.directory, args.files, args.ext, args.commits):
+        print(commit)
+
+
+if __name__ == '__main__':
+    main()
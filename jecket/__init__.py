@@ -1,9 +1,51 @@
-from jecket import set_conf, set_status, static_check, send_comment
-from jecket.jecket_exceptions import IncorrectJsonException, IncorrectConfigFileException
-from jecket.prfile import PRFile
-from jecket.prcomments import PRCommits, PRState
+import importlib
+import sys
+import types
+
+# Public names and modules, that define them. Submodules are imported on
+# first attribute access, so every bin/jecket command imports only what it
+# uses ('set-conf' does not need requests, for example).
+_lazy_attributes = {
+    'PRFile': 'jecket.prfile',
+    'PRCommits': 'jecket.prcomments',
+    'PRState': 'jecket.prcomments',
+    'PRComments': 'jecket.prcomments',
+    'CommentIndex': 'jecket.prcomments',
+    'IncorrectJsonException': 'jecket.jecket_exceptions',
+    'IncorrectConfigFileException': 'jecket.jecket_exceptions',
+    'GitCommandException': 'jecket.jecket_exceptions',
+}
+_lazy_submodules = ('set_conf', 'set_status', 'static_check', 'send_comment', 'metrics', 'logs', 'batch', 'sharding',
+                    'artifacts', 'publish', 'profiling')
 
 __all__ = [
-    'PRFile', 'PRCommits', 'PRState', 'IncorrectJsonException', 'IncorrectConfigFileException',
-    'set_conf', 'set_status', 'static_check', 'send_comment'
+    'PRFile', 'PRCommits', 'PRState', 'PRComments', 'CommentIndex',
+    'IncorrectJsonException', 'IncorrectConfigFileException', 'GitCommandException',
+    'set_conf', 'set_status', 'static_check', 'send_comment', 'metrics', 'logs', 'batch',
+    'sharding', 'artifacts', 'publish', 'profiling'
 ]
+
+
+class _LazyModule(types.ModuleType):
+    """Package module, that imports submodules on attribute access."""
+
+    def __getattr__(self, name):
+        if name in _lazy_attributes:
+            value = getattr(importlib.import_module(_lazy_attributes[name]), name)
+        elif name in _lazy_submodules:
+            value = importlib.import_module('{0}.{1}'.format(__name__, name))
+        else:
+            raise AttributeError("'module' object has no attribute '{0}'".format(name))
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) | set(__all__))
+
+
+_module = _LazyModule(__name__, __doc__)
+_module.__dict__.update(sys.modules[__name__].__dict__)
+# Python 2 clears globals of a module, when it is garbage collected, keep
+# the original module alive for functions defined here.
+_module._original_module = sys.modules[__name__]
+sys.modules[__name__] = _module
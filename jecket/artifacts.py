@@ -0,0 +1,202 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+
+def error_message(result):
+    """Returns error of static check result: result is (code, error) tuple,
+    or dictionary with error tuple values (one of tools failed). None for
+    complete results.
+    """
+    if type(result) == tuple:
+        return str(result[1])
+    for value in result.values():
+        if type(value) == tuple:
+            return str(value[1])
+    return None
+
+
+class ResultsWriter(object):
+    """
+    This class writes static check results as JSON Lines: header record
+    followed by one record per file, appended as soon as the file is
+    checked. Records are compact and self-contained, so files of several
+    shards or runs can be concatenated and merged.
+
+    Header: {"kind": "header", "version": 1, "mode": "all", "pr" or "file",
+             "commit": ..., "shard": [i, N], "extensions": [...],
+             "created": ...}
+    Result: {"kind": "result", "path": ..., "ext": ..., "results": {...}}
+            or {"kind": "result", "path": ..., "ext": ..., "error": ...}
+    """
+
+    def __init__(self, path, commit=None, shard=None, extensions=(), mode='all'):
+        """
+        Args:
+            path (str): results file, truncated if it exists.
+            commit (str): checked commit.
+            shard (tuple of (index, count)): zero-based shard, None if
+                files are not sharded.
+            extensions (list of str): checked extensions.
+            mode (str): 'all' for project scan, 'pr' for pull request
+                files, 'file' for single file, 'merge' for merged files.
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.records = 0
+        self.errors = 0
+        self.file = open(path, 'w')
+        self._write({'kind': 'header', 'version': FORMAT_VERSION, 'mode': mode, 'commit': commit,
+                     'shard': [shard[0] + 1, shard[1]] if shard is not None else None,
+                     'extensions': list(extensions), 'created': time.time()})
+
+    def _write(self, record):
+        line = json.dumps(record, separators=(',', ':'), sort_keys=True)
+        with self.lock:
+            self.file.write(line + '\n')
+            self.file.flush()
+
+    def write(self, path, ext, result):
+        """Appends result of one file.
+
+        Args:
+            path (str): checked file.
+            ext (str): file extension.
+            result (dict or tuple): results for send_file_results, or
+                (code, error) tuple.
+        """
+        record = {'kind': 'result', 'path': path, 'ext': ext}
+        error = error_message(result)
+        if error is not None:
+            record['error'] = error
+        else:
+            record['results'] = result
+        self._write(record)
+        with self.lock:
+            self.records += 1
+            if error is not None:
+                self.errors += 1
+
+    def close(self):
+        self.file.close()
+        logger.info('Results written to %s: %s files, %s errors.', self.path, self.records, self.errors)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_records(path):
+    """Reads records of results file. Lines, that are not valid JSON (last
+    line of file, that is still written, for example), are skipped.
+
+    Yields:
+        record (dict): header or result record.
+    """
+    with open(path, 'r') as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                logger.warning('Skipping invalid line %s of results file %s.', number, path)
+                continue
+            if isinstance(record, dict):
+                yield record
+
+
+class Results(object):
+    """
+    This class keeps merged results of one or more results files. Later
+    records of a file replace earlier ones, error records never replace
+    results, so merging retried shard with its failed run keeps the
+    successful results.
+    """
+
+    def __init__(self):
+        self.headers = []
+        # path -> result record
+        self.files = OrderedDict()
+
+    def add(self, record):
+        if record.get('kind') == 'header':
+            self.headers.append(record)
+            return
+        if record.get('kind') != 'result' or 'path' not in record:
+            return
+        existing = self.files.get(record['path'])
+        if 'error' in record and existing is not None and 'error' not in existing:
+            return
+        self.files[record['path']] = record
+
+    def load(self, path):
+        for record in read_records(path):
+            self.add(record)
+        return self
+
+    @property
+    def commit(self):
+        """Returns commit of results, None if files were produced for
+        different commits.
+        """
+        commits = set(header.get('commit') for header in self.headers)
+        return commits.pop() if len(commits) == 1 else None
+
+    @property
+    def extensions(self):
+        extensions = set()
+        for header in self.headers:
+            extensions.update(header.get('extensions') or ())
+        extensions.update(record['ext'] for record in self.files.values() if record.get('ext'))
+        return sorted(extensions)
+
+    def file_results(self):
+        """Returns dictionary of file: results for send_file_results, or
+        (-1, error) tuple for files, that could not be checked.
+        """
+        return OrderedDict((path, (-1, record['error']) if 'error' in record else record.get('results') or {})
+                           for path, record in self.files.items())
+
+    def __len__(self):
+        return len(self.files)
+
+
+def load(paths):
+    """Reads and merges results files in order of paths.
+
+    Returns:
+        results (Results): merged results.
+    """
+    results = Results()
+    for path in paths:
+        results.load(path)
+    if len(set(header.get('commit') for header in results.headers)) > 1:
+        logger.warning('Results files were produced for different commits.')
+    return results
+
+
+def merge(paths, output):
+    """Merges results files into one file.
+
+    Args:
+        paths (list of str): results files, later files win.
+        output (str): merged results file.
+
+    Returns:
+        results (Results): merged results.
+    """
+    results = load(paths)
+    with ResultsWriter(output, results.commit, None, results.extensions, 'merge') as writer:
+        for path, record in results.files.items():
+            writer.write(path, record.get('ext'), (-1, record['error']) if 'error' in record else record['results'])
+    return results
@@ -0,0 +1,204 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+import jecket
+from jecket.concurrent_client import ConcurrentClient
+
+
+logger = logging.getLogger(__name__)
+
+STATES = {
+    'successful': 'SUCCESSFUL',
+    'failed': 'FAILED',
+    'in_progress': 'INPROGRESS',
+    'inprogress': 'INPROGRESS',
+}
+
+
+class OperationError(Exception):
+    """Operation line is not valid, it is reported without running."""
+
+
+def build_state(operation):
+    state = STATES.get(str(operation.get('state', '')).lower().replace('-', '_'))
+    if state is None:
+        raise OperationError('state must be one of successful, failed or in_progress.')
+    return state
+
+
+def run_set_status(operation, comment_index):
+    state = build_state(operation)
+    pr = jecket.PRState()
+    pr.git_commit = operation.get('commit') or pr.git_commit
+    return pr.send_build_status(state, operation.get('key', os.environ.get('JOB_NAME', 'Custom BUILD_TAG')),
+                                operation.get('url', os.environ.get('BUILD_URL', 'http://custombuildurl.com')))
+
+
+def run_send_pr_comment(operation, comment_index):
+    return jecket.PRState().send_comment(operation['text'])
+
+
+def run_send_file_results(operation, comment_index):
+    return jecket.PRFile(checked_file=operation['path']).send_static_check_results(operation['results'],
+                                                                                   comment_index)
+
+
+# Operation name: (function, required fields, ordering key). Operations
+# with the same ordering key are run one after another in file order,
+# others run concurrently. 'group' field of operation overrides the key.
+OPERATIONS = {
+    'set-status': (run_set_status, ('state',), lambda operation: ('status', operation.get('commit'))),
+    'send-pr-comment': (run_send_pr_comment, ('text',), lambda operation: ('pr-comment',)),
+    'send-file-results': (run_send_file_results, ('path', 'results'), lambda operation: ('file', operation['path'])),
+}
+
+
+def parse_operations(lines):
+    """Parses JSON Lines operations file.
+
+    Args:
+        lines (iterable of str): file lines, empty lines are skipped.
+
+    Returns:
+        operations (list of dict): operations with 'line' number and 'id'
+            (line number, if missing). Invalid lines get 'error' instead
+            of being run.
+    """
+    operations = []
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            operation = json.loads(line)
+            if not isinstance(operation, dict):
+                raise OperationError('operation must be JSON object.')
+            if operation.get('op') not in OPERATIONS:
+                raise OperationError('unknown op {0!r}, expected one of {1}.'.format(
+                    operation.get('op'), ', '.join(sorted(OPERATIONS))))
+            missing = [field for field in OPERATIONS[operation['op']][1] if field not in operation]
+            if missing:
+                raise OperationError('missing fields: {0}.'.format(', '.join(missing)))
+            if operation['op'] == 'set-status':
+                build_state(operation)
+        except (ValueError, OperationError) as e:
+            operation = {'op': None, 'error': str(e)}
+        operation['line'] = number
+        operation.setdefault('id', number)
+        operations.append(operation)
+    return operations
+
+
+def ordering_key(operation):
+    if 'group' in operation:
+        return 'group', operation['group']
+    return OPERATIONS[operation['op']][2](operation)
+
+
+def run_operation(operation, comment_index):
+    """Runs one operation and turns its result into output record."""
+    start = time.time()
+    try:
+        code, content = OPERATIONS[operation['op']][0](operation, comment_index)
+    except Exception as e:
+        logger.exception('Error occurred while running operation %s.', operation['id'])
+        code, content = -1, e
+    record = {
+        'id': operation['id'],
+        'line': operation['line'],
+        'op': operation['op'],
+        'code': code,
+        'ok': 200 <= code < 300 if isinstance(code, int) else False,
+        'duration': round(time.time() - start, 6),
+    }
+    if not record['ok']:
+        record['error'] = str(content)
+    else:
+        try:
+            record['response'] = json.loads(content) if content else None
+        except (TypeError, ValueError):
+            record['response'] = content
+    return record
+
+
+def run_batch(operations, output, workers=None):
+    """Runs operations over one pooled concurrent client and writes result
+    records to output as JSON Lines, in order of completion.
+
+    Args:
+        operations (list of dict): see parse_operations.
+        output (file): results file.
+        workers (int): number of concurrent operation groups.
+
+    Returns:
+        summary (dict): number of 'ok' and 'failed' operations.
+    """
+    summary = {'ok': 0, 'failed': 0}
+    lock = threading.Lock()
+
+    def write(record):
+        with lock:
+            output.write(json.dumps(record, sort_keys=True) + '\n')
+            output.flush()
+            summary['ok' if record['ok'] else 'failed'] += 1
+
+    groups = {}
+    order = []
+    for operation in operations:
+        if operation['op'] is None:
+            write({'id': operation['id'], 'line': operation['line'], 'op': None, 'code': -1, 'ok': False,
+                   'duration': 0.0, 'error': operation['error']})
+            continue
+        key = ordering_key(operation)
+        if key not in groups:
+            groups[key] = []
+            order.append(key)
+        groups[key].append(operation)
+
+    comment_index = None
+    if any(operation['op'] == 'send-file-results' for operation in operations):
+        try:
+            comment_index = jecket.PRComments().get_comment_index()
+        except Exception:
+            logger.exception('Error occurred while building comment index, comments will be requested per file.')
+
+    def run_group(key):
+        for operation in groups[key]:
+            write(run_operation(operation, comment_index))
+        return 0, None
+
+    logger.info('Running %s operations in %s ordered groups.', sum(len(group) for group in groups.values()),
+                len(order))
+    with ConcurrentClient(workers=workers) as client:
+        client.map(run_group, order)
+    return summary
+
+
+def main(input_path='-', output_path='-', workers=None):
+    """Runs operations file.
+
+    Args:
+        input_path (str): JSON Lines operations file, '-' for stdin.
+        output_path (str): JSON Lines results file, '-' for stdout.
+        workers (int): number of concurrent operation groups.
+
+    Returns:
+        summary (dict): see run_batch.
+    """
+    source = sys.stdin if input_path == '-' else open(input_path, 'r')
+    try:
+        operations = parse_operations(source)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    output = sys.stdout if output_path == '-' else open(output_path, 'w')
+    try:
+        summary = run_batch(operations, output, workers)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    logger.info('Batch finished. Succeeded: %s, failed: %s.', summary['ok'], summary['failed'])
+    return summary
@@ -0,0 +1,84 @@
+import logging
+import os
+import threading
+from multiprocessing.pool import ThreadPool
+
+from jecket import http_pool
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 16
+
+_semaphore = None
+_semaphore_lock = threading.Lock()
+
+
+def get_semaphore():
+    """Returns process-wide semaphore, that limits number of BitBucket
+    requests in flight for all ConcurrentClient instances.
+    """
+    global _semaphore
+    with _semaphore_lock:
+        if _semaphore is None:
+            _semaphore = threading.BoundedSemaphore(
+                int(os.environ.get('JECKET_HTTP_CONCURRENCY', DEFAULT_CONCURRENCY)))
+    return _semaphore
+
+
+class ConcurrentClient(object):
+    """
+    This class runs BitBucket requests of PRFile, PRState, PRCommits and
+    PRComments in background threads. Functions are submitted as is, so
+    results are the same (code, content) tuples as of blocking calls.
+    Number of requests in flight is limited by shared semaphore.
+
+    Python 2 has no asyncio, so requests are run by a thread pool over the
+    shared connection pool instead of an event loop.
+    """
+
+    def __init__(self, workers=None):
+        """
+        Args:
+            workers (int): number of worker threads, JECKET_HTTP_CONCURRENCY
+                by default.
+        """
+        self.workers = workers or int(os.environ.get('JECKET_HTTP_CONCURRENCY', DEFAULT_CONCURRENCY))
+        self.semaphore = get_semaphore()
+        http_pool.ensure_pool_size(self.workers)
+        self.pool = ThreadPool(processes=self.workers)
+
+    def _call(self, func, args):
+        with self.semaphore:
+            try:
+                return func(*args)
+            except Exception as e:
+                logger.exception('Error occurred in concurrent request %s.', func.__name__)
+                return -1, e
+
+    def submit(self, func, *args):
+        """Runs func(*args) in worker thread.
+
+        Returns:
+            result (AsyncResult): exceptions are returned as (-1, error).
+        """
+        return self.pool.apply_async(self._call, (func, args))
+
+    def map(self, func, items):
+        """Calls func for every item concurrently and waits for results.
+
+        Returns:
+            results (list): results in order of items.
+        """
+        return [result.get() for result in [self.submit(func, item) for item in items]]
+
+    def close(self):
+        """Waits for submitted requests and stops worker threads."""
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
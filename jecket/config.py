@@ -0,0 +1,170 @@
+import logging
+import os
+import threading
+
+from jecket.jecket_exceptions import IncorrectConfigFileException
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG_PATH = os.environ.get('JECKET_CONFIG', '/tmp/jecket.conf')
+
+# Config key -> environment variable, that overrides it.
+ENV_OVERRIDES = {
+    'base_link': 'JECKET_BASE_LINK',
+    'username': 'JECKET_USERNAME',
+    'password': 'JECKET_PASSWORD',
+    'slug': 'SLUG',
+    'project': 'PROJECT',
+    'pr_id': 'PR_ID',
+    'git_commit': 'GIT_COMMIT',
+    'pmd_rules': 'PMD_RULES',
+    'checkstyle_rules': 'CHECKSTYLE_RULES',
+}
+
+REQUIRED_KEYS = ('base_link', 'username', 'password')
+
+_configs = {}
+# path -> IncorrectConfigFileException of missing or invalid config.
+_errors = {}
+_configs_lock = threading.Lock()
+
+
+class Config(object):
+    """
+    This class keeps jecket settings. Missing settings are None.
+    """
+
+    def __init__(self, values, path=None):
+        self.path = path
+        self.values = values
+        for key in ENV_OVERRIDES:
+            value = values.get(key)
+            # YAML gives numbers for values like 'pr_id: 12'.
+            setattr(self, key, None if value is None else str(value))
+
+    def get(self, key, default=None):
+        value = self.values.get(key)
+        return default if value is None else value
+
+    def validate(self):
+        """Checks, that settings required for BitBucket requests exist.
+
+        Raises:
+            IncorrectConfigFileException: if settings are missing or wrong.
+        """
+        missing = [key for key in REQUIRED_KEYS if not self.values.get(key)]
+        if missing:
+            raise IncorrectConfigFileException('{0}: missing settings {1}.'.format(self.path, ', '.join(missing)))
+        if not str(self.base_link).startswith(('http://', 'https://')):
+            raise IncorrectConfigFileException('{0}: base_link must start with http:// or https://, got {1}.'
+                                               .format(self.path, self.base_link))
+
+
+def parse_config(content):
+    """Parses config file content.
+
+    YAML mapping is expected. Files created by older jecket versions
+    contain three lines: base link, username and password, they are still
+    supported.
+
+    Args:
+        content (str): config file content.
+
+    Returns:
+        values (dict): settings.
+
+    Raises:
+        IncorrectConfigFileException: if content is neither YAML mapping
+            nor old three lines format.
+    """
+    # yaml takes most of jecket import time, it is imported on first load.
+    import yaml
+
+    try:
+        values = yaml.safe_load(content)
+    except yaml.YAMLError as e:
+        values = None
+        logger.debug('Config is not valid YAML: %s', e)
+    if isinstance(values, dict):
+        return values
+    lines = [line.strip() for line in content.splitlines() if line.strip()]
+    if len(lines) != 3:
+        raise IncorrectConfigFileException('expected YAML mapping or three lines, got: {0!r}'.format(content[:200]))
+    return dict(zip(REQUIRED_KEYS, lines))
+
+
+def load_config(path=DEFAULT_CONFIG_PATH, environ=None):
+    """Reads config file and applies environment variable overrides.
+
+    Args:
+        path (str): config file path.
+        environ (dict): environment, os.environ by default.
+
+    Returns:
+        config (Config): settings.
+
+    Raises:
+        IncorrectConfigFileException: if file is missing or broken.
+    """
+    environ = os.environ if environ is None else environ
+    try:
+        with open(path, 'r') as f:
+            content = f.read()
+    except IOError as e:
+        raise IncorrectConfigFileException('{0}: {1}'.format(path, e))
+    values = parse_config(content)
+    for key, variable in ENV_OVERRIDES.items():
+        if environ.get(variable):
+            values[key] = environ[variable]
+    return Config(values, path)
+
+
+def get_config(path=DEFAULT_CONFIG_PATH, required=True):
+    """Returns config for path, the file is read once per process. Missing
+    or invalid file is remembered as well, so settings lookups of every
+    checked file do not read it again. Call reset to read it again.
+
+    Args:
+        path (str): config file path.
+        required (bool): if False, missing or broken file gives config
+            with environment variables only.
+
+    Returns:
+        config (Config): shared settings.
+
+    Raises:
+        IncorrectConfigFileException: if required config is missing or
+            invalid.
+    """
+    with _configs_lock:
+        if path not in _configs and path not in _errors:
+            try:
+                config = load_config(path)
+                config.validate()
+            except IncorrectConfigFileException as e:
+                logger.debug('Config %s is not available: %s', path, e)
+                _errors[path] = e
+            else:
+                logger.debug('Config %s loaded.', path)
+                _configs[path] = config
+        if path in _configs:
+            return _configs[path]
+        if required:
+            raise _errors[path]
+        fallback = _configs.get((path, 'environment'))
+        if fallback is None:
+            logger.debug('Environment variables are used instead of config %s.', path)
+            fallback = Config(dict((key, os.environ.get(variable)) for key, variable in ENV_OVERRIDES.items()),
+                              path)
+            _configs[(path, 'environment')] = fallback
+        return fallback
+
+
+def reset():
+    """Forgets loaded configs and errors, the next get_config call reads
+    file again.
+    """
+    with _configs_lock:
+        _configs.clear()
+        _errors.clear()
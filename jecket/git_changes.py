@@ -0,0 +1,136 @@
+import logging
+import threading
+from collections import namedtuple
+from subprocess import Popen, PIPE
+
+from jecket.jecket_exceptions import GitCommandException
+from jecket.logs import truncated
+
+
+logger = logging.getLogger(__name__)
+
+NULL_SHA = '0' * 40
+
+# File changed in a pull request:
+#   path (str): relative path to file in repository.
+#   status (str): 'A' (added), 'M' (modified) or 'D' (deleted).
+#   old_sha (str): blob SHA before the pull request, NULL_SHA for added files.
+#   new_sha (str): blob SHA after the pull request, NULL_SHA for deleted files.
+ChangedFile = namedtuple('ChangedFile', ['path', 'status', 'old_sha', 'new_sha'])
+
+
+def parse_raw_records(stream):
+    """Parses 'git diff --raw -z' output without loading it into memory.
+
+    Args:
+        stream (file): stdout of git process.
+
+    Yields:
+        record (tuple of (path, old_sha, new_sha)): one changed path.
+    """
+    buf = ''
+    meta = None
+    while True:
+        chunk = stream.read(65536)
+        if chunk:
+            buf += chunk
+        fields = buf.split('\0')
+        # Last field is incomplete until the stream ends.
+        buf = fields.pop() if chunk else ''
+        for field in fields:
+            if meta is None:
+                if not field:
+                    continue
+                meta = field
+            else:
+                # meta: ':old_mode new_mode old_sha new_sha status'
+                _, _, old_sha, new_sha, _ = meta.lstrip(':').split(' ')
+                meta = None
+                yield field, old_sha, new_sha
+        if not chunk:
+            break
+
+
+def fold_changes(records):
+    """Folds per-commit changes into effective pull request changes.
+
+    Records must come newest commit first, as BitBucket returns commits:
+    the first record of a path holds its final blob, the last one holds
+    the blob before the pull request.
+
+    Args:
+        records (iterable of (path, old_sha, new_sha)): per-commit changes.
+
+    Returns:
+        changes (list of ChangedFile): effective changes, without files,
+            that were added and deleted, or changed and reverted back.
+    """
+    first_new = {}
+    last_old = {}
+    for path, old_sha, new_sha in records:
+        if path not in first_new:
+            first_new[path] = new_sha
+        last_old[path] = old_sha
+
+    changes = []
+    for path in sorted(first_new):
+        old_sha, new_sha = last_old[path], first_new[path]
+        if old_sha == new_sha:
+            continue
+        if old_sha == NULL_SHA:
+            status = 'A'
+        elif new_sha == NULL_SHA:
+            status = 'D'
+        else:
+            status = 'M'
+        changes.append(ChangedFile(path, status, old_sha, new_sha))
+    return changes
+
+
+def _feed(stdin, commit_ids, errors):
+    try:
+        for commit_id in commit_ids:
+            stdin.write('{0}\n'.format(commit_id))
+    except Exception as e:
+        logger.exception('Error occurred while feeding commits to git.')
+        errors.append(e)
+    finally:
+        stdin.close()
+
+
+def changed_files(commit_ids):
+    """Gets effective changed files for commits with one git process.
+
+    All commits are fed to a single 'git diff-tree --stdin' process, so the
+    number of forks does not depend on the number of commits. Commit IDs
+    may be any iterable (for example a generator over API pages), they are
+    written to git while its output is being read.
+
+    Args:
+        commit_ids (iterable of str): commit SHAs, newest first.
+
+    Returns:
+        changes (list of ChangedFile): effective changes.
+
+    Raises:
+        GitCommandException: if git exited with non-zero code.
+        Exception: error raised by commit_ids iterable, changes of
+            partial commit list are not returned.
+    """
+    cmd = ['git', 'diff-tree', '--stdin', '-r', '--raw', '--no-abbrev', '-z', '--no-renames', '--no-commit-id',
+           '--root']
+    logger.debug('Executing command %s', ' '.join(cmd))
+    proc = Popen(cmd, stdin=PIPE, stdout=PIPE)
+    errors = []
+    feeder = threading.Thread(target=_feed, args=(proc.stdin, commit_ids, errors))
+    feeder.daemon = True
+    feeder.start()
+    changes = fold_changes(parse_raw_records(proc.stdout))
+    feeder.join()
+    code = proc.wait()
+    if errors:
+        raise errors[0]
+    if code != 0:
+        raise GitCommandException(cmd, code)
+    logger.debug('Effective changes: %s', truncated(changes))
+    return changes
@@ -0,0 +1,121 @@
+import logging
+import os
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+# Number of per-host connection pools kept by the adapter.
+DEFAULT_POOL_CONNECTIONS = 4
+# Maximum number of connections kept alive for a single host.
+DEFAULT_POOL_MAXSIZE = 10
+
+_session = None
+_session_lock = threading.Lock()
+# Lower bound for pool_maxsize, raised by callers that run concurrent workers.
+_min_pool_maxsize = 0
+
+
+def pool_settings():
+    """Reads connection pool settings from environment variables.
+
+    Returns:
+        settings (dict): pool_connections, pool_maxsize, pool_block and
+            keep_alive values.
+    """
+    return {
+        'pool_connections': int(os.environ.get('JECKET_POOL_CONNECTIONS', DEFAULT_POOL_CONNECTIONS)),
+        'pool_maxsize': max(int(os.environ.get('JECKET_POOL_MAXSIZE', DEFAULT_POOL_MAXSIZE)), _min_pool_maxsize),
+        'pool_block': os.environ.get('JECKET_POOL_BLOCK', 'false').lower() in ('1', 'true', 'yes'),
+        'keep_alive': os.environ.get('JECKET_KEEP_ALIVE', 'true').lower() in ('1', 'true', 'yes'),
+    }
+
+
+def create_session(username, passwd, pool_connections=DEFAULT_POOL_CONNECTIONS,
+                   pool_maxsize=DEFAULT_POOL_MAXSIZE, pool_block=False, keep_alive=True):
+    """Creates requests session with connection pool and basic auth.
+
+    Args:
+        username (str): login for basic auth.
+        passwd (str): password for basic auth.
+        pool_connections (int): number of per-host pools to cache.
+        pool_maxsize (int): maximum number of connections per host.
+        pool_block (bool): if True, requests wait for a free connection
+            instead of opening extra ones above pool_maxsize.
+        keep_alive (bool): if False, every connection is closed after response.
+
+    Returns:
+        session (requests.Session): configured session.
+    """
+    # requests is heavy, it is imported only when first session is created.
+    import requests
+    from requests.adapters import HTTPAdapter
+    from requests.auth import HTTPBasicAuth
+
+    session = requests.Session()
+    session.auth = HTTPBasicAuth(username, passwd)
+    session.headers.update({'X-Atlassian-Token': 'no-check'})
+    if not keep_alive:
+        session.headers.update({'Connection': 'close'})
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    logger.debug('HTTP session created: pool_connections: %s, pool_maxsize: %s, pool_block: %s, keep_alive: %s',
+                 pool_connections, pool_maxsize, pool_block, keep_alive)
+    return session
+
+
+def get_session(username, passwd):
+    """Returns process-wide session, creating it on first call.
+
+    All PRFile instances share this session, so connections to BitBucket
+    are reused between requests and between checked files.
+
+    Args:
+        username (str): login for basic auth.
+        passwd (str): password for basic auth.
+
+    Returns:
+        session (requests.Session): shared session.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_session(username, passwd, **pool_settings())
+        elif _session.auth.username != username or _session.auth.password != passwd:
+            from requests.auth import HTTPBasicAuth
+            _session.auth = HTTPBasicAuth(username, passwd)
+    return _session
+
+
+def ensure_pool_size(workers):
+    """Makes sure the shared pool keeps enough connections for workers.
+
+    If the session already exists and its pool is smaller, new adapters
+    are mounted, so concurrent workers do not discard connections.
+
+    Args:
+        workers (int): number of threads sending requests concurrently.
+    """
+    global _min_pool_maxsize
+    with _session_lock:
+        if workers <= _min_pool_maxsize:
+            return
+        _min_pool_maxsize = workers
+        if _session is not None:
+            from requests.adapters import HTTPAdapter
+            settings = pool_settings()
+            adapter = HTTPAdapter(pool_connections=settings['pool_connections'],
+                                  pool_maxsize=settings['pool_maxsize'], pool_block=settings['pool_block'])
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+            logger.debug('HTTP pool resized to %s connections per host.', settings['pool_maxsize'])
+
+
+def close_session():
+    """Closes shared session and all pooled connections."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
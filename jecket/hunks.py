@@ -0,0 +1,238 @@
+import bisect
+import hashlib
+import logging
+import os
+import re
+from subprocess import Popen, PIPE
+
+from jecket.jecket_exceptions import GitCommandException
+from jecket.reports import LintResult
+
+
+logger = logging.getLogger(__name__)
+
+# Tree of empty repository, base of pull requests, that start with root commit.
+EMPTY_TREE_SHA = '4b825dc642cb6eb9a060e54bf8d69288fbee4904'
+
+HUNK_HEADER = re.compile(r'^@@ -\d+(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+
+
+class LineIndex(object):
+    """
+    This class keeps changed line ranges of one file as sorted disjoint
+    intervals, line lookup is a binary search.
+    """
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self._pending = []
+
+    def add(self, start, end):
+        """Adds inclusive range of changed lines."""
+        self._pending.append((start, end))
+
+    def _merge(self):
+        if not self._pending:
+            return
+        intervals = sorted(zip(self.starts, self.ends) + self._pending)
+        self._pending = []
+        starts, ends = [], []
+        for start, end in intervals:
+            if ends and start <= ends[-1] + 1:
+                ends[-1] = max(ends[-1], end)
+            else:
+                starts.append(start)
+                ends.append(end)
+        self.starts, self.ends = starts, ends
+
+    def __contains__(self, line):
+        self._merge()
+        position = bisect.bisect_right(self.starts, line) - 1
+        return position >= 0 and line <= self.ends[position]
+
+    def __len__(self):
+        self._merge()
+        return len(self.starts)
+
+    def signature(self):
+        """Returns digest of ranges, that is a part of result cache key."""
+        self._merge()
+        return hashlib.sha1(','.join('{0}-{1}'.format(start, end)
+                                     for start, end in zip(self.starts, self.ends))).hexdigest()
+
+
+class HunkIndex(object):
+    """
+    This class keeps changed line ranges of pull request files, built from
+    'git diff -U0' output.
+    """
+
+    def __init__(self):
+        self.files = {}
+        self.hunks = 0
+
+    def add(self, path, start, end):
+        self.files.setdefault(path, LineIndex()).add(start, end)
+        self.hunks += 1
+
+    def touch(self, path):
+        """Registers file without added lines (deletions only)."""
+        self.files.setdefault(path, LineIndex())
+
+    def contains(self, path, line):
+        """Tells if line of file was added or changed."""
+        lines = self.files.get(path)
+        return lines is not None and line in lines
+
+    def has_additions(self, path):
+        """Tells if file has added or changed lines. Files, that are
+        missing in diff, are unknown and considered changed.
+        """
+        lines = self.files.get(path)
+        return lines is None or len(lines) > 0
+
+    def signature(self, path):
+        lines = self.files.get(path)
+        return lines.signature() if lines is not None else ''
+
+    def filter(self, result):
+        """Returns copy of LintResult with violations on changed lines
+        only. Violations without line (errors of tool itself) concern the
+        whole file and are kept.
+        """
+        lines = self.files.get(result.path)
+        if lines is None:
+            return result
+        filtered = LintResult(result.tool, result.path)
+        filtered.skipped = result.skipped
+        for line, rule, severity, message in result.locations:
+            if line is None or line in lines:
+                filtered.add(line, rule, severity, message)
+        return filtered
+
+
+def _unquote(path):
+    """Decodes path, that git quoted because of special characters."""
+    if path.startswith('"') and path.endswith('"'):
+        return path[1:-1].decode('string_escape')
+    return path
+
+
+def parse_diff(stream, index=None):
+    """Parses 'git diff -U0' output into HunkIndex. Lines of hunks are
+    counted by hunk headers, so added lines, that start with '++ ' or
+    '-- ', are never taken for file headers.
+
+    Args:
+        stream (iterable of str): diff lines.
+        index (HunkIndex): index to add hunks to, new one by default.
+
+    Returns:
+        index (HunkIndex): changed lines of every file.
+    """
+    index = HunkIndex() if index is None else index
+    path = None
+    # Lines of current hunk, that are not read yet.
+    old_left = new_left = 0
+    after_old_header = False
+    for line in stream:
+        if old_left > 0 or new_left > 0:
+            if line.startswith('-'):
+                old_left -= 1
+                continue
+            if line.startswith('+'):
+                new_left -= 1
+                continue
+            if line.startswith(' '):
+                old_left -= 1
+                new_left -= 1
+                continue
+            if line.startswith('\\'):
+                # '\ No newline at end of file'.
+                continue
+            # Truncated hunk, the line belongs to the next file.
+            old_left = new_left = 0
+
+        if line.startswith('+++ ') and after_old_header:
+            # Git appends tab to names with spaces, names with tabs are quoted.
+            name = _unquote(line[4:].rstrip('\n').rstrip('\t'))
+            # Deleted files have '+++ /dev/null'.
+            path = name[2:] if name.startswith('b/') else None
+            if path is not None:
+                index.touch(path)
+        elif line.startswith('@@') and path is not None:
+            match = HUNK_HEADER.match(line)
+            if match is not None:
+                old_left = 1 if match.group(1) is None else int(match.group(1))
+                start = int(match.group(2))
+                new_left = 1 if match.group(3) is None else int(match.group(3))
+                # Count 0 means lines were only deleted after line start.
+                if new_left > 0:
+                    index.add(path, start, start + new_left - 1)
+        elif line.startswith('diff --git '):
+            path = None
+        after_old_header = line.startswith('--- ')
+    # Merge intervals now, so lookups from worker threads only read.
+    for lines in index.files.values():
+        lines._merge()
+    return index
+
+
+def _git(cmd):
+    proc = Popen(cmd, stdout=PIPE, stderr=PIPE)
+    out, _ = proc.communicate()
+    return proc.returncode, out.strip()
+
+
+def diff_base(commit_ids, target=None):
+    """Returns base of pull request diff. If target branch is known, base
+    is merge base of target branch and the newest commit, as in pull
+    request diff of BitBucket. Otherwise it is parent of the oldest commit,
+    or empty tree, if the oldest commit is root commit. Then lines of
+    target branch merged into pull request are counted as changed.
+
+    Args:
+        commit_ids (list of str): pull request commits, newest first.
+        target (str): target branch or commit, JECKET_TARGET_BRANCH by
+            default.
+    """
+    target = target or os.environ.get('JECKET_TARGET_BRANCH')
+    if target:
+        code, base = _git(['git', 'merge-base', target, commit_ids[0]])
+        if code == 0 and base:
+            return base
+        logger.warning('Merge base of %s and %s is not found, parent of the oldest commit is used.', target,
+                       commit_ids[0])
+    code, parent = _git(['git', 'rev-parse', '--verify', '-q', '{0}^'.format(commit_ids[-1])])
+    return parent if code == 0 and parent else EMPTY_TREE_SHA
+
+
+def changed_lines(commit_ids, target=None):
+    """Builds HunkIndex of pull request with one 'git diff -U0' run
+    between diff base and the newest commit.
+
+    Args:
+        commit_ids (list of str): pull request commits, newest first.
+        target (str): target branch or commit, see diff_base.
+
+    Returns:
+        index (HunkIndex): changed lines of every file.
+
+    Raises:
+        GitCommandException: if git exited with non-zero code.
+    """
+    commit_ids = list(commit_ids)
+    index = HunkIndex()
+    if not commit_ids:
+        return index
+    cmd = ['git', 'diff', '-U0', '--no-color', '--no-ext-diff', '--no-renames', '--src-prefix=a/',
+           '--dst-prefix=b/', diff_base(commit_ids, target), commit_ids[0]]
+    logger.debug('Executing command %s', ' '.join(cmd))
+    proc = Popen(cmd, stdout=PIPE)
+    parse_diff(proc.stdout, index)
+    code = proc.wait()
+    if code != 0:
+        raise GitCommandException(cmd, code)
+    logger.debug('Changed lines index: %s files, %s hunks.', len(index.files), index.hunks)
+    return index
@@ -15,3 +15,12 @@ class IncorrectConfigFileException(Exception):
 
     def __str__(self):
         return 'Something wrong with the config file, please check it. Traceback: {}'.format(self.message)
+
+
+class GitCommandException(Exception):
+    def __init__(self, cmd, code):
+        self.cmd = cmd
+        self.code = code
+
+    def __str__(self):
+        return 'Git command {0} exited with code {1}.'.format(' '.join(self.cmd), self.code)
@@ -0,0 +1,56 @@
+import logging
+import os
+
+
+DEFAULT_LEVEL = 'INFO'
+DEFAULT_MAX_PAYLOAD = 2048
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+# Maximum length of payloads, responses and command output in log
+# records, 0 disables truncation.
+max_payload = int(os.environ.get('JECKET_LOG_MAX_PAYLOAD', DEFAULT_MAX_PAYLOAD))
+
+
+class truncated(object):
+    """
+    This class wraps log argument, that can be large (request payload,
+    response content, command output). The value is converted to string
+    only if record is emitted, and cut to max_payload characters:
+
+        logger.debug('POST request: url: %s, payload: %s', url, truncated(payload))
+    """
+    __slots__ = ('value', 'limit')
+
+    def __init__(self, value, limit=None):
+        self.value = value
+        self.limit = limit
+
+    def __str__(self):
+        text = self.value if isinstance(self.value, basestring) else repr(self.value)
+        limit = max_payload if self.limit is None else self.limit
+        if limit <= 0 or len(text) <= limit:
+            return text
+        return '{0}... [truncated {1} of {2} characters]'.format(text[:limit], len(text) - limit, len(text))
+
+    __repr__ = __str__
+
+
+def configure(level=None, payload_limit=None):
+    """Configures root logger.
+
+    Args:
+        level (str or int): log level name or number, JECKET_LOG_LEVEL or
+            INFO by default.
+        payload_limit (int): maximum logged payload length, see
+            max_payload.
+    """
+    global max_payload
+    level = level or os.environ.get('JECKET_LOG_LEVEL') or DEFAULT_LEVEL
+    if isinstance(level, basestring):
+        name, level = level, logging.getLevelName(level.upper())
+        if not isinstance(level, int):
+            raise ValueError('Unknown log level: {0}'.format(name))
+    if payload_limit is not None:
+        max_payload = payload_limit
+    logging.basicConfig(format=LOG_FORMAT)
+    logging.getLogger().setLevel(level)
@@ -0,0 +1,283 @@
+import atexit
+import contextlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import urlparse
+
+
+logger = logging.getLogger(__name__)
+
+PR_RESOURCE = re.compile(r'/pull-requests/[^/]+/(?P<resource>[a-z-]+)')
+
+
+def endpoint_name(url):
+    """Returns short endpoint name of BitBucket URL for metric labels:
+    pull request resource ('comments', 'commits', 'activities'),
+    'build-status' or 'other'. Ids and query are dropped, so labels do not
+    grow with number of files.
+    """
+    path = urlparse.urlparse(url).path
+    if '/build-status/' in path:
+        return 'build-status'
+    match = PR_RESOURCE.search(path)
+    return match.group('resource') if match else 'other'
+
+
+class Metrics(object):
+    """
+    This class collects wall time and counts of run phases, BitBucket
+    requests and linter subprocesses. It is shared by all worker threads.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.lock = threading.Lock()
+        # phase -> {'count', 'seconds'}
+        self.phases = {}
+        # (method, endpoint) -> {'count', 'seconds', 'errors', 'retries', 'sent_bytes', 'received_bytes'}
+        self.http = {}
+        # tool -> {'count', 'seconds', 'failures'}
+        self.subprocesses = {}
+        self.rate_limit_wait = 0.0
+        # name -> {'jobs', 'tasks', 'predicted_seconds', 'actual_seconds', 'sizing'}
+        self.schedules = {}
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Context manager, that adds wall time of the block to phase name."""
+        start = time.time()
+        try:
+            yield
+        finally:
+            elapsed = time.time() - start
+            with self.lock:
+                phase = self.phases.setdefault(name, {'count': 0, 'seconds': 0.0})
+                phase['count'] += 1
+                phase['seconds'] += elapsed
+
+    def _http_entry(self, method, url):
+        key = (method.upper(), endpoint_name(url))
+        entry = self.http.get(key)
+        if entry is None:
+            entry = self.http[key] = {'count': 0, 'seconds': 0.0, 'errors': 0, 'retries': 0,
+                                      'sent_bytes': 0, 'received_bytes': 0}
+        return entry
+
+    def record_http(self, method, url, seconds, status=None, sent_bytes=0, received_bytes=0):
+        """Records one request, including its retries.
+
+        Args:
+            method (str): HTTP method.
+            url (str): request URL.
+            seconds (float): wall time.
+            status (int): response code, None if request failed without
+                response.
+            sent_bytes (int): request body size.
+            received_bytes (int): response body size.
+        """
+        with self.lock:
+            entry = self._http_entry(method, url)
+            entry['count'] += 1
+            entry['seconds'] += seconds
+            entry['sent_bytes'] += sent_bytes
+            entry['received_bytes'] += received_bytes
+            if status is None or not 200 <= status < 300:
+                entry['errors'] += 1
+
+    def record_retry(self, method, url):
+        with self.lock:
+            self._http_entry(method, url)['retries'] += 1
+
+    def record_rate_limit_wait(self, seconds):
+        if seconds:
+            with self.lock:
+                self.rate_limit_wait += seconds
+
+    def record_subprocess(self, tool, seconds, code):
+        """Records one linter or other command run.
+
+        Args:
+            tool (str): tool name.
+            seconds (float): wall time.
+            code (int): exit code, -1 if command was not started.
+        """
+        with self.lock:
+            entry = self.subprocesses.setdefault(tool, {'count': 0, 'seconds': 0.0, 'failures': 0})
+            entry['count'] += 1
+            entry['seconds'] += seconds
+            if code != 0:
+                entry['failures'] += 1
+
+    def record_schedule(self, name, jobs, tasks, predicted, actual, sizing=None):
+        """Records predicted and actual makespan of scheduled jobs.
+
+        Args:
+            name (str): schedule name.
+            jobs (int): number of workers.
+            tasks (int): number of scheduled jobs.
+            predicted (float): predicted wall time.
+            actual (float): measured wall time.
+            sizing (dict of jobs: seconds): predicted wall time for other
+                numbers of workers.
+        """
+        with self.lock:
+            entry = self.schedules.setdefault(name, {'jobs': jobs, 'tasks': 0, 'predicted_seconds': 0.0,
+                                                     'actual_seconds': 0.0, 'sizing': {}})
+            entry['tasks'] += tasks
+            entry['predicted_seconds'] += predicted
+            entry['actual_seconds'] += actual
+            for sizing_jobs, seconds in (sizing or {}).items():
+                entry['sizing'][sizing_jobs] = entry['sizing'].get(sizing_jobs, 0.0) + seconds
+
+    def summary(self):
+        """Returns collected metrics as JSON-serializable dict."""
+        with self.lock:
+            http = [dict(entry, method=method, endpoint=endpoint)
+                    for (method, endpoint), entry in sorted(self.http.items())]
+            return {
+                'duration_seconds': time.time() - self.started,
+                'phases': dict((name, dict(value)) for name, value in self.phases.items()),
+                'http': http,
+                'subprocesses': dict((tool, dict(value)) for tool, value in self.subprocesses.items()),
+                'rate_limit_wait_seconds': self.rate_limit_wait,
+                'schedules': dict((name, dict(value, sizing=dict(value['sizing'])))
+                                  for name, value in self.schedules.items()),
+            }
+
+    def to_prometheus(self):
+        """Returns collected metrics in Prometheus text exposition format.
+
+        Values describe one jecket run, so all metrics are gauges.
+        """
+        summary = self.summary()
+        lines = []
+
+        def metric(name, help_text, samples):
+            lines.append('# HELP {0} {1}'.format(name, help_text))
+            lines.append('# TYPE {0} gauge'.format(name))
+            for labels, value in samples:
+                label_text = ','.join('{0}="{1}"'.format(key, str(labels[key]).replace('"', '\\"'))
+                                      for key in sorted(labels))
+                lines.append('{0}{1} {2}'.format(name, '{' + label_text + '}' if label_text else '', value))
+
+        metric('jecket_run_duration_seconds', 'Wall time of jecket run.', [({}, summary['duration_seconds'])])
+        phases = sorted(summary['phases'].items())
+        metric('jecket_phase_seconds', 'Wall time of run phase.',
+               [({'phase': name}, value['seconds']) for name, value in phases])
+        metric('jecket_phase_count', 'Number of times phase was entered.',
+               [({'phase': name}, value['count']) for name, value in phases])
+        for field, help_text in (('count', 'Number of BitBucket requests.'),
+                                 ('seconds', 'Wall time of BitBucket requests, including retries.'),
+                                 ('errors', 'Number of failed BitBucket requests.'),
+                                 ('retries', 'Number of BitBucket request retries.'),
+                                 ('sent_bytes', 'Request body bytes sent to BitBucket.'),
+                                 ('received_bytes', 'Response body bytes received from BitBucket.')):
+            metric('jecket_http_{0}'.format('requests' if field == 'count' else field), help_text,
+                   [({'method': entry['method'], 'endpoint': entry['endpoint']}, entry[field])
+                    for entry in summary['http']])
+        metric('jecket_rate_limit_wait_seconds', 'Time spent waiting for rate limiter.',
+               [({}, summary['rate_limit_wait_seconds'])])
+        tools = sorted(summary['subprocesses'].items())
+        metric('jecket_subprocess_seconds', 'Wall time of tool subprocesses.',
+               [({'tool': tool}, value['seconds']) for tool, value in tools])
+        metric('jecket_subprocess_runs', 'Number of tool subprocess runs.',
+               [({'tool': tool}, value['count']) for tool, value in tools])
+        metric('jecket_subprocess_failures', 'Number of tool subprocess runs with non-zero exit code.',
+               [({'tool': tool}, value['failures']) for tool, value in tools])
+        schedules = sorted(summary['schedules'].items())
+        metric('jecket_schedule_predicted_seconds', 'Predicted makespan of scheduled jobs.',
+               [({'schedule': name, 'jobs': value['jobs']}, value['predicted_seconds']) for name, value in schedules])
+        metric('jecket_schedule_actual_seconds', 'Measured makespan of scheduled jobs.',
+               [({'schedule': name, 'jobs': value['jobs']}, value['actual_seconds']) for name, value in schedules])
+        return '\n'.join(lines) + '\n'
+
+
+def write_atomically(path, content):
+    """Writes file through temporary file and rename, so collectors never
+    read partial file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.jecket_metrics_')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+        os.rename(temp_path, path)
+    except Exception:
+        os.remove(temp_path)
+        raise
+
+
+_metrics = Metrics()
+_emit_registered = False
+
+
+def get_metrics():
+    """Returns process-wide metrics."""
+    return _metrics
+
+
+def reset():
+    """Drops collected metrics."""
+    global _metrics
+    _metrics = Metrics()
+
+
+def phase(name):
+    return _metrics.phase(name)
+
+
+def record_http(method, url, seconds, status=None, sent_bytes=0, received_bytes=0):
+    _metrics.record_http(method, url, seconds, status, sent_bytes, received_bytes)
+
+
+def record_retry(method, url):
+    _metrics.record_retry(method, url)
+
+
+def record_rate_limit_wait(seconds):
+    _metrics.record_rate_limit_wait(seconds)
+
+
+def record_subprocess(tool, seconds, code):
+    _metrics.record_subprocess(tool, seconds, code)
+
+
+def record_schedule(name, jobs, tasks, predicted, actual, sizing=None):
+    _metrics.record_schedule(name, jobs, tasks, predicted, actual, sizing)
+
+
+def emit(json_file=None, prometheus_file=None):
+    """Writes JSON summary and Prometheus textfile.
+
+    Args:
+        json_file (str): JSON summary path, JECKET_METRICS_FILE by
+            default. If not set, the summary is logged.
+        prometheus_file (str): textfile path for node_exporter textfile
+            collector, JECKET_PROMETHEUS_FILE by default. Not written if
+            not set.
+    """
+    json_file = json_file or os.environ.get('JECKET_METRICS_FILE')
+    prometheus_file = prometheus_file or os.environ.get('JECKET_PROMETHEUS_FILE')
+    try:
+        summary = json.dumps(_metrics.summary(), sort_keys=True)
+        if json_file:
+            write_atomically(json_file, summary + '\n')
+        elif _metrics.phases or _metrics.http or _metrics.subprocesses or _metrics.schedules:
+            logger.info('Metrics: %s', summary)
+        if prometheus_file:
+            write_atomically(prometheus_file, _metrics.to_prometheus())
+    except Exception:
+        logger.exception('Error occurred while writing metrics.')
+
+
+def emit_at_exit():
+    """Registers emit to run at interpreter exit, once per process."""
+    global _emit_registered
+    if not _emit_registered:
+        atexit.register(emit)
+        _emit_registered = True
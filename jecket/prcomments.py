@@ -1,12 +1,17 @@
 #!/usr/bin/env python
+import hashlib
 import json
 import logging
 import os
+import threading
 
 import jecket
+from jecket.logs import truncated
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_PAGE_LIMIT = 500
+
 
 class PRState(jecket.PRFile):
     rest_api_link = '/rest/build-status/1.0/commits/'
@@ -45,14 +50,15 @@ class PRState(jecket.PRFile):
         else:
             commit_hash = os.environ.get('GIT_COMMIT', 'TEST_HASH')
         url = self.base_api_link + PRState.rest_api_link + commit_hash
-        logger.info('Sending build status for commit {}.'.format(commit_hash))
+        logger.info('Sending build status for commit %s.', commit_hash)
         payload = {
             'state': state,
             'key': key,
             'url': url_to_build
         }
         code, content = self.send_post_request(url, payload)
-        logger.info('Sending finished. Result: status - {0}, content - {1}.'.format(code, content))
+        logger.info('Sending finished. Result: status - %s.', code)
+        logger.debug('Build status response content: %s', truncated(content))
         return code, content
 
 
@@ -91,22 +97,155 @@ class PRCommits(jecket.PRFile):
         if url[-1] != '/':
             url += '/'
         url = '{0}commits'.format(url)
-        logger.info('URL generated: {}'.format(url))
+        logger.debug('URL generated: %s', url)
         return url
 
-    def get_commits(self):
+    def cache_key(self, url):
+        """Returns commits cache key of pull request: commits URL and head
+        commit (GIT_COMMIT), or None, if head commit is not known.
+        """
+        head = self.git_commit or os.environ.get('GIT_COMMIT')
+        if not head:
+            return None
+        return hashlib.sha1('\0'.join(['commits', url, head])).hexdigest()
+
+    def iter_commits(self, limit=None, cache=None):
+        """Generator over commit IDs of pull request, newest first. It reads
+        all pages of commits and yields IDs of every page as soon as the
+        page is received, so callers can start working on the first page.
+
+        Args:
+            limit (int): page size, JECKET_COMMITS_PAGE_LIMIT or
+                DEFAULT_PAGE_LIMIT by default.
+            cache (ResultCache): cache of commit lists keyed by head commit.
+                On hit no request is sent. Complete list is stored, when it
+                starts with head commit.
+
+        Yields:
+            commit_id (str): commit SHA.
+
+        Raises:
+            IncorrectJsonException: if response is not successful.
+        """
+        url = self.generate_url()
+        key = self.cache_key(url) if cache is not None else None
+        if key is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                logger.debug('Commits of pull request are taken from cache: %s commits.', len(cached))
+                for commit_id in cached:
+                    yield commit_id
+                return
+        limit = limit or int(os.environ.get('JECKET_COMMITS_PAGE_LIMIT', DEFAULT_PAGE_LIMIT))
+        commits = []
+        for commit in self.get_paged_values(url, {'withcounts': 'false'}, limit):
+            commits.append(commit['id'])
+            yield commit['id']
+        # Head, that is not the newest commit of pull request (merge commit
+        # built by CI, for example), does not identify commit list.
+        if key is not None and commits and commits[0] == (self.git_commit or os.environ.get('GIT_COMMIT')):
+            cache.put(key, commits)
+
+    def get_commits(self, limit=None, cache=None):
         """This method gets the list of commits id from the generated URL.
 
+        Args:
+            limit (int): page size, see iter_commits.
+            cache (ResultCache): cache of commit lists, see iter_commits.
+
         Returns:
-            result.commit (dict): Commit SHA value per commit id.
+            result (list of str): commit SHAs, newest first.
 
         """
-        url = self.generate_url()
-        payload = {'withcounts': 'false'}
-        code, message = self.send_get_request(url, payload)
-        if code in [200, 204]:
-            commits = json.loads(message)
-            result = [commit['id'] for commit in commits['values']]
-        else:
-            raise jecket.IncorrectJsonException(status=code, url=url, json=message)
-        return result
+        return list(self.iter_commits(limit, cache))
+
+
+class CommentIndex(object):
+    """
+    This class keeps existing comments of pull request, keyed by file
+    path and author name.
+    """
+
+    def __init__(self):
+        # (path, author) -> (comment_id, comment_version, text)
+        self.comments = {}
+        self.lock = threading.Lock()
+
+    def add(self, path, author, comment_id, comment_version, text=''):
+        """Adds comment to index, the first added comment for path and author wins."""
+        with self.lock:
+            self.comments.setdefault((path, author), (comment_id, comment_version, text))
+
+    def get(self, path, author):
+        """Returns (comment_id, comment_version, text) or None."""
+        with self.lock:
+            return self.comments.get((path, author))
+
+    def check_comments(self, path, author):
+        """Searches for comment from specific author, has the same result as
+        PRFile.check_comments_from_specific_author.
+
+        Returns:
+            (0, (comment_id, comment_version)) if comment exists,
+            (0, 'New comment required.') otherwise.
+        """
+        comment = self.get(path, author)
+        if comment is None:
+            return 0, 'New comment required.'
+        comment_id, comment_version, _ = comment
+        return 0, (comment_id, comment_version)
+
+    def update_from_response(self, path, author, response):
+        """Stores comment returned by POST or PUT request.
+
+        Args:
+            path (str): file path of comment.
+            author (str): author name.
+            response (tuple of (code, content)): result of request.
+        """
+        code, content = response
+        if code not in [200, 201]:
+            return
+        try:
+            comment = json.loads(content)
+            value = (comment['id'], comment['version'], comment.get('text', ''))
+        except (ValueError, KeyError, TypeError):
+            logger.debug('Response does not contain comment: %s', truncated(content))
+            return
+        with self.lock:
+            self.comments[(path, author)] = value
+
+    def __len__(self):
+        return len(self.comments)
+
+
+class PRComments(jecket.PRFile):
+    def __init__(self):
+        super(PRComments, self).__init__('')
+
+    def get_comment_index(self, limit=500):
+        """This method reads all pages of pull request activities and
+        collects file comments into index.
+
+        Args:
+            limit (int): page size.
+
+        Returns:
+            index (CommentIndex): existing file comments.
+        """
+        url = self.generate_url('activities')
+        index = CommentIndex()
+        seen = set()
+        for activity in self.get_paged_values(url, limit=limit):
+            if activity.get('action') != 'COMMENTED':
+                continue
+            comment = activity.get('comment') or {}
+            anchor = activity.get('commentAnchor') or comment.get('anchor') or {}
+            path = anchor.get('path')
+            if path is None or comment.get('id') in seen:
+                continue
+            seen.add(comment['id'])
+            author = comment.get('author', {}).get('name')
+            index.add(path, author, comment['id'], comment['version'], comment.get('text', ''))
+        logger.info('Comment index built, %s file comments found.', len(index))
+        return index
@@ -1,10 +1,15 @@
 #!/usr/bin/env python
 
+import functools
 import json
 import logging
 import os
-import requests
-from requests.auth import HTTPBasicAuth
+import time
+
+from jecket import http_pool, metrics, profiling, request_policy
+from jecket.config import DEFAULT_CONFIG_PATH, get_config
+from jecket.jecket_exceptions import IncorrectJsonException
+from jecket.logs import truncated
 
 
 logger = logging.getLogger(__name__)
@@ -15,9 +20,11 @@ class PRFile(object):
     This class sends static checks results to pull request files.
     """
     fake_build_url = 'http://jenkins.test'
-    config = '/tmp/jecket.conf'
+    config = DEFAULT_CONFIG_PATH
+    build_link_text = ' You can find details via link '
+    checks_author_default = 'jenkins'
 
-    def set_data(self, checks_author='jenkins',
+    def set_data(self, checks_author=checks_author_default,
                  rest_api_link='/rest/api/1.0/projects/{SLUG}/repos/{PROJECT}/pull-requests/{PRI}/',
                  slug=None, project_name=None, pull_request_id=None, git_commit=None):
         self.checks_author = checks_author
@@ -30,36 +37,38 @@ class PRFile(object):
 
     def __init__(self, checked_file):
         """
+        Base API link, credentials and pull request settings are taken
+        from config, that is loaded once per process (see jecket.config).
+
         Args:
-            base_api_link (str): link to bitbucket's api service.
             checked_file (str): path to file, that is going
                 to be checked with static checks.
-            username (str): login for basic auth.
-            passwd (str): password for basic auth.
 
         """
 
-        self.config_generator = self.get_config()
-        self.base_api_link = self.config_generator.next()
-        self.username = self.config_generator.next()
-        self.passwd = self.config_generator.next()
+        settings = get_config(PRFile.config)
+        self.base_api_link = settings.base_link
+        self.username = settings.username
+        self.passwd = settings.password
         self.checked_file = checked_file
-        self.checks_author = 'jenkins'
+        self.checks_author = PRFile.checks_author_default
         self.rest_api_link = '/rest/api/1.0/projects/{SLUG}/repos/{PROJECT}/pull-requests/{PRI}/'
-        self.slug = None
-        self.project_name = None
-        self.pull_request_id = None
-        self.git_commit = None
+        self.slug = settings.slug
+        self.project_name = settings.project
+        self.pull_request_id = settings.pr_id
+        self.git_commit = settings.git_commit
 
-    @staticmethod
-    def get_config():
-        with open(PRFile.config, 'r') as f:
-            for line in f:
-                yield line.replace('\n', '')
+    @property
+    def session(self):
+        """Shared HTTP session with connection pool."""
+        return http_pool.get_session(self.username, self.passwd)
 
-    def generate_url(self):
+    def generate_url(self, resource='comments'):
         """This method is generate correct url for bitbucket api.
 
+        Args:
+            resource (str): pull request resource, 'comments' by default.
+
         Returns:
             url (str): API URL for adding comments.
         """
@@ -81,18 +90,95 @@ class PRFile(object):
         else:
             pull_request_id = self.pull_request_id
 
-        logger.debug('Generating URL with parameters slug: {0}, project: {1}, '
-                     'pull request ID: {2}'.format(slug, project_name, pull_request_id))
+        logger.debug('Generating URL with parameters slug: %s, project: %s, '
+                     'pull request ID: %s', slug, project_name, pull_request_id)
         url = self.base_api_link + self.rest_api_link
         url = url.replace('{SLUG}', slug)
         url = url.replace('{PROJECT}', project_name)
         url = url.replace('{PRI}', pull_request_id)
         if url[-1] != '/':
             url += '/'
-        url = '{0}comments'.format(url)
+        url = '{0}{1}'.format(url, resource)
         return url
 
-    def send_static_check_results(self, results):
+    def get_paged_values(self, url, payload=None, limit=None):
+        """Generator over values of paged BitBucket API resource. It follows
+        isLastPage and nextPageStart fields, and yields values of every page
+        as soon as the page is received.
+
+        Args:
+            url (str): API URL of paged resource.
+            payload (dict): additional query parameters.
+            limit (int): page size, server default if None.
+
+        Yields:
+            value (dict): one value of a page.
+
+        Raises:
+            IncorrectJsonException: if response is not successful.
+        """
+        params = dict(payload or {})
+        if limit is not None:
+            params['limit'] = limit
+        start = 0
+        while True:
+            params['start'] = start
+            code, message = self.send_get_request(url, params)
+            if code not in [200, 204]:
+                raise IncorrectJsonException(status=code, url=url, json=message)
+            page = json.loads(message)
+            for value in page.get('values', []):
+                yield value
+            if page.get('isLastPage', True) or page.get('nextPageStart') is None:
+                break
+            start = page['nextPageStart']
+
+    @staticmethod
+    def generate_comment_text(results, build_link):
+        """Method generates comment text for static check results. Titles
+        are sorted, so the same results always give the same text.
+
+        Args:
+            results (dict of title: value): static check results.
+            build_link (str): link to build with details.
+
+        Returns:
+            text (str): comment text.
+        """
+        text = ''
+        for key in sorted(results):
+            text += '{0} {1} '.format(key, results[key])
+        return '{0}{1}{2}'.format(text, PRFile.build_link_text, build_link)
+
+    def create_comment(self, text):
+        """Method creates comment for checked file.
+
+        Returns:
+            code (int), content (str): response of POST request.
+        """
+        payload = {'text': text, 'anchor': {'path': self.checked_file}}
+        return self.send_post_request(self.generate_url(), payload)
+
+    def update_comment(self, comment_id, comment_version, text):
+        """Method updates text of existing comment for checked file.
+
+        Returns:
+            code (int), content (str): response of PUT request.
+        """
+        link = '{0}/{1}'.format(self.generate_url(), comment_id)
+        payload = {'version': comment_version, 'text': text, 'anchor': {'path': self.checked_file}}
+        return self.send_put_request(link, payload)
+
+    def delete_comment(self, comment_id, comment_version):
+        """Method deletes existing comment.
+
+        Returns:
+            code (int), content (str): response of DELETE request.
+        """
+        link = '{0}/{1}'.format(self.generate_url(), comment_id)
+        return self.send_delete_request(link, {'version': comment_version})
+
+    def send_static_check_results(self, results, comment_index=None):
         """Method sends static check results (PMD and checkstyle
         for now) as a comment for specific file in commit.
 
@@ -103,38 +189,43 @@ class PRFile(object):
                 }
                 title: Violation description.
                 value: Number of violations.
+            comment_index (CommentIndex): existing comments of pull request.
+                If provided, it is used instead of requesting comments for
+                the file, and it is updated with sent comment.
 
         Returns:
             content (str): Respond's payload.
             code (int): Response's code.
         """
         result = (-42, 'Unknown error.')
-        logger.debug('Check results will be used to generate comment message. Results: {0}'.format(results))
+        logger.debug('Check results will be used to generate comment message. Results: %s', truncated(results))
         build_link = os.environ.get('BUILD_URL', PRFile.fake_build_url)
-        logger.debug('Get build link from environment variable. Result: {0}'.format(build_link))
-        text = ''
+        logger.debug('Get build link from environment variable. Result: %s', build_link)
         logger.debug('Initializing comment text...')
         try:
-            for key in results.iterkeys():
-                text += '{0} {1} '.format(key, results[key])
-                logger.debug('Generating comment text... current text: {0}'.format(text))
+            text = self.generate_comment_text(results, build_link)
+            logger.debug('Generating comment text... current text: %s', truncated(text))
         except Exception as e:
-            logger.exception('Error while generating comment message: {0}'.format(e))
+            logger.exception('Error while generating comment message: %s', e)
             logger.info('Error occurred while generating comment text...')
         else:
-            text += ' You can find details via link {0}'.format(build_link)
-
             # Get result into temp variable, and check.
-            code, message = self.check_comments_from_specific_author(self.checks_author)
-            logger.debug('Checking comments from specific author, and result is {0}, '
-                         'message is {1}'.format(code, message))
+            if comment_index is not None:
+                code, message = comment_index.check_comments(self.checked_file, self.checks_author)
+            else:
+                code, message = self.check_comments_from_specific_author(self.checks_author)
+            logger.debug('Checking comments from specific author, and result is %s, '
+                         'message is %s', code, truncated(message))
             # if result is None, then we need to Post comment,
             # if result is Not none, then we need to PUT comment.
             if code == 0 and message == 'New comment required.':
                 url = self.generate_url()
                 payload = {'text': text, 'anchor': {'path': self.checked_file}}
-                logger.debug('Code is 0 and message is "False". Sending post request with payload: {0}'.format(payload))
+                logger.debug('Code is 0 and message is "False". Sending post request with payload: %s',
+                             truncated(payload))
                 result = self.send_post_request(url, payload)
+                if comment_index is not None:
+                    comment_index.update_from_response(self.checked_file, self.checks_author, result)
             elif code == 0:
                 # And to PUT we need to pass additional parameters:
                 # id of existing comment and it's version.
@@ -149,8 +240,10 @@ class PRFile(object):
                     }
                 }
                 logger.debug('Code is 0 and message is not "New comment required": '
-                             'Sending put request with payload: {0}'.format(payload))
+                             'Sending put request with payload: %s', truncated(payload))
                 result = self.send_put_request(link, payload)
+                if comment_index is not None:
+                    comment_index.update_from_response(self.checked_file, self.checks_author, result)
             else:
                 result = (-1, message)
         finally:
@@ -168,7 +261,7 @@ class PRFile(object):
             found comment or None if nothing is found and there is no
             errors.
         """
-        logger.debug('Searching comments from {}'.format(author))
+        logger.debug('Searching comments from %s', author)
         # Initialize some variables
         result = (-42, 'Unknown Error')
         comment_id_version = None
@@ -179,60 +272,85 @@ class PRFile(object):
         if code == -1:
             result = (-1, message)
         elif code == 0 and message:
-            logger.debug('Comments list is not empty, and code is 0. Trying to find comment by {0}'.format(author))
+            logger.debug('Comments list is not empty, and code is 0. Trying to find comment by %s', author)
             comments = message
             try:
                 for comment in comments:
                     if comment['author']['name'] == author:
                         comment_id_version = (comment['id'], comment['version'])
-                        logger.debug('Found comment for file {0} by author {1} with ID {2}.'
-                                     .format(self.checked_file, author, comment_id_version))
+                        logger.debug('Found comment for file %s by author %s with ID %s.',
+                                     self.checked_file, author, comment_id_version)
                         break
             except Exception as e:
-                logger.exception('Error occurred while iterating over comments for file {0}'
-                                 .format(self.checked_file))
+                logger.exception('Error occurred while iterating over comments for file %s', self.checked_file)
                 result = (-1, e)
             else:
                 if comment_id_version is not None:
-                    logger.debug('Sending id and version of comment {0} '
-                                 'from author {1}.'.format(comment_id_version, author))
+                    logger.debug('Sending id and version of comment %s '
+                                 'from author %s.', comment_id_version, author)
                     result = (0, comment_id_version)
                 else:
-                    logger.debug('No comment found for author {0}. '
-                                 'Sending signal "New comment required".'.format(author))
+                    logger.debug('No comment found for author %s. '
+                                 'Sending signal "New comment required".', author)
                     result = (0, 'New comment required.')
 
         elif code == 0 and not message:
-            logger.debug('No comments found for file {0}. Sending signal '
-                         '"New comment required"'.format(self.checked_file))
+            logger.debug('No comments found for file %s. Sending signal '
+                         '"New comment required"', self.checked_file)
             result = (0, 'New comment required.')
         return result
 
     def get_all_comments_for_file(self):
-        """Method for collecting all comments for specific file.
+        """Method for collecting all comments for specific file. All pages
+        of comments are read.
 
         Returns:
             result (dict of str): dictionary with comments.
         """
-        logger.debug('Trying to get all comments for file {0}...'.format(self.checked_file))
+        logger.debug('Trying to get all comments for file %s...', self.checked_file)
         payload = {'path': self.checked_file}
         url = self.generate_url()
-        code, message = self.send_get_request(url, payload)
-
-        if code in [200, 204]:
-            response = json.loads(message)
-            result = (0, response['values'])
-            logger.debug('Comments are successfully received, result: {0}.'.format(result))
-        elif code == -1:
-            result = (-1, message)
-            logger.error('Error occurred while getting comment for file {0}. Error: {1}'.format(self.checked_file,
-                                                                                                message))
+        try:
+            comments = list(self.get_paged_values(url, payload))
+        except IncorrectJsonException as e:
+            if e.status == -1:
+                result = (-1, e.json)
+                logger.error('Error occurred while getting comment for file %s. Error: %s', self.checked_file,
+                             truncated(e.json))
+            else:
+                result = (-1, '{0}: {1}'.format(e.status, e.json))
+                logger.warning('Response is not 200 or 204. Code %s: %s', e.status, truncated(e.json))
         else:
-            result = (-1, '{0}: {1}'.format(code, message))
-            logger.warning('Response is not 200 or 204. Code {0}: {1}'.format(code, message))
+            result = (0, comments)
+            logger.debug('Comments are successfully received, result: %s.', truncated(result))
 
         return result
 
+    def send_request(self, method, url, **kwargs):
+        """Sends request through shared session with shared request policy:
+        timeouts, retries with backoff, Retry-After and rate limit.
+
+        Args:
+            method (str): HTTP method.
+            url (str): request URL.
+            kwargs: arguments of requests.Session.request.
+
+        Returns:
+            response (requests.Response): the last response.
+        """
+        send = functools.partial(self.session.request, method, url, **kwargs)
+        start = time.time()
+        try:
+            with profiling.blocking('http'):
+                response = request_policy.get_policy().send(send, method, url)
+        except Exception:
+            metrics.record_http(method, url, time.time() - start)
+            raise
+        body = response.request.body if response.request is not None else None
+        metrics.record_http(method, url, time.time() - start, response.status_code, len(body or ''),
+                            len(response.content or ''))
+        return response
+
     def send_post_request(self, url, payload):
         """Sends post request with spec header.
 
@@ -245,15 +363,14 @@ class PRFile(object):
             result.status_code (str): Response code.
         """
         result = (-42, 'Unknown.')
-        logger.debug('POST request: url: {0}, payload: {1}'.format(url, payload))
+        logger.debug('POST request: url: %s, payload: %s', url, truncated(payload))
         try:
-            response = requests.post(url, json=payload, headers={'X-Atlassian-Token': 'no-check'},
-                                     auth=HTTPBasicAuth(self.username, self.passwd))
+            response = self.send_request('POST', url, json=payload)
         except Exception as e:
             logger.exception('Error occurred while sending POST request.')
             result = (-1, e)
         else:
-            logger.debug('POST respond: status: {0}, content: {1}'.format(response.status_code, response.content))
+            logger.debug('POST respond: status: %s, content: %s', response.status_code, truncated(response.content))
             result = response.status_code, response.content
 
         return result
@@ -270,15 +387,14 @@ class PRFile(object):
             result.status_code (str): Response code.
         """
         result = (-42, 'Unknown.')
-        logger.debug('PUT request: url: {0}, payload: {1}'.format(url, payload))
+        logger.debug('PUT request: url: %s, payload: %s', url, truncated(payload))
         try:
-            response = requests.put(url, json=payload, headers={'X-Atlassian-Token': 'no-check'},
-                                    auth=HTTPBasicAuth(self.username, self.passwd))
+            response = self.send_request('PUT', url, json=payload)
         except Exception as e:
             logger.exception('Error occurred while sending PUT request.')
             result = (-1, e)
         else:
-            logger.debug('PUT respond: status: {0}, content: {1}'.format(response.status_code, response.content))
+            logger.debug('PUT respond: status: %s, content: %s', response.status_code, truncated(response.content))
             result = (response.status_code, response.content)
         finally:
             return result
@@ -295,15 +411,38 @@ class PRFile(object):
             result.status_code (str): Response code.
         """
         result = (-42, 'Unknown.')
-        logger.debug('GET request: url: {0}, payload: {1}'.format(url, payload))
+        logger.debug('GET request: url: %s, payload: %s', url, truncated(payload))
         try:
-            response = requests.get(url, params=payload, headers={'X-Atlassian-Token': 'no-check'},
-                                    auth=HTTPBasicAuth(self.username, self.passwd))
+            response = self.send_request('GET', url, params=payload)
         except Exception as e:
             logger.exception('Error occurred while sending GET request.')
             result = (-1, e)
         else:
-            logger.debug('GET respond: status: {0}, content: {1}'.format(response.status_code, response.content))
+            logger.debug('GET respond: status: %s, content: %s', response.status_code, truncated(response.content))
+            result = (response.status_code, response.content)
+        finally:
+            return result
+
+    def send_delete_request(self, url, payload):
+        """Sends delete request with spec header.
+
+        Args:
+            url (str): API URL of deleted resource.
+            payload (dict): query parameters.
+
+        Returns:
+            result.content (dict): Response content in json format.
+            result.status_code (str): Response code.
+        """
+        result = (-42, 'Unknown.')
+        logger.debug('DELETE request: url: %s, payload: %s', url, truncated(payload))
+        try:
+            response = self.send_request('DELETE', url, params=payload)
+        except Exception as e:
+            logger.exception('Error occurred while sending DELETE request.')
+            result = (-1, e)
+        else:
+            logger.debug('DELETE respond: status: %s, content: %s', response.status_code, truncated(response.content))
             result = (response.status_code, response.content)
         finally:
             return result
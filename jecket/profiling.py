@@ -0,0 +1,195 @@
+import contextlib
+import cProfile
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 0.005
+TOP_FUNCTIONS = 20
+# Leaf frames of threads, that wait for other threads.
+THREAD_WAITS = frozenset(['wait', 'join', 'get', 'acquire'])
+
+_profiler = None
+# thread ident -> list of blocking tags of the thread.
+_blocking = {}
+
+
+@contextlib.contextmanager
+def blocking(tag):
+    """Context manager, that marks the calling thread as blocked on tag
+    ('subprocess', 'http') for the sampling profiler. It does nothing,
+    unless profiling is running.
+    """
+    if _profiler is None:
+        yield
+        return
+    tags = _blocking.setdefault(threading.current_thread().ident, [])
+    tags.append(tag)
+    try:
+        yield
+    finally:
+        tags.pop()
+
+
+def frame_name(frame):
+    code = frame.f_code
+    return '{0}:{1}'.format(os.path.splitext(os.path.basename(code.co_filename))[0], code.co_name)
+
+
+class Profiler(object):
+    """
+    This class profiles all threads of the process. Deterministic cProfile
+    profiles of every thread are merged into one pstats file. A sampling
+    thread records stacks of all threads in collapsed format, one line per
+    stack with number of samples, that flamegraph.pl and speedscope read.
+    Samples of threads inside blocking() get a [blocked:<tag>] leaf frame,
+    samples of threads waiting for other threads get [blocked:thread], and
+    the rest get [python], so time spent waiting for linters and BitBucket
+    is separated from Python time.
+    """
+
+    def __init__(self, interval=None):
+        """
+        Args:
+            interval (float): sampling interval in seconds,
+                JECKET_PROFILE_INTERVAL or DEFAULT_INTERVAL by default.
+        """
+        self.interval = interval or float(os.environ.get('JECKET_PROFILE_INTERVAL', DEFAULT_INTERVAL))
+        self.profiles = []
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.tags = {}
+        self.stopped = threading.Event()
+        self.sampler = None
+        self.started = None
+        self.duration = 0.0
+
+    def _thread_profile(self, frame, event, arg):
+        """Profile function of new threads: replaces itself with cProfile
+        profiler of the thread.
+        """
+        if threading.current_thread() is self.sampler:
+            sys.setprofile(None)
+            return
+        profile = cProfile.Profile()
+        with self.lock:
+            self.profiles.append(profile)
+        profile.enable()
+
+    def _tag(self, ident, frame):
+        tags = _blocking.get(ident)
+        if tags:
+            return 'blocked:{0}'.format(tags[-1])
+        if frame.f_code.co_name in THREAD_WAITS and \
+                os.path.basename(frame.f_code.co_filename).startswith(('threading', 'Queue', 'pool')):
+            return 'blocked:thread'
+        return 'python'
+
+    def _sample(self):
+        own = threading.current_thread().ident
+        while not self.stopped.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                tag = self._tag(ident, frame)
+                stack = []
+                while frame is not None:
+                    stack.append(frame_name(frame))
+                    frame = frame.f_back
+                stack.reverse()
+                stack.append('[{0}]'.format(tag))
+                key = ';'.join(stack)
+                self.samples[key] = self.samples.get(key, 0) + 1
+                self.tags[tag] = self.tags.get(tag, 0) + 1
+
+    def start(self):
+        global _profiler
+        _profiler = self
+        self.started = time.time()
+        self.sampler = threading.Thread(target=self._sample, name='jecket-profiler')
+        self.sampler.daemon = True
+        self.sampler.start()
+        threading.setprofile(self._thread_profile)
+        main_profile = cProfile.Profile()
+        self.profiles.insert(0, main_profile)
+        main_profile.enable()
+
+    def stop(self):
+        global _profiler
+        self.profiles[0].disable()
+        threading.setprofile(None)
+        self.stopped.set()
+        self.sampler.join()
+        self.duration = time.time() - self.started
+        _profiler = None
+
+    def stats(self):
+        """Returns merged pstats.Stats of all threads."""
+        with self.lock:
+            profiles = list(self.profiles)
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            try:
+                stats.add(profile)
+            except TypeError:
+                # Thread did not make any call after profiler was enabled.
+                continue
+        return stats
+
+    def write(self, prefix):
+        """Writes <prefix>.pstats and <prefix>.collapsed files.
+
+        Returns:
+            pstats_path, collapsed_path (str): written files.
+            stats (pstats.Stats): merged profile.
+        """
+        pstats_path = '{0}.pstats'.format(prefix)
+        collapsed_path = '{0}.collapsed'.format(prefix)
+        stats = self.stats()
+        stats.dump_stats(pstats_path)
+        with open(collapsed_path, 'w') as f:
+            for stack, count in sorted(self.samples.items()):
+                f.write('{0} {1}\n'.format(stack, count))
+        return pstats_path, collapsed_path, stats
+
+    def summary(self):
+        """Returns share of samples by tag: python, blocked:subprocess,
+        blocked:http, blocked:thread.
+        """
+        total = sum(self.tags.values())
+        return dict((tag, float(count) / total) for tag, count in self.tags.items()) if total else {}
+
+
+@contextlib.contextmanager
+def profile(prefix, interval=None):
+    """Context manager, that profiles the block and writes profiles, see
+    Profiler.write. Profiles are written even if the block raises
+    SystemExit or exception.
+
+    Args:
+        prefix (str): path prefix of profile files.
+        interval (float): sampling interval, see Profiler.
+    """
+    profiler = Profiler(interval)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        try:
+            pstats_path, collapsed_path, stats = profiler.write(prefix)
+        except Exception:
+            logger.exception('Error occurred while writing profile.')
+        else:
+            logger.info('Profile written to %s and %s, %.1f s, %s samples. Time by kind: %s.',
+                        pstats_path, collapsed_path, profiler.duration, sum(profiler.tags.values()),
+                        ', '.join('{0} {1:.0%}'.format(tag, share)
+                                  for tag, share in sorted(profiler.summary().items())))
+            if logger.isEnabledFor(logging.DEBUG):
+                stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
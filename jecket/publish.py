@@ -0,0 +1,93 @@
+import logging
+
+import jecket
+from jecket import artifacts, metrics, static_check
+from jecket.concurrent_client import ConcurrentClient
+
+
+logger = logging.getLogger(__name__)
+
+
+def send_results(file_results, comment_index, workers=None):
+    """Sends results of every file over one pooled concurrent client.
+    Files with (code, error) results could not be checked and are skipped.
+
+    Args:
+        file_results (dict of file: results): see Results.file_results.
+        comment_index (CommentIndex): existing comments, None to request
+            comments per file.
+        workers (int): number of concurrent requests.
+
+    Returns:
+        summary (dict): numbers of 'published', 'skipped' and 'failed'
+            files, and per-file results under 'files' key.
+    """
+    to_send = [path for path, results in file_results.items() if type(results) != tuple]
+    summary = {'published': 0, 'skipped': len(file_results) - len(to_send), 'failed': 0, 'files': {}}
+
+    def send(path):
+        return jecket.PRFile(checked_file=path).send_static_check_results(file_results[path], comment_index)
+
+    with ConcurrentClient(workers=workers) as client:
+        responses = client.map(send, to_send)
+    for path, (code, message) in zip(to_send, responses):
+        summary['files'][path] = (code, message)
+        summary['published' if 200 <= code < 300 else 'failed'] += 1
+    return summary
+
+
+def publish(results, jobs=None, reconcile_mode=False, dry_run=False):
+    """Publishes merged results to pull request.
+
+    Args:
+        results (Results): see artifacts.load.
+        jobs (int): number of concurrent requests, JECKET_HTTP_CONCURRENCY
+            by default.
+        reconcile_mode (bool): send only needed comment creates, updates
+            and deletes, see static_check.reconcile_comments.
+        dry_run (bool): with reconcile_mode, print plan only.
+
+    Returns:
+        summary (dict): see send_results, or reconcile_comments summary.
+    """
+    file_results = results.file_results()
+    if reconcile_mode or dry_run:
+        # Without complete list of existing comments plan can not be computed.
+        with metrics.phase('comment_index'):
+            comment_index = jecket.PRComments().get_comment_index()
+        with metrics.phase('reconcile'):
+            return static_check.reconcile_comments(file_results, comment_index, results.extensions, jobs or 1,
+                                                   dry_run)
+    try:
+        with metrics.phase('comment_index'):
+            comment_index = jecket.PRComments().get_comment_index()
+    except Exception:
+        logger.exception('Error occurred while building comment index, comments will be requested per file.')
+        comment_index = None
+    with metrics.phase('publish'):
+        return send_results(file_results, comment_index, jobs)
+
+
+def main(paths, jobs=None, reconcile_mode=False, dry_run=False):
+    """Reads results files and publishes them.
+
+    Args:
+        paths (list of str): results files, later files win, see
+            artifacts.Results.
+        jobs (int): number of concurrent requests.
+        reconcile_mode (bool): see publish.
+        dry_run (bool): see publish.
+
+    Returns:
+        summary (dict): see publish.
+    """
+    results = artifacts.load(paths)
+    logger.info('Publishing results of %s files from %s results files.', len(results), len(paths))
+    summary = publish(results, jobs, reconcile_mode, dry_run)
+    if reconcile_mode or dry_run:
+        logger.info('Comments reconciled. Created: %s, updated: %s, deleted: %s, failed: %s.',
+                    summary['create'], summary['update'], summary['delete'], summary['failed'])
+    else:
+        logger.info('Publishing finished. Published: %s, skipped: %s, failed: %s.',
+                    summary['published'], summary['skipped'], summary['failed'])
+    return summary
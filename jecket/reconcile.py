@@ -0,0 +1,123 @@
+import logging
+import os
+import re
+from collections import namedtuple
+
+import jecket
+from jecket import artifacts
+
+
+logger = logging.getLogger(__name__)
+
+# One comment mutation:
+#   action (str): 'create', 'update' or 'delete'.
+#   path (str): commented file.
+#   comment_id (int): existing comment ID, None for 'create'.
+#   version (int): existing comment version, None for 'create'.
+#   text (str): new comment text, None for 'delete'.
+Operation = namedtuple('Operation', ['action', 'path', 'comment_id', 'version', 'text'])
+
+NUMBER = re.compile(r'\d+')
+
+
+def is_clean(results):
+    """Tells if static check results contain no violations.
+
+    Results values are numbers ('PMD errors: ': 0) or messages with numbers
+    ('violations: 0, errors: 0, ...'), file is clean when all of them are
+    zero. Error tuples are never clean.
+    """
+    for value in results.values():
+        if type(value) == tuple:
+            return False
+        if any(int(number) != 0 for number in NUMBER.findall(str(value))):
+            return False
+    return True
+
+
+def results_part(text):
+    """Returns comment text without link to build. Link changes on every
+    build, so texts are compared without it.
+    """
+    return (text or '').split(jecket.PRFile.build_link_text, 1)[0]
+
+
+def plan(file_results, comment_index, author, extensions, build_link=None):
+    """Computes minimal set of comment mutations.
+
+    Args:
+        file_results (dict of file: results): static check results of all
+            checked files. Files, that could not be checked ((code, error)
+            results, or results with failed tools), are skipped: their
+            comments are neither created, updated nor deleted.
+        comment_index (CommentIndex): existing comments of pull request.
+        author (str): author of static check comments.
+        extensions (list of str): checked extensions, comments only on
+            files with these extensions may be deleted.
+        build_link (str): link to build, BUILD_URL if None.
+
+    Returns:
+        operations (list of Operation): sorted by path.
+    """
+    if build_link is None:
+        build_link = os.environ.get('BUILD_URL', jecket.PRFile.fake_build_url)
+    operations = []
+    desired = {}
+    failed = set(path for path, results in file_results.items() if artifacts.error_message(results) is not None)
+    for path, results in file_results.items():
+        if path not in failed and not is_clean(results):
+            desired[path] = jecket.PRFile.generate_comment_text(results, build_link)
+
+    for path, text in desired.items():
+        existing = comment_index.get(path, author)
+        if existing is None:
+            operations.append(Operation('create', path, None, None, text))
+        else:
+            comment_id, version, current_text = existing
+            if results_part(current_text) != results_part(text):
+                operations.append(Operation('update', path, comment_id, version, text))
+
+    for (path, comment_author), (comment_id, version, _) in comment_index.comments.items():
+        if comment_author != author or path in desired or path in failed:
+            continue
+        if not any(path.endswith(extension) for extension in extensions):
+            continue
+        # File is clean now or not in pull request anymore.
+        operations.append(Operation('delete', path, comment_id, version, None))
+
+    operations.sort(key=lambda operation: (operation.path, operation.action))
+    return operations
+
+
+def format_plan(operations):
+    """Returns human readable plan."""
+    lines = ['Comment plan: {0} create, {1} update, {2} delete.'.format(
+        *[sum(1 for operation in operations if operation.action == action)
+          for action in ('create', 'update', 'delete')])]
+    for operation in operations:
+        lines.append('  {0:<6} {1}{2}'.format(
+            operation.action, operation.path,
+            '' if operation.comment_id is None else ' (comment {0})'.format(operation.comment_id)))
+    return '\n'.join(lines)
+
+
+def apply_operation(operation, comment_index=None, author=None):
+    """Sends one mutation to BitBucket.
+
+    Returns:
+        code (int), content (str): response of request, or (-1, error).
+    """
+    pr_file = jecket.PRFile(checked_file=operation.path)
+    try:
+        if operation.action == 'create':
+            result = pr_file.create_comment(operation.text)
+        elif operation.action == 'update':
+            result = pr_file.update_comment(operation.comment_id, operation.version, operation.text)
+        else:
+            result = pr_file.delete_comment(operation.comment_id, operation.version)
+    except Exception as e:
+        logger.exception('Error occurred while applying %s for file %s.', operation.action, operation.path)
+        result = (-1, e)
+    if comment_index is not None and operation.action != 'delete':
+        comment_index.update_from_response(operation.path, author or pr_file.checks_author, result)
+    return result
@@ -0,0 +1,311 @@
+import json
+import logging
+import re
+from xml.etree import cElementTree as ElementTree
+
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 65536
+
+
+class LintResult(object):
+    """
+    This class keeps violations of one tool for one file.
+    """
+
+    def __init__(self, tool, path):
+        """
+        Args:
+            tool (str): name of static check tool.
+            path (str): path to checked file, as the tool reported it.
+        """
+        self.tool = tool
+        self.path = path
+        self.by_rule = {}
+        self.by_severity = {}
+        # List of (line, rule, severity, message) tuples, line may be None.
+        self.locations = []
+        self.skipped = False
+
+    def add(self, line, rule, severity, message=''):
+        """Adds one violation to result."""
+        self.by_rule[rule] = self.by_rule.get(rule, 0) + 1
+        self.by_severity[severity] = self.by_severity.get(severity, 0) + 1
+        self.locations.append((line, rule, severity, message))
+
+    @property
+    def total(self):
+        return len(self.locations)
+
+    def count(self, severity):
+        return self.by_severity.get(severity, 0)
+
+    def to_dict(self):
+        return {
+            'tool': self.tool,
+            'path': self.path,
+            'locations': [list(location) for location in self.locations],
+            'skipped': self.skipped
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        result = cls(data['tool'], data['path'])
+        for line, rule, severity, message in data['locations']:
+            result.add(line, rule, severity, message)
+        result.skipped = data.get('skipped', False)
+        return result
+
+    def __repr__(self):
+        return 'LintResult({0}, {1}, total={2})'.format(self.tool, self.path, self.total)
+
+
+def _local_name(tag):
+    """Strips XML namespace from tag name."""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _iter_xml_violations(stream, violation_tag):
+    """Iterates over <file> and violation elements of XML report, clearing
+    processed elements, so memory does not grow with report size.
+
+    Yields:
+        (file_name, element): file name and violation element.
+    """
+    current = None
+    context = ElementTree.iterparse(stream, events=('start', 'end'))
+    _, root = next(context)
+    for event, elem in context:
+        tag = _local_name(elem.tag)
+        if event == 'start':
+            if tag == 'file':
+                current = elem.get('name')
+            continue
+        if tag == violation_tag and current is not None:
+            yield current, elem
+        if tag in (violation_tag, 'file'):
+            if tag == 'file':
+                current = None
+            elem.clear()
+            root.clear()
+
+
+def parse_pmd(stream):
+    """Parses PMD XML report.
+
+    Args:
+        stream (file or str): report file object or path.
+
+    Returns:
+        results (dict of path: LintResult): violations per reported file.
+    """
+    results = {}
+    for name, elem in _iter_xml_violations(stream, 'violation'):
+        result = results.setdefault(name, LintResult('pmd', name))
+        result.add(_to_int(elem.get('beginline')), elem.get('rule', 'unknown'),
+                   elem.get('priority', 'unknown'), (elem.text or '').strip())
+    return results
+
+
+def parse_checkstyle(stream):
+    """Parses Checkstyle XML report.
+
+    Args:
+        stream (file or str): report file object or path.
+
+    Returns:
+        results (dict of path: LintResult): violations per reported file.
+    """
+    results = {}
+    for name, elem in _iter_xml_violations(stream, 'error'):
+        result = results.setdefault(name, LintResult('checkstyle', name))
+        source = elem.get('source', 'unknown')
+        result.add(_to_int(elem.get('line')), source.rsplit('.', 1)[-1],
+                   elem.get('severity', 'unknown'), elem.get('message', ''))
+    return results
+
+
+# Characters, that change nesting outside of strings, and characters, that
+# end or escape inside of strings.
+_JSON_STRUCTURE = re.compile(r'["\[\]{}]')
+_JSON_STRING_SPECIAL = re.compile(r'["\\]')
+_JSON_SCALAR_END = re.compile(r'[\s,\]]')
+
+
+class _ValueScanner(object):
+    """
+    This class finds end of JSON object, array or string, that is read in
+    parts. Every character is scanned once, so the value is decoded only
+    when it is complete, however many reads it takes.
+    """
+
+    def __init__(self, pos):
+        self.pos = pos
+        self.depth = 0
+        self.in_string = False
+
+    def scan(self, buf):
+        """Returns position after the end of value in buf, None if value
+        is not complete yet. Scanning continues from the same place, when
+        it is called again with more data.
+        """
+        pos = self.pos
+        while True:
+            if self.in_string:
+                match = _JSON_STRING_SPECIAL.search(buf, pos)
+                if match is None:
+                    self.pos = len(buf)
+                    return None
+                pos = match.start()
+                if buf[pos] == '\\':
+                    if pos + 1 >= len(buf):
+                        # Escaped character is in the next read.
+                        self.pos = pos
+                        return None
+                    pos += 2
+                    continue
+                self.in_string = False
+                pos += 1
+                if self.depth == 0:
+                    return pos
+                continue
+            match = _JSON_STRUCTURE.search(buf, pos)
+            if match is None:
+                self.pos = len(buf)
+                return None
+            pos = match.end()
+            char = match.group()
+            if char == '"':
+                self.in_string = True
+            elif char in '[{':
+                self.depth += 1
+            else:
+                self.depth -= 1
+                if self.depth == 0:
+                    return pos
+
+
+def iter_json_array(stream, key):
+    """Iterates over items of top-level JSON array without loading the
+    whole document.
+
+    Only one item is kept in memory at a time. Item is decoded once, when
+    all its data is read, so large items take linear time as well.
+
+    Args:
+        stream (file): JSON document.
+        key (str): name of top-level key with array value.
+
+    Yields:
+        item: decoded array items.
+
+    Raises:
+        ValueError: if array or its item is truncated or not valid.
+    """
+    # Tailor may write raw newlines inside strings, strict=False allows them.
+    decoder = json.JSONDecoder(strict=False)
+    key_pattern = re.compile(r'"{0}"\s*:\s*\['.format(re.escape(key)))
+    buf = ''
+    eof = False
+    pos = None
+    while pos is None:
+        chunk = stream.read(CHUNK_SIZE)
+        eof = not chunk
+        buf += chunk
+        match = key_pattern.search(buf)
+        if match:
+            pos = match.end()
+        elif eof:
+            return
+        else:
+            # Keep the tail, key may be split between chunks.
+            buf = buf[-(len(key) + 64):]
+
+    scanner = None
+    while True:
+        end = None
+        if scanner is None:
+            while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buf):
+                if buf[pos] == ']':
+                    return
+                if buf[pos] in '[{"':
+                    scanner = _ValueScanner(pos)
+                else:
+                    # Number, true, false or null.
+                    match = _JSON_SCALAR_END.search(buf, pos)
+                    end = match.start() if match else None
+        if scanner is not None:
+            end = scanner.scan(buf)
+        if end is None:
+            if eof:
+                raise ValueError('Array {0!r} is truncated.'.format(key))
+            # Read-ahead grows with pending item, so copying of large
+            # items takes linear time.
+            chunk = stream.read(max(CHUNK_SIZE, len(buf) - pos))
+            eof = not chunk
+            buf = buf[pos:] + chunk
+            if scanner is not None:
+                scanner.pos -= pos
+            pos = 0
+            continue
+        item, end = decoder.raw_decode(buf, pos)
+        yield item
+        pos = end
+        scanner = None
+
+
+def parse_tailor(stream):
+    """Parses Tailor JSON report ('tailor -f json').
+
+    Args:
+        stream (file): report file object.
+
+    Returns:
+        results (dict of path: LintResult): violations per reported file.
+    """
+    results = {}
+    for file_report in iter_json_array(stream, 'files'):
+        name = file_report['path']
+        result = results.setdefault(name, LintResult('tailor', name))
+        for violation in file_report.get('violations', []):
+            location = violation.get('location', {})
+            result.add(_to_int(location.get('line')), violation.get('rule', 'unknown'),
+                       violation.get('severity', 'unknown'), violation.get('message', ''))
+        result.skipped = not file_report.get('parsed', True)
+    return results
+
+
+def parse_golint(stream, unattributed=None):
+    """Parses golint output ('path:line:column: message' lines).
+
+    Args:
+        stream (file): golint output.
+        unattributed (list): if given, lines without path (errors of
+            golint itself, for example) are appended to it, otherwise
+            they are ignored.
+
+    Returns:
+        results (dict of path: LintResult): violations per reported file.
+    """
+    results = {}
+    for line in stream:
+        line = line.rstrip('\n')
+        parts = line.split(':', 3)
+        if len(parts) != 4 or _to_int(parts[1]) is None:
+            logger.debug('GoLint line is not attributed to any file: %s', line)
+            if unattributed is not None and line.strip():
+                unattributed.append(line)
+            continue
+        name, line_number, message = parts[0], _to_int(parts[1]), parts[3].strip()
+        results.setdefault(name, LintResult('golint', name)).add(line_number, 'golint', 'warning', message)
+    return results
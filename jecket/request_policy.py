@@ -0,0 +1,203 @@
+import logging
+import os
+import random
+import threading
+import time
+from email.utils import mktime_tz, parsedate_tz
+
+from jecket import metrics
+
+
+logger = logging.getLogger(__name__)
+
+# Methods, that are retried after any failure. Other requests (comment
+# create, update and delete) are retried only if they surely were not
+# processed: repeated PUT or DELETE with processed version gets 409 or
+# 404, repeated POST creates duplicate comment.
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Responses, that tell request was not processed.
+NOT_PROCESSED_STATUSES = (429,)
+
+
+class TokenBucket(object):
+    """
+    This class limits request rate of the whole process: every request
+    takes one token, tokens are refilled with constant rate.
+    """
+
+    def __init__(self, rate, capacity):
+        """
+        Args:
+            rate (float): tokens per second, 0 disables limit.
+            capacity (int): maximum burst size.
+        """
+        self.rate = float(rate)
+        self.capacity = float(max(capacity, 1))
+        self.tokens = self.capacity
+        self.updated = time.time()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Takes one token, sleeping until it is available.
+
+        Returns:
+            waited (float): seconds spent waiting.
+        """
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.time()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class RequestPolicy(object):
+    """
+    This class keeps timeouts and retry settings for BitBucket requests,
+    and process-wide rate limiter.
+    """
+
+    def __init__(self, connect_timeout=5.0, read_timeout=60.0, max_retries=4, backoff_base=0.5,
+                 backoff_max=30.0, retry_statuses=(429, 500, 502, 503, 504), rate=0.0, burst=10,
+                 retry_methods=IDEMPOTENT_METHODS):
+        """
+        Args:
+            connect_timeout (float): seconds to wait for connection.
+            read_timeout (float): seconds to wait for response data.
+            max_retries (int): number of retries after first attempt.
+            backoff_base (float): first backoff delay in seconds, it is
+                doubled with every retry.
+            backoff_max (float): maximum backoff delay and maximum accepted
+                Retry-After value.
+            retry_statuses (tuple of int): response codes, that are retried.
+            rate (float): requests per second for whole process, 0 means
+                no limit.
+            burst (int): number of requests, that can be sent at once.
+            retry_methods (tuple of str): methods, that are retried on
+                every retry_statuses response, timeout and connection
+                error.
+        """
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_statuses = tuple(retry_statuses)
+        self.bucket = TokenBucket(rate, burst)
+        self.retry_methods = tuple(method.upper() for method in retry_methods)
+
+    @property
+    def timeout(self):
+        """Timeout argument for requests."""
+        return self.connect_timeout, self.read_timeout
+
+    def backoff(self, attempt):
+        """Returns delay before retry number attempt (starting with 1):
+        exponential backoff with full jitter.
+        """
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1))))
+
+    def retry_after(self, response):
+        """Returns delay from Retry-After header (seconds or HTTP date), or None."""
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        try:
+            delay = float(value)
+        except ValueError:
+            parsed = parsedate_tz(value)
+            if parsed is None:
+                return None
+            delay = mktime_tz(parsed) - time.time()
+        return min(max(delay, 0.0), self.backoff_max)
+
+    def send(self, send, method, url):
+        """Sends request with rate limit, timeouts and retries.
+
+        Requests with retry_methods are retried on connection errors,
+        timeouts and retry_statuses responses. Other requests are retried
+        only if they surely were not processed: on connect timeout and
+        429. Other responses and the last attempt result are returned as
+        is.
+
+        Args:
+            send (callable): function, that takes timeout argument and
+                sends request, for example functools.partial of
+                session.get.
+            method (str): HTTP method, for logging.
+            url (str): request URL, for logging.
+
+        Returns:
+            response (requests.Response): last response.
+
+        Raises:
+            requests.RequestException: if the last attempt failed with
+                connection error or timeout.
+        """
+        from requests.exceptions import ChunkedEncodingError, ConnectionError, ConnectTimeout, Timeout
+
+        idempotent = method.upper() in self.retry_methods
+        retry_statuses = self.retry_statuses if idempotent else \
+            tuple(status for status in self.retry_statuses if status in NOT_PROCESSED_STATUSES)
+        attempt = 0
+        while True:
+            metrics.record_rate_limit_wait(self.bucket.acquire())
+            try:
+                response = send(timeout=self.timeout)
+            except (ConnectionError, Timeout, ChunkedEncodingError) as e:
+                if attempt >= self.max_retries or not (idempotent or isinstance(e, ConnectTimeout)):
+                    raise
+                delay = self.backoff(attempt + 1)
+                logger.warning('%s %s failed: %s. Retrying in %.2f s.', method, url, e, delay)
+            else:
+                if response.status_code not in retry_statuses or attempt >= self.max_retries:
+                    return response
+                delay = self.retry_after(response)
+                if delay is None:
+                    delay = self.backoff(attempt + 1)
+                logger.warning('%s %s returned %s. Retrying in %.2f s.', method, url, response.status_code, delay)
+            metrics.record_retry(method, url)
+            attempt += 1
+            time.sleep(delay)
+
+
+_policy = None
+_policy_lock = threading.Lock()
+
+
+def policy_from_environment():
+    """Creates RequestPolicy from JECKET_* environment variables."""
+    env = os.environ
+    return RequestPolicy(
+        connect_timeout=float(env.get('JECKET_CONNECT_TIMEOUT', 5.0)),
+        read_timeout=float(env.get('JECKET_READ_TIMEOUT', 60.0)),
+        max_retries=int(env.get('JECKET_MAX_RETRIES', 4)),
+        backoff_base=float(env.get('JECKET_BACKOFF_BASE', 0.5)),
+        backoff_max=float(env.get('JECKET_BACKOFF_MAX', 30.0)),
+        rate=float(env.get('JECKET_RATE_LIMIT', 0.0)),
+        burst=int(env.get('JECKET_RATE_BURST', 10)),
+    )
+
+
+def get_policy():
+    """Returns process-wide request policy, shared by all workers."""
+    global _policy
+    with _policy_lock:
+        if _policy is None:
+            _policy = policy_from_environment()
+    return _policy
+
+
+def set_policy(policy):
+    """Replaces process-wide request policy."""
+    global _policy
+    with _policy_lock:
+        _policy = policy
@@ -0,0 +1,164 @@
+import errno
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def git_blob_sha(path):
+    """Computes git blob SHA of file content, like 'git hash-object'."""
+    sha = hashlib.sha1()
+    sha.update('blob {0}\0'.format(os.path.getsize(path)))
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), ''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def fingerprint(values):
+    """Computes stable fingerprint of tool version or ruleset.
+
+    Values, that are paths to existing files, are replaced by SHA of
+    file content, so edited rules files give new fingerprint.
+
+    Args:
+        values (list of str): version strings, rule names or file paths.
+
+    Returns:
+        fingerprint (str): hex digest.
+    """
+    sha = hashlib.sha1()
+    for value in values:
+        sha.update(value)
+        if os.path.isfile(value):
+            with open(value, 'rb') as f:
+                for chunk in iter(lambda: f.read(65536), ''):
+                    sha.update(chunk)
+        sha.update('\0')
+    return sha.hexdigest()
+
+
+class ResultCache(object):
+    """
+    This class keeps static check results on disk, keyed by file content
+    and tool settings. Directory can be shared between several processes
+    and hosts: entries are written atomically and least recently used
+    entries are removed when cache grows over max_bytes.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Args:
+            directory (str): cache directory, created if missing.
+            max_bytes (int): cache size limit.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        try:
+            os.makedirs(directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+    @staticmethod
+    def key(blob_sha, tool, tool_version, ruleset):
+        """Returns cache key for file content checked by tool with ruleset."""
+        return hashlib.sha1('\0'.join([blob_sha, tool, tool_version, ruleset])).hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.directory, key[:2], '{0}.json'.format(key))
+
+    def get(self, key):
+        """Returns cached value or None.
+
+        Modification time of entry is updated on hit, it is used as
+        last access time for eviction.
+        """
+        path = self.entry_path(key)
+        try:
+            with open(path, 'r') as f:
+                value = json.load(f)
+            os.utime(path, None)
+        except (IOError, OSError, ValueError):
+            with self.lock:
+                self.misses += 1
+            return None
+        with self.lock:
+            self.hits += 1
+        logger.debug('Result cache hit: %s', key)
+        return value
+
+    def put(self, key, value):
+        """Stores value atomically: other processes see either old entry
+        or the whole new one.
+        """
+        path = self.entry_path(key)
+        directory = os.path.dirname(path)
+        try:
+            os.makedirs(directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                logger.warning('Can not create cache directory %s: %s', directory, e)
+                return
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(value, f)
+            os.rename(tmp_path, path)
+        except (IOError, OSError, TypeError, ValueError) as e:
+            logger.warning('Can not write cache entry %s: %s', path, e)
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def evict(self):
+        """Removes least recently used entries, until cache size is below
+        max_bytes.
+
+        Returns:
+            removed (int): number of removed entries.
+        """
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                # Already removed by another process.
+                pass
+            total -= size
+            removed += 1
+        if removed:
+            logger.info('Result cache: %s entries evicted.', removed)
+        return removed
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return float(self.hits) / lookups if lookups else 0.0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hit_rate}
@@ -0,0 +1,228 @@
+import logging
+import os
+import shutil
+import signal
+import tempfile
+import threading
+import time
+from subprocess import Popen, PIPE
+
+from jecket import metrics, profiling
+from jecket.logs import truncated
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 900.0
+DEFAULT_MAX_MEMORY = 1024 * 1024
+CHUNK_SIZE = 65536
+
+
+def tool_timeout(tool):
+    """Returns wall-clock timeout of tool in seconds: JECKET_<TOOL>_TIMEOUT,
+    JECKET_TOOL_TIMEOUT or DEFAULT_TIMEOUT. 0 disables timeout.
+    """
+    name = 'JECKET_{0}_TIMEOUT'.format(tool.upper().replace('-', '_').replace('+', '_'))
+    return float(os.environ.get(name) or os.environ.get('JECKET_TOOL_TIMEOUT') or DEFAULT_TIMEOUT)
+
+
+def max_memory():
+    """Returns number of output bytes kept in memory before spilling to
+    temporary file, JECKET_OUTPUT_MEMORY overrides default one.
+    """
+    return int(os.environ.get('JECKET_OUTPUT_MEMORY', DEFAULT_MAX_MEMORY))
+
+
+class CommandResult(object):
+    """
+    This class keeps result of command run. Output and error are file
+    objects positioned at the beginning, they are kept in memory up to
+    max_memory bytes and spilled to temporary files after that. Close
+    the result (or use it in with statement) to remove temporary files.
+    """
+
+    def __init__(self, args, code, duration, output, error, timed_out=False, parsed=None, parse_error=None):
+        """
+        Args:
+            args (list of str): command.
+            code (int): exit code, negative signal number if process was
+                killed, -1 if it was not started.
+            duration (float): wall time in seconds.
+            output (file): captured stdout, None if it was streamed to
+                parser.
+            error (file): captured stderr.
+            timed_out (bool): process was killed after timeout.
+            parsed: parser result, if parser was given.
+            parse_error (Exception): exception raised by parser.
+        """
+        self.args = args
+        self.code = code
+        self.duration = duration
+        self.output = output
+        self.error = error
+        self.timed_out = timed_out
+        self.parsed = parsed
+        self.parse_error = parse_error
+
+    @property
+    def ok(self):
+        return self.code == 0 and not self.timed_out and self.parse_error is None
+
+    @staticmethod
+    def _read(stream, limit):
+        if stream is None:
+            return ''
+        stream.seek(0)
+        text = stream.read() if limit is None else stream.read(limit)
+        stream.seek(0)
+        return text
+
+    def read_output(self, limit=None):
+        """Returns captured stdout, at most limit bytes."""
+        return self._read(self.output, limit)
+
+    def read_error(self, limit=None):
+        """Returns captured stderr, at most limit bytes."""
+        return self._read(self.error, limit)
+
+    def describe(self):
+        """Returns short description of failure for error results."""
+        if self.timed_out:
+            return 'timed out after {0:.1f} s'.format(self.duration)
+        if self.parse_error is not None:
+            return 'output is not valid: {0}'.format(self.parse_error)
+        return 'exit code {0}: {1}'.format(self.code, self.read_error(4096).strip())
+
+    def close(self):
+        for stream in (self.output, self.error):
+            if stream is not None:
+                stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        return 'CommandResult({0}, code={1}, duration={2:.3f}, timed_out={3})'.format(
+            self.args[0], self.code, self.duration, self.timed_out)
+
+
+def _spool():
+    return tempfile.SpooledTemporaryFile(max_size=max_memory(), prefix='jecket_output_')
+
+
+def _pump(source, target):
+    """Copies pipe to file object in chunks, until EOF."""
+    try:
+        with profiling.blocking('subprocess'):
+            shutil.copyfileobj(source, target, CHUNK_SIZE)
+    finally:
+        source.close()
+
+
+def _kill(proc):
+    """Kills process with its process group: tools are often started by
+    wrapper scripts (pmd/bin/run.sh), killing only the script would leave
+    java running.
+    """
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except OSError:
+        pass
+
+
+def run(args, tool=None, timeout=None, parser=None, cwd=None):
+    """Runs command without shell, captures or streams its output, and
+    kills it after timeout.
+
+    Args:
+        args (list of str): command and arguments.
+        tool (str): tool name for metrics and timeout settings, command
+            name by default.
+        timeout (float): wall-clock timeout in seconds, tool_timeout(tool)
+            by default, 0 disables timeout.
+        parser (callable): function, that takes stdout file object and
+            returns parsed report. Output is parsed while command runs
+            and is not captured.
+        cwd (str): working directory.
+
+    Returns:
+        result (CommandResult): structured result, caller closes it.
+    """
+    args = [str(arg) for arg in args]
+    tool = tool or os.path.basename(args[0])
+    timeout = tool_timeout(tool) if timeout is None else timeout
+    logger.debug('Executing command %s', truncated(' '.join(args)))
+    start = time.time()
+    output = None if parser is not None else _spool()
+    error = _spool()
+    try:
+        proc = Popen(args, stdout=PIPE, stderr=PIPE, cwd=cwd, close_fds=True, preexec_fn=os.setsid)
+    except OSError as e:
+        logger.exception('Error occurred while executing command %s.', args[0])
+        error.write(str(e))
+        result = CommandResult(args, -1, time.time() - start, output, error)
+        metrics.record_subprocess(tool, result.duration, result.code)
+        return result
+
+    timed_out = threading.Event()
+
+    def expire():
+        timed_out.set()
+        logger.error('Command %s did not finish in %s seconds, killing it.', args[0], timeout)
+        _kill(proc)
+
+    timer = threading.Timer(timeout, expire) if timeout > 0 else None
+    pumps = [threading.Thread(target=_pump, args=(proc.stderr, error))]
+    if parser is None:
+        pumps.append(threading.Thread(target=_pump, args=(proc.stdout, output)))
+    for pump in pumps:
+        pump.daemon = True
+        pump.start()
+    if timer is not None:
+        timer.daemon = True
+        timer.start()
+
+    parsed = parse_error = code = None
+    try:
+        if parser is not None:
+            try:
+                parsed = parser(proc.stdout)
+            except Exception as e:
+                # ElementTree.ParseError is subclass of SyntaxError, errors
+                # of parser itself are reported as invalid output as well.
+                parse_error = e
+            # Drain the rest, otherwise command blocks on full pipe.
+            with open(os.devnull, 'w') as devnull:
+                _pump(proc.stdout, devnull)
+        with profiling.blocking('subprocess'):
+            for pump in pumps:
+                pump.join()
+            code = proc.wait()
+    finally:
+        if timer is not None:
+            timer.cancel()
+            timer.join()
+        if code is None:
+            # Interrupted before command finished, do not leave it running.
+            _kill(proc)
+            proc.wait()
+            for pump in pumps:
+                pump.join()
+            proc.stdout.close()
+            for stream in (output, error):
+                if stream is not None:
+                    stream.close()
+
+    for stream in (output, error):
+        if stream is not None:
+            stream.seek(0)
+    # Output of killed command is incomplete, whatever parser returned.
+    result = CommandResult(args, code, time.time() - start, output, error, timed_out.is_set(),
+                           None if timed_out.is_set() else parsed, parse_error)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('Command %s finished: %s, error: %s', args[0], result, truncated(result.read_error()))
+    metrics.record_subprocess(tool, result.duration, -1 if result.timed_out else code)
+    return result
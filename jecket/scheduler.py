@@ -0,0 +1,205 @@
+import errno
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+
+from jecket import metrics
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 50000
+# Share of new measurement in expected duration.
+SMOOTHING = 0.5
+# Cost of one line for tools without history, only order of files matters
+# until the first measurements are recorded.
+DEFAULT_SECONDS_PER_LINE = 0.001
+# Job counts, predicted makespan is reported for.
+SIZING_JOBS = (1, 2, 4, 8, 16, 32)
+
+
+def history_file():
+    """Returns path of duration history from JECKET_HISTORY_FILE, None if
+    it is not set. History is opt-in: it has to be on a path, that
+    survives workspace cleanup and is private to the agent.
+    """
+    path = os.environ.get('JECKET_HISTORY_FILE')
+    return os.path.expanduser(path) if path else None
+
+
+class DurationHistory(object):
+    """
+    This class keeps smoothed durations of previous checks per tool and
+    file. Durations depend on agent hardware, so history is local to the
+    agent, it is not stored in shared result cache. Files without history
+    are estimated by their size in lines and average time per line of the
+    tool.
+    """
+
+    def __init__(self, path=None, size=None, max_entries=None):
+        """
+        Args:
+            path (str): history file, loaded if it exists.
+            size (callable): returns size of file in lines, for files
+                without history.
+            max_entries (int): number of kept entries, JECKET_HISTORY_SIZE
+                or DEFAULT_MAX_ENTRIES by default. Least recently updated
+                entries are dropped.
+        """
+        self.path = path
+        self.size = size
+        self.max_entries = max_entries or int(os.environ.get('JECKET_HISTORY_SIZE', DEFAULT_MAX_ENTRIES))
+        self.lock = threading.Lock()
+        # 'tool\0path' -> [seconds, lines, updated]
+        self.entries = self._load() if path else {}
+        self.updated = set()
+        self._rates = {}
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                entries = json.load(f)
+        except (IOError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    @staticmethod
+    def key(tool, path):
+        return '{0}\0{1}'.format(tool, path)
+
+    def _lines(self, path):
+        try:
+            return self.size(path) if self.size is not None else 0
+        except (IOError, OSError):
+            return 0
+
+    def seconds_per_line(self, tool):
+        """Returns average time per line of tool over its history."""
+        with self.lock:
+            if tool not in self._rates:
+                prefix = tool + '\0'
+                seconds = lines = 0
+                for key, (entry_seconds, entry_lines, _) in self.entries.items():
+                    if key.startswith(prefix) and entry_lines:
+                        seconds += entry_seconds
+                        lines += entry_lines
+                self._rates[tool] = float(seconds) / lines if lines else DEFAULT_SECONDS_PER_LINE
+            return self._rates[tool]
+
+    def expected(self, tool, path):
+        """Returns expected duration of check of file by tool in seconds."""
+        with self.lock:
+            entry = self.entries.get(self.key(tool, path))
+        if entry is not None:
+            return entry[0]
+        return self._lines(path) * self.seconds_per_line(tool)
+
+    def record(self, tool, path, seconds):
+        """Records measured duration of check of file by tool."""
+        lines = self._lines(path)
+        key = self.key(tool, path)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                seconds = SMOOTHING * seconds + (1 - SMOOTHING) * entry[0]
+            self.entries[key] = [seconds, lines, time.time()]
+            self.updated.add(key)
+            self._rates.pop(tool, None)
+
+    def save(self):
+        """Writes history atomically. Entries, that other runs wrote since
+        history was loaded, are kept, unless this run updated them too.
+        """
+        if not self.path or not self.updated:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            os.makedirs(directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                logger.warning('Can not create history directory %s: %s', directory, e)
+                return
+        with self.lock:
+            entries = self._load()
+            entries.update((key, self.entries[key]) for key in self.updated)
+            if len(entries) > self.max_entries:
+                newest = sorted(entries.items(), key=lambda item: item[1][2], reverse=True)[:self.max_entries]
+                entries = dict(newest)
+            try:
+                metrics.write_atomically(self.path, json.dumps(entries, separators=(',', ':')))
+            except (IOError, OSError) as e:
+                logger.warning('Can not write duration history %s: %s', self.path, e)
+                return
+            self.updated = set()
+        logger.debug('Duration history saved: %s entries.', len(entries))
+
+
+def makespan(costs, jobs):
+    """Returns wall time of list scheduling: every job is started by the
+    first free worker, in order of costs.
+
+    Args:
+        costs (list of float): expected durations in start order.
+        jobs (int): number of workers.
+    """
+    workers = [0.0] * max(min(jobs, len(costs)), 1)
+    for cost in costs:
+        heapq.heapreplace(workers, workers[0] + cost)
+    return max(workers)
+
+
+def run_scheduled(func, items, jobs=1, cost=None, record=None, name='files'):
+    """Calls func for every item with a pool of worker threads, starting
+    items with the longest expected duration first, so a few huge files
+    do not run alone at the end.
+
+    Args:
+        func (callable): function of one item.
+        items (list): arguments for func.
+        jobs (int): number of worker threads.
+        cost (callable): expected duration of item in seconds.
+        record (callable): called with item, measured duration and result
+            after every call.
+        name (str): schedule name for logs and metrics.
+
+    Returns:
+        results (list): results in order of items.
+    """
+    costs = [cost(item) for item in items] if cost is not None else [0.0] * len(items)
+    order = sorted(range(len(items)), key=lambda index: (-costs[index], index))
+    predicted = makespan([costs[index] for index in order], jobs)
+
+    def timed(index):
+        start = time.time()
+        result = func(items[index])
+        if record is not None:
+            record(items[index], time.time() - start, result)
+        return result
+
+    start = time.time()
+    if jobs > 1 and len(items) > 1:
+        pool = ThreadPool(processes=min(jobs, len(items)))
+        try:
+            ordered = pool.map(timed, order, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        ordered = [timed(index) for index in order]
+    actual = time.time() - start
+
+    results = [None] * len(items)
+    for index, result in zip(order, ordered):
+        results[index] = result
+    sizing = dict((sizing_jobs, makespan([costs[index] for index in order], sizing_jobs))
+                  for sizing_jobs in SIZING_JOBS)
+    logger.info('Schedule %s: %s jobs on %s workers, predicted makespan %.1f s, actual %.1f s.',
+                name, len(items), jobs, predicted, actual)
+    logger.debug('Predicted makespan of %s by number of workers: %s', name,
+                 ', '.join('{0}: {1:.1f} s'.format(key, value) for key, value in sorted(sizing.items())))
+    metrics.record_schedule(name, jobs, len(items), predicted, actual, sizing)
+    return results
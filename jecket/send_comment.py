@@ -1,6 +1,7 @@
 import logging
 
 import jecket
+from jecket.logs import truncated
 
 
 logger = logging.getLogger(__name__)
@@ -8,9 +9,11 @@ logger = logging.getLogger(__name__)
 
 def main(comment):
     pr = jecket.PRState()
-    logger.info('Sending comment {} to pull request.'.format(comment))
+    logger.info('Sending comment to pull request.')
+    logger.debug('Comment text: %s', truncated(comment))
     code, content = pr.send_comment(comment=comment)
-    logger.info('Comment to pull request sent. Code: {0}, content: {1}'.format(code, content))
+    logger.info('Comment to pull request sent. Code: %s', code)
+    logger.debug('Response content: %s', truncated(content))
 
 
 if __name__ == '__main__':
@@ -1,11 +1,22 @@
-conf_file = '/tmp/jecket.conf'
+import yaml
+
+from jecket import config
+from jecket.config import DEFAULT_CONFIG_PATH
+
+
+conf_file = DEFAULT_CONFIG_PATH
 
 
 def main(args):
+    settings = {
+        'base_link': args.base_link,
+        'username': args.username,
+        'password': args.password
+    }
     with open(conf_file, 'w+') as f:
-        f.write('{0}\n'
-                '{1}\n'
-                '{2}\n'.format(args.base_link, args.username, args.password))
+        yaml.safe_dump(settings, f, default_flow_style=False)
+    # Commands run later in this process read the new file.
+    config.reset()
     print 'Configuration file has been created.'
 
 
@@ -2,6 +2,7 @@ import logging
 import os
 
 import jecket
+from jecket.logs import truncated
 
 
 logger = logging.getLogger(__name__)
@@ -11,11 +12,11 @@ def main(status):
     pr = jecket.PRState()
     key = os.environ.get('JOB_NAME', 'Custom BUILD_TAG')
     url = os.environ.get('BUILD_URL', 'http://custombuildurl.com')
-    logger.debug('Pull Request status:{0}, key:{1}, url:{2}'.format(status, key, url))
+    logger.debug('Pull Request status:%s, key:%s, url:%s', status, key, url)
     logger.info('Trying to set pull request status...')
     code, message = pr.send_build_status(status, key, url)
-    logger.debug('Finished. Code: {0}, message: {1}'.format(code, message))
-    logger.info('Returned status: {}'.format(code))
+    logger.debug('Finished. Code: %s, message: %s', code, truncated(message))
+    logger.info('Returned status: %s', code)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,106 @@
+import heapq
+import logging
+import os
+from subprocess import Popen, PIPE
+
+from jecket.jecket_exceptions import GitCommandException
+
+
+logger = logging.getLogger(__name__)
+
+
+def parse_shard(value):
+    """Parses --shard value 'i/N' (1 <= i <= N).
+
+    Returns:
+        shard (tuple of (index, count)): zero-based shard index and number
+            of shards.
+
+    Raises:
+        ValueError: if value is not valid.
+    """
+    try:
+        index, count = [int(part) for part in value.split('/')]
+    except ValueError:
+        raise ValueError('Shard must be i/N, for example 2/4, got {0!r}.'.format(value))
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError('Shard index must be between 1 and {0}, got {1!r}.'.format(count, value))
+    return index - 1, count
+
+
+def tracked_files():
+    """Lists files tracked by git under current directory with one
+    'git ls-files -z' run.
+
+    Returns:
+        files (list of str): relative paths.
+
+    Raises:
+        GitCommandException: if git exited with non-zero code.
+    """
+    cmd = ['git', 'ls-files', '-z']
+    logger.debug('Executing command %s', ' '.join(cmd))
+    proc = Popen(cmd, stdout=PIPE)
+    files = [path for path in proc.stdout.read().split('\0') if path]
+    code = proc.wait()
+    if code != 0:
+        raise GitCommandException(cmd, code)
+    return files
+
+
+def head_commit():
+    """Returns SHA of checked out commit, None outside of git repository."""
+    proc = Popen(['git', 'rev-parse', '--verify', '-q', 'HEAD'], stdout=PIPE, stderr=PIPE)
+    out, _ = proc.communicate()
+    return out.strip() if proc.returncode == 0 and out.strip() else None
+
+
+def file_size(path):
+    """Returns file size in bytes, 0 for files missing in working tree."""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def partition(files, count, weight=file_size):
+    """Splits files into count shards with equal total weight, using
+    longest processing time first: the heaviest file goes to the lightest
+    shard. Ties are broken by path and shard index, so every agent gets
+    the same partition of the same tree.
+
+    Args:
+        files (list of str): files to split.
+        count (int): number of shards.
+        weight (callable): cost of file, its size by default.
+
+    Returns:
+        shards (list of list of str): files of every shard, sorted by path.
+    """
+    weights = dict((path, weight(path)) for path in files)
+    shards = [[] for _ in range(count)]
+    loads = [(0, index) for index in range(count)]
+    for path in sorted(weights, key=lambda path: (-weights[path], path)):
+        load, index = heapq.heappop(loads)
+        shards[index].append(path)
+        heapq.heappush(loads, (load + weights[path], index))
+    for shard in shards:
+        shard.sort()
+    return shards
+
+
+def shard_files(files, shard, weight=file_size):
+    """Returns files of one shard.
+
+    Args:
+        files (list of str): all files.
+        shard (tuple of (index, count)): see parse_shard, None for all
+            files.
+        weight (callable): see partition.
+    """
+    if shard is None:
+        return sorted(files)
+    index, count = shard
+    selected = partition(files, count, weight)[index]
+    logger.info('Shard %s/%s: %s of %s files.', index + 1, count, len(selected), len(files))
+    return selected
@@ -1,38 +1,58 @@
-import json
 import logging
 import os
-from subprocess import Popen, PIPE
+import re
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from distutils.spawn import find_executable
+from multiprocessing.pool import ThreadPool
 
 import jecket
+from jecket import artifacts, git_changes, http_pool, hunks, metrics, reconcile, runner, scheduler, sharding
+from jecket.concurrent_client import ConcurrentClient
+from jecket.config import get_config
+from jecket.logs import truncated
+from jecket.reports import LintResult, parse_checkstyle, parse_golint, parse_pmd, parse_tailor
+from jecket.result_cache import ResultCache, fingerprint, git_blob_sha
 
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_PMD_RULES = 'java-codesize,java-empty,java-imports,java-strings'
+DEFAULT_CHECKSTYLE_RULES = './infotech.xml'
+# Number of files per linter run in full project batch mode, keeps
+# command lines and reports of huge projects in bounds.
+DEFAULT_BATCH_SIZE = 500
+GO_PACKAGE = re.compile(r'^package\s+(\w+)')
 
-def execute_linux_command(cmd):
-    """The function creates a subprocess to execute linux command, then
-    returns the execution code and the result.
+# Existing comments of checked pull request, built once by check_pr.
+# If None, comments are requested for every file separately.
+pr_comment_index = None
+# ResultCache with results of previous runs, if cache is enabled.
+result_cache = None
+# ResultCache with commit lists of pull requests, keyed by head commit.
+commits_cache = None
+# HunkIndex of pull request, if only violations on changed lines are
+# reported.
+changed_lines = None
+# DurationHistory of previous checks, files with the longest expected
+# check are started first. None if history is disabled.
+duration_history = None
 
-    Args:
-        cmd: shell command
+
+def tailor_bin():
+    """The function returns path to Tailor executable, TAILOR_BIN
+    environment variable overrides default one.
     """
-    result = (-1, 'Unknown Error.')
-    logger.debug('Executing command {}'.format(cmd))
-    try:
-        proc = Popen(cmd, stderr=PIPE, stdout=PIPE, shell=True)
-        out, err = proc.communicate()
-        code = proc.returncode
-    except Exception as e:
-        logger.exception('Error occurred while executing command {}.'.format(cmd))
-        result = (-1, e)
-    else:
-        logger.debug('Command code: {0}, result: {1}, error: {2}'.format(code, out, err))
-        if code != 0:
-            result = (code, err)
-        elif code == 0:
-            result = (code, out)
-    finally:
-        return result
+    return os.environ.get('TAILOR_BIN', '/usr/local/bin/tailor')
+
+
+def rules_setting(key, default):
+    """The function returns rules setting from config (PMD_RULES and
+    CHECKSTYLE_RULES environment variables override it) or default.
+    """
+    return get_config(jecket.PRFile.config, required=False).get(key, default)
 
 
 def send_file_results(target_file, results):
@@ -49,89 +69,85 @@ def send_file_results(target_file, results):
                 error_value (int): Number of errors if this type.
             }
     """
-    logger.debug('Sending results for file {}.'.format(target_file))
+    logger.debug('Sending results for file %s.', target_file)
     file_comments = jecket.PRFile(checked_file=target_file)
-    code, message = file_comments.send_static_check_results(results)
+    code, message = file_comments.send_static_check_results(results, pr_comment_index)
     logger.info('Sending results finished.')
-    logger.debug(
-        'Sending results finished. Output: code: {0}, content: {1}'.format(
-            code, message))
+    logger.debug('Sending results finished. Output: code: %s, content: %s', code, truncated(message))
     return code, message
 
 
-def static_check_java(file_to_check, cmd, report_flag, check_type):
-    """Function executes command, that generate report file (cmd)
-        and counts lines with that contains special line (report_flag).
+def attribute_results(files_to_check, reports, tool):
+    """Function maps parsed report entries back to checked files.
+
+    Tools report absolute or relative paths, so paths are compared
+    after os.path.abspath. Files, that are missing in report, get empty
+    results. If changed_lines is set, only violations on changed lines
+    are kept.
 
     Args:
-        file_to_check (str): Relative path to report file.
-        cmd (str): Linux command, that needs to be executed.
-        report_flag (str): String, that indicates violation.
-        check_type (str): Type of static check.
-    """
-    code, result = execute_linux_command(cmd)
-    if code != 0:
-        count = (-1, 'Error while executing static check: {}'.format(result))
-    else:
-        i = 0
-        logger.debug(
-            'Trying to count errors in file {0}_{1}.xml'.format(file_to_check,
-                                                                check_type))
-        with open('{0}_{1}.xml'.format(file_to_check, check_type), 'r') as f:
-            for line in f:
-                if report_flag in line:
-                    i += 1
-        count = i
-    return count
+        files_to_check (list of str): Relative paths to checked files.
+        reports (dict of path: LintResult): parsed report.
+        tool (str): Name of static check tool.
 
+    Returns:
+        results (dict of file: LintResult): result for every checked file.
+    """
+    by_path = dict((os.path.abspath(checked_file), checked_file) for checked_file in files_to_check)
+    results = dict((checked_file, LintResult(tool, checked_file)) for checked_file in files_to_check)
+    for name, report in reports.items():
+        checked_file = by_path.get(os.path.abspath(name))
+        if checked_file is None:
+            logger.debug('Report of %s contains unexpected file %s.', tool, name)
+            continue
+        report.path = checked_file
+        results[checked_file] = report
+    if changed_lines is not None:
+        results = dict((checked_file, changed_lines.filter(result)) for checked_file, result in results.items())
+    return results
 
-def static_check_swift(cmd, result_file):
-    """Function is loads file with Tailor report in JSON format
-    to string and returns summary section.
 
-     Args:
-         cmd (str): Linux command to invoke. Basically it executes
-            Tailor with '-f json' argument.
-         result_file (str): Relative path to file with Tailor output.
-            File must be created by invoking 'cmd' command and must
-            contain Tailor check results in JSON format.
+def static_check_report(files_to_check, cmd, report_file, parser, tool):
+    """Function executes command, that generates report file (cmd),
+        and parses the report with one of jecket.reports parsers.
+
+    Args:
+        files_to_check (list of str): Relative paths to checked files.
+        cmd (list of str): Command and arguments.
+        report_file (str): Relative path to report file, or None, if
+            command writes report to stdout. Stdout is parsed while
+            command runs.
+        parser (callable): Function, that takes report file object and
+            returns dictionary of path: LintResult.
+        tool (str): Name of static check tool.
 
     Returns:
-        If return code ('code') equal 200 or 204:
-        count (dict of title: value):
-            title (str): Type of violation.
-            value (str): Number of violations of this type in file.
-        If return code ('code') not equal 200 or 204 or
-            exception occurred:
-        count (tuple of (status, error)):
-            status (int): Error code.
-            error (str): Error description.
-    """
-    code, result = execute_linux_command(cmd)
-
-    if code != 0:
-        count = (-1, 'Error while executing static check: {}'.format(result))
-    else:
-        logger.debug('Trying to count errors in file {}'.format(result_file))
-        try:
-            with open(result_file, 'r') as f:
-                result_json = f.read().replace('\n', '')
-        except IOError as e:
-            logger.debug(
-                'Error while processing file {0}: {1}'.format(result_file, e))
-            count = (-1, e)
-        else:
-            try:
-                report = json.loads(result_json)
-            except ValueError as e:
-                logger.debug(
-                    'JSON loads operation is ended with error: {0}'.format(e))
-                count = (-1, e)
-            else:
-                count = report['summary']
-                logger.debug('Tailor summary: {0}'.format(count))
+        results (dict of file: result): result is LintResult, or
+            (-1, error) tuple, if command or report parsing failed.
+    """
+    with runner.run(cmd, tool, parser=parser if report_file is None else None) as result:
+        if not result.ok:
+            error = (-1, 'Error while executing static check: {}'.format(result.describe()))
+            return dict((checked_file, error) for checked_file in files_to_check)
+    if report_file is None:
+        return attribute_results(files_to_check, result.parsed, tool)
 
-    return count
+    logger.debug('Trying to count errors in file %s', report_file)
+    try:
+        with open(report_file, 'r') as f:
+            reports = parser(f)
+    except (IOError, ValueError, SyntaxError) as e:
+        # ElementTree.ParseError is subclass of SyntaxError.
+        logger.debug('Error while processing file %s: %s', report_file, e)
+        return dict((checked_file, (-1, e)) for checked_file in files_to_check)
+    return attribute_results(files_to_check, reports, tool)
+
+
+def violations_count(result):
+    """Returns total number of violations, or error tuple as is."""
+    if type(result) == tuple:
+        return result
+    return result.total
 
 
 def count_lines(filename):
@@ -139,180 +155,901 @@ def count_lines(filename):
     with open(filename) as f:
         for i, _ in enumerate(f):
             pass
-        logger.debug('File line enumerate counter result: {}'.format(i))
+        logger.debug('File line enumerate counter result: %s', i)
     return i + 1
 
 
-def java_file_handler(changed_file):
-    """The function performs PMD and Checkstyle checks for a .java file,
-    and returns the results.
+def batch_file(suffix):
+    """The function creates empty temporary file for batch linter run.
+    Several batches can run at once (full project scan, several
+    processes in one workspace), so every run gets its own files.
+    """
+    fd, path = tempfile.mkstemp(prefix='jecket_batch_', suffix=suffix)
+    os.close(fd)
+    return path
+
+
+def remove_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.debug('Can not remove %s: %s', path, e)
+
+
+def java_lint_results(changed_files):
+    """The function performs PMD and Checkstyle checks for .java files.
+    Both tools are started once for all files. Reports of a single file
+    are written next to it, reports of several files are temporary.
+
+    Args:
+        changed_files (list of str): .java files
+
+    Returns:
+        pmd, checkstyle (dict of file: LintResult or error tuple): results
+            of both tools.
+    """
+    temporary = []
+    try:
+        if len(changed_files) == 1:
+            sources = ['-d', changed_files[0]]
+            pmd_report = '{0}_pmd.xml'.format(changed_files[0])
+            checkstyle_report = '{0}_checkstyle.xml'.format(changed_files[0])
+        else:
+            temporary = [batch_file('_pmd.list'), batch_file('_pmd.xml'), batch_file('_checkstyle.xml')]
+            file_list, pmd_report, checkstyle_report = temporary
+            with open(file_list, 'w') as f:
+                f.write(','.join(changed_files))
+            sources = ['-filelist', file_list]
+
+        # PMD check: #####
+        pmd_rules = rules_setting('pmd_rules', DEFAULT_PMD_RULES)
+        cmd = (['pmd/bin/run.sh', 'pmd', '-l', 'java', '--failOnViolation', 'false', '-f', 'xml', '-r',
+                pmd_report] + sources + ['-R', pmd_rules])
+        pmd = static_check_report(changed_files, cmd, pmd_report, parse_pmd, 'pmd')
+        logger.debug('PMD results: %s', truncated(pmd))
+
+        # Checkstyle_check #####
+        checkstyle_rules = rules_setting('checkstyle_rules', DEFAULT_CHECKSTYLE_RULES)
+        cmd = ['java', '-jar', 'checkstyle.jar', '-f', 'xml', '-o', checkstyle_report, '-c', checkstyle_rules] + \
+            changed_files
+        checkstyle = static_check_report(changed_files, cmd, checkstyle_report, parse_checkstyle, 'checkstyle')
+        logger.debug('Checkstyle results: %s', truncated(checkstyle))
+    finally:
+        remove_files(temporary)
+    return pmd, checkstyle
+
+
+def java_batch_results(changed_files):
+    """The function performs PMD and Checkstyle checks for many .java files
+    with one PMD run and one Checkstyle run.
 
     Args:
-        changed_file: .java file
+        changed_files (list of str): .java files
+
+    Returns:
+        results (dict of file: result): result for send_file_results.
     """
+    pmd, checkstyle = java_lint_results(changed_files)
+    results = {}
+    for changed_file in changed_files:
+        # Aggregating results:
+        results[changed_file] = {
+            'PMD errors: ': violations_count(pmd[changed_file]),
+            'Checkstyle errors: ': violations_count(checkstyle[changed_file])
+        }
+    return results
 
-    # PMD check: #####
 
-    pmd_rules = os.environ.get('PMD_RULES', 'java-codesize,java-empty,java-imports,java-strings')
-    cmd = (
-        'pmd/bin/run.sh pmd -l java --failOnViolation false -f xml -r {0}_pmd.xml -d {0} -R {1}'
-        .format(changed_file, pmd_rules)
+def tailor_results(tailor_result):
+    """The function converts Tailor result into results for
+    send_file_results, or returns error tuple as is.
+    """
+    if type(tailor_result) == tuple:
+        return tailor_result
+    tailor_message = (
+            'violations: {0}, errors: {1}, warnings: {2}, skipped: {3}'
+            .format(tailor_result.total, tailor_result.count('error'),
+                    tailor_result.count('warning'),
+                    1 if tailor_result.skipped else 0)
     )
+    return {'Tailor Swift reports:': tailor_message}
 
-    # XML tag for violations
-    violations = '</violation>'
-    pmd_count = static_check_java(changed_file, cmd, violations, 'pmd')
-    logger.debug('PMD count for file {0}: {1}'.format(changed_file, pmd_count))
-
-    # Checkstyle_check #####
-    checkstyle_rules = os.environ.get('CHECKSTYLE_RULES', './infotech.xml')
-    cmd = 'java -jar checkstyle.jar -f xml -o {0}_checkstyle.xml -c {1} {0}'.format(
-        changed_file, checkstyle_rules)
-
-    violations = '<error'
-    checkstyle_count = static_check_java(changed_file, cmd, violations,
-                                         'checkstyle')
-    logger.debug('Checkstyle count for file {0}: {1}'.format(changed_file,
-                                                             checkstyle_count))
-    # Aggregating results:
-    result = {
-        'PMD errors: ': pmd_count,
-        'Checkstyle errors: ': checkstyle_count
-    }
-
-    code, message = send_file_results(changed_file, result)
-    return code, message
 
+def swift_lint_results(changed_files):
+    """The function performs Tailor check for .swift files with one
+    Tailor run.
 
-def swift_file_handler(changed_file):
-    """The function performs Tailor check for a .swift file and returns
-    the report.
+    Args:
+        changed_files (list of str): .swift files
+
+    Returns:
+        results (dict of file: LintResult or error tuple).
+    """
+    # Tailor writes report to stdout, it is parsed while Tailor runs.
+    cmd = [tailor_bin(), '-f', 'json'] + changed_files
+    return static_check_report(changed_files, cmd, None, parse_tailor, 'tailor')
+
+
+def swift_batch_results(changed_files):
+    """The function performs Tailor check for many .swift files with one
+    Tailor run.
 
     Args:
-        changed_file: .swift file
+        changed_files (list of str): .swift files
+
+    Returns:
+        results (dict of file: result): result for send_file_results or
+            (-1, error) tuple.
     """
-    tailor_file = 'tailor_{0}.json'.format(changed_file.replace('/', '_'))
-    cmd = '/usr/local/bin/tailor -f json {0}  > {1}'.format(changed_file,
-                                                            tailor_file)
+    lint_results = swift_lint_results(changed_files)
+    return dict((changed_file, tailor_results(result)) for changed_file, result in lint_results.items())
 
-    tailor_count = static_check_swift(cmd, tailor_file)
 
-    if type(tailor_count) == tuple:
-        logger.debug('Error while tailoring file {0}: {1}'.format(changed_file,
-                                                                  tailor_count[
-                                                                      1]))
-        code, message = (-1, tailor_count[1])
-    else:
-        logger.debug('Tailor results for file {0}: {1}'.format(changed_file,
-                                                               tailor_count))
-        tailor_message = (
-                'violations: {0}, errors: {1}, warnings: {2}, skipped: {3}'
-                .format(tailor_count['violations'], tailor_count['errors'],
-                        tailor_count['warnings'],
-                        tailor_count['skipped'])
-        )
-        result = {'Tailor Swift reports:': tailor_message}
-        code, message = send_file_results(changed_file, result)
-    return code, message
+def go_package(path):
+    """The function returns package name from package clause of .go file,
+    None if file can not be read or has no package clause.
+    """
+    in_comment = False
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if in_comment:
+                    if '*/' not in line:
+                        continue
+                    line = line.split('*/', 1)[1].strip()
+                    in_comment = False
+                if line.startswith('/*') and '*/' not in line:
+                    in_comment = True
+                    continue
+                match = GO_PACKAGE.match(line)
+                if match is not None:
+                    return match.group(1)
+                if line and not line.startswith(('//', '/*')):
+                    return None
+    except (IOError, OSError) as e:
+        logger.debug('Can not read package clause of %s: %s', path, e)
+    return None
 
 
-def go_file_handler(changed_file):
-    """The function performs Golint check for a .go file and returns
-    the report.
+def go_lint_results(changed_files):
+    """The function performs Golint check for .go files with one golint
+    run per package (golint accepts files of a single package, and
+    external test package 'x_test' shares directory with package 'x').
+    Every report line starts with file path, so lines are attributed back
+    to files.
 
     Args:
-        changed_file: .go file
-    """
-    report_file = '{0}.golint'.format(changed_file.replace('/', '_'))
-    cmd = 'golint -min_confidence 0.1 {0} > {1} 2>&1'.format(changed_file,
-                                                             report_file)
-    execute_linux_command(cmd)
-    golint_count = count_lines(report_file)
-    golint_message = 'Violations: {0}'.format(golint_count)
-    logger.debug('GoLint message: {0}'.format(golint_message))
-    result = {'GoLint reports:': golint_message}
-    code, message = send_file_results(changed_file, result)
-    return code, message
+        changed_files (list of str): .go files
+
+    Returns:
+        results (dict of file: LintResult or error tuple): error tuple for
+            all files of package, if golint could not be started, timed
+            out, or printed errors, that do not belong to any file.
+    """
+    packages = {}
+    for changed_file in changed_files:
+        key = (os.path.dirname(changed_file), go_package(changed_file))
+        packages.setdefault(key, []).append(changed_file)
+
+    results = {}
+    for _, package_files in sorted(packages.items()):
+        cmd = ['golint', '-min_confidence', '0.1'] + package_files
+        with runner.run(cmd, 'golint', parser=parse_golint) as result:
+            failure = None
+            if result.timed_out or result.code == -1 or result.parse_error is not None:
+                failure = result.describe()
+            else:
+                reports = result.parsed
+                unattributed = []
+                for name, report in parse_golint(result.error, unattributed).items():
+                    merged = reports.setdefault(name, LintResult('golint', name))
+                    for line, rule, severity, message in report.locations:
+                        merged.add(line, rule, severity, message)
+                if unattributed:
+                    failure = '; '.join(unattributed)[:4096]
+            if failure is not None:
+                error = (-1, 'Error while executing static check: {0}'.format(failure))
+                results.update((package_file, error) for package_file in package_files)
+                continue
+        results.update(attribute_results(package_files, reports, 'golint'))
+    return results
+
+
+def go_batch_results(changed_files):
+    """The function performs Golint check for many .go files.
+
+    Args:
+        changed_files (list of str): .go files
+
+    Returns:
+        results (dict of file: result): result for send_file_results or
+            (-1, error) tuple.
+    """
+    results = {}
+    for changed_file, golint_result in go_lint_results(changed_files).items():
+        if type(golint_result) == tuple:
+            results[changed_file] = golint_result
+            continue
+        golint_message = 'Violations: {0}'.format(golint_result.total)
+        logger.debug('GoLint message for file %s: %s', changed_file, golint_message)
+        results[changed_file] = {'GoLint reports:': golint_message}
+    return results
+
+
+def tool_fingerprint(paths):
+    """Fingerprint of tool installation: content of tool files and names
+    of files in tool directories (jar names contain versions).
+    """
+    values = []
+    for path in paths:
+        if path is None:
+            continue
+        values.append(path)
+        if os.path.isdir(path):
+            values.extend(sorted(os.listdir(path)))
+    return fingerprint(values)
+
+
+def java_signature():
+    return ('pmd+checkstyle', tool_fingerprint(['pmd/bin/run.sh', 'pmd/lib', 'checkstyle.jar']),
+            fingerprint([rules_setting('pmd_rules', DEFAULT_PMD_RULES),
+                         rules_setting('checkstyle_rules', DEFAULT_CHECKSTYLE_RULES)]))
+
+
+def swift_signature():
+    return 'tailor', tool_fingerprint([tailor_bin()]), ''
+
+
+def go_signature():
+    return 'golint', tool_fingerprint([find_executable('golint')]), '-min_confidence 0.1'
+
+
+# Static check tool of file extension:
+#   file_handler: checks one file and sends results, returns (code, message).
+#       It is used only for tools without batch_handler.
+#   batch_handler: checks many files with one linter run and returns
+#       dictionary of file: results, ready for send_file_results, or file:
+#       (code, error) for files, that could not be checked. None, if tool
+#       does not support batches.
+#   parallel: handler can run for several files or batches at once.
+#   signature: returns (tool, tool_version, ruleset) for result cache keys,
+#       None disables cache.
+Handler = namedtuple('Handler', ['file_handler', 'batch_handler', 'parallel', 'signature'])
+
+handlers = {}
+
+
+def register_handler(ext, file_handler, batch_handler=None, parallel=True, signature=None):
+    """The function registers static check tool for extension, replacing
+    previous one.
+
+    Args:
+        ext (str): file extension with dot.
+        file_handler (callable): see Handler.
+        batch_handler (callable): see Handler.
+        parallel (bool): see Handler.
+        signature (callable): see Handler.
+    """
+    handlers[ext] = Handler(file_handler, batch_handler, parallel, signature)
+
+
+register_handler('.java', None, java_batch_results, signature=java_signature)
+register_handler('.swift', None, swift_batch_results, signature=swift_signature)
+register_handler('.go', None, go_batch_results, signature=go_signature)
+
+
+def supports_batch(ext):
+    return ext in handlers and handlers[ext].batch_handler is not None
+
+
+def supports_cache(ext):
+    return supports_batch(ext) and handlers[ext].signature is not None
+
+
+def file_extension(checked_file):
+    return os.path.splitext(checked_file)[1]
+
+
+def resolve_extensions(extensions, changed_files=()):
+    """The function turns static-check -e value into list of extensions.
+
+    Args:
+        extensions (str or list of str): comma separated extensions,
+            'auto' or None to detect them from changed_files.
+        changed_files (list of str): files to detect extensions from.
+
+    Returns:
+        extensions (list of str): sorted extensions with dot.
+    """
+    if isinstance(extensions, basestring):
+        extensions = [ext.strip() for ext in extensions.split(',') if ext.strip()]
+    if not extensions or extensions == ['auto']:
+        return sorted(set(file_extension(changed_file) for changed_file in changed_files) & set(handlers))
+    return sorted(set(ext if ext.startswith('.') else '.' + ext for ext in extensions))
+
+
+def group_by_extension(changed_files, extensions):
+    """Returns dictionary of extension: files with it, for extensions."""
+    groups = dict((ext, []) for ext in extensions)
+    for changed_file in changed_files:
+        ext = file_extension(changed_file)
+        if ext in groups:
+            groups[ext].append(changed_file)
+    return groups
+
+
+def should_check(checked_file, required_extension):
+    """The function tells if file exists and has required extension."""
+    return bool(checked_file) and required_extension in checked_file and os.path.isfile(checked_file)
 
 
 def file_handler(checked_file, required_extension):
-    """The function defines file extension and executes appropriate check.
+    """The function executes check of registered handler of extension.
 
     Args:
         checked_file: inspected file
         required_extension: file extension
     """
     # If file is not required type, then go to next file.
-    result = (-42, 'Unknown.')
-    if not checked_file or required_extension not in checked_file or not os.path.isfile(checked_file):
+    if not should_check(checked_file, required_extension):
         result = (0, 'Not checked.')
-    else:
-        logger.debug('Checking file {}'.format(checked_file))
-        # Here is some hardcode, but it is really necessary,
-        # trust me, I'm a drummer!
-        if required_extension == '.java':
-            result = java_file_handler(checked_file)
-        elif required_extension == '.swift':
-            result = swift_file_handler(checked_file)
-        elif required_extension == '.go':
-            result = go_file_handler(checked_file)
+    elif required_extension not in handlers:
+        result = (0, 'Not checked. Unsupported extension.')
+    elif supports_batch(required_extension):
+        # Linter run and sending results are separate, so only the linter
+        # run is timed and cached.
+        logger.debug('Checking file %s', checked_file)
+        results = lint_files([checked_file], required_extension)[checked_file]
+        error = artifacts.error_message(results)
+        if type(results) == tuple:
+            result = results
+        elif error is not None:
+            result = (-1, error)
         else:
-            result = (0, 'Not checked. Unsupported extension.')
+            result = send_file_results(checked_file, results)
+    else:
+        logger.debug('Checking file %s', checked_file)
+        result = handlers[required_extension].file_handler(checked_file)
     return result
 
 
-def check_single_file(ext, filename):
-    """The function performs a single file check.
+_cache_signatures = {}
+_cache_signatures_lock = threading.Lock()
+
+
+def cache_signature(ext):
+    """The function returns (tool, tool_version, ruleset) for result cache
+    keys of extension. Tool versions can be pinned with JECKET_TOOL_VERSION
+    environment variable, otherwise they are computed from tool files once
+    per process.
+    """
+    with _cache_signatures_lock:
+        if ext not in _cache_signatures:
+            tool, version, ruleset = handlers[ext].signature()
+            _cache_signatures[ext] = (tool, os.environ.get('JECKET_TOOL_VERSION') or version, ruleset)
+        return _cache_signatures[ext]
+
+
+def run_batch_handler(changed_files, ext):
+    """The function runs batch handler of extension. Duration of linter
+    run for a single file is recorded in duration_history.
+    """
+    start = time.time()
+    results = handlers[ext].batch_handler(changed_files)
+    if duration_history is not None and len(changed_files) == 1:
+        duration_history.record(tool_name(ext), changed_files[0], time.time() - start)
+    return results
+
+
+def lint_files(changed_files, ext):
+    """The function runs batch handler of extension for files, that are
+    missing in result cache, and stores new results in cache.
 
     Args:
+        changed_files (list of str): files to check.
         ext: file extension
+
+    Returns:
+        results (dict of file: result): the same as batch handlers return.
+    """
+    if result_cache is None or not supports_cache(ext):
+        return run_batch_handler(changed_files, ext)
+
+    tool, version, ruleset = cache_signature(ext)
+
+    def key(changed_file):
+        # Filtered results depend on changed lines of the file as well.
+        lines = changed_lines.signature(changed_file) if changed_lines is not None else ''
+        return ResultCache.key(git_blob_sha(changed_file), tool, version, ruleset + lines)
+
+    keys = dict((changed_file, key(changed_file)) for changed_file in changed_files)
+    results = {}
+    misses = []
+    for changed_file in changed_files:
+        cached = result_cache.get(keys[changed_file])
+        if cached is not None:
+            results[changed_file] = cached
+        else:
+            misses.append(changed_file)
+    logger.debug('Result cache: %s hits, %s misses.', len(results), len(misses))
+
+    if misses:
+        fresh = run_batch_handler(misses, ext)
+        for changed_file in misses:
+            value = fresh[changed_file]
+            results[changed_file] = value
+            # Errors are not cached, the next run will try again.
+            if type(value) != tuple and not any(type(item) == tuple for item in value.values()):
+                result_cache.put(keys[changed_file], value)
+    return results
+
+
+def check_single_file(ext, filename, output=None):
+    """The function performs a single file check.
+
+    Args:
+        ext: file extension, None or 'auto' to take it from filename.
         filename: file name
+        output (str): write results to this results file instead of
+            sending them.
     """
-    file_handler(filename, ext)
+    if ext in (None, 'auto'):
+        ext = file_extension(filename)
+    if output is not None:
+        with artifacts.ResultsWriter(output, sharding.head_commit(), None, [ext], 'file') as writer:
+            return write_results({ext: [filename]}, [ext], writer)
+    return file_handler(filename, ext)
 
 
-def check_pr(ext):
-    """The function performs a check for changed files from a pull request
-    for a given extension.
+def check_file_isolated(changed_file, ext):
+    """The function runs file_handler and turns any exception into an error
+    result, so one broken file does not stop checks of other files.
 
     Args:
+        changed_file: inspected file
         ext: file extension
+
+    Returns:
+        code (int), message (str): file_handler result or (-1, exception).
     """
+    try:
+        result = file_handler(changed_file, ext)
+    except Exception as e:
+        logger.exception('Error occurred while checking file %s.', changed_file)
+        result = (-1, e)
+    return result
+
+
+def run_concurrently(func, items, jobs=1, cost=None):
+    """The function calls func for every item with a pool of worker threads.
+
+    Linter subprocesses and BitBucket requests spend most of the time
+    waiting, so threads are enough to run them concurrently.
+
+    Args:
+        func (callable): function of one item, that returns (code, message).
+        items (list): arguments for func.
+        jobs (int): number of worker threads, 1 means sequential calls.
+        cost (callable): expected duration of item. If given, items are
+            started longest first, see scheduler.run_scheduled.
+
+    Returns:
+        results (list of (code, message)): results in order of items.
+    """
+    if cost is not None:
+        http_pool.ensure_pool_size(jobs)
+        return scheduler.run_scheduled(func, items, jobs, cost)
+    if jobs > 1 and len(items) > 1:
+        logger.info('Processing %s files with %s workers.', len(items), jobs)
+        http_pool.ensure_pool_size(jobs)
+        pool = ThreadPool(processes=min(jobs, len(items)))
+        try:
+            results = pool.map(func, items, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [func(item) for item in items]
+    return results
+
+
+def tool_name(ext):
+    """Returns name of static check tool of extension."""
+    if handlers[ext].signature is not None:
+        return cache_signature(ext)[0]
+    return ext.lstrip('.')
+
+
+def schedule_cost(ext):
+    """The function returns cost function of run_concurrently for files of
+    extension, or lists of them checked in one linter run. Durations are
+    recorded by run_batch_handler.
+
+    Returns:
+        cost (callable): None if history is disabled.
+    """
+    if duration_history is None or ext not in handlers:
+        return None
+    tool = tool_name(ext)
+
+    def cost(item):
+        checked_files = item if isinstance(item, list) else [item]
+        return sum(duration_history.expected(tool, checked_file) for checked_file in checked_files)
+
+    return cost
+
+
+def send_file_results_isolated(target_file, results):
+    """The function runs send_file_results and turns any exception into
+    an error result.
+    """
+    try:
+        result = send_file_results(target_file, results)
+    except Exception as e:
+        logger.exception('Error occurred while sending results for file %s.', target_file)
+        result = (-1, e)
+    return result
+
+
+def check_files(changed_files, ext, jobs=1, batch=False):
+    """The function checks files with a pool of worker threads.
+
+    Args:
+        changed_files (list of str): files to check.
+        ext: file extension
+        jobs (int): number of worker threads, 1 means sequential check.
+        batch (bool): run linter once for all files, if extension
+            supports it, and send results for every file after that.
+
+    Returns:
+        results (dict of file: (code, message)): result for every file.
+    """
+    changed_files = list(changed_files)
+    if ext in handlers and not handlers[ext].parallel:
+        jobs = 1
+    if batch and supports_batch(ext):
+        to_check = [changed_file for changed_file in changed_files if should_check(changed_file, ext)]
+        results = dict((changed_file, (0, 'Not checked.')) for changed_file in changed_files)
+        if to_check:
+            logger.info('Checking %s files with one linter run.', len(to_check))
+            try:
+                file_results = lint_files(to_check, ext)
+            except Exception as e:
+                logger.exception('Error occurred while checking files in batch mode.')
+                results.update((changed_file, (-1, e)) for changed_file in to_check)
+            else:
+                # Files, that one of tools failed on, are not sent, partial
+                # results would be published as complete ones.
+                to_send = []
+                for changed_file in to_check:
+                    value = file_results[changed_file]
+                    error = artifacts.error_message(value)
+                    if error is None:
+                        to_send.append(changed_file)
+                    else:
+                        results[changed_file] = value if type(value) == tuple else (-1, error)
+                sent = run_concurrently(
+                    lambda changed_file: send_file_results_isolated(changed_file, file_results[changed_file]),
+                    to_send, jobs)
+                results.update(zip(to_send, sent))
+        return results
+
+    checked = run_concurrently(lambda changed_file: check_file_isolated(changed_file, ext), changed_files, jobs,
+                               schedule_cost(ext))
+    return dict(zip(changed_files, checked))
+
+
+def analyze_files(changed_files, ext, jobs=1, batch=False):
+    """The function checks files without sending results.
+
+    Args:
+        changed_files (list of str): files to check.
+        ext: file extension
+        jobs (int): number of worker threads.
+        batch (bool): run linter once for all files.
+
+    Returns:
+        results (dict of file: result): results for send_file_results, or
+            (code, error) tuples. Files, that are not checked, are missing.
+    """
+    to_check = [changed_file for changed_file in changed_files if should_check(changed_file, ext)]
+    if not to_check or not supports_batch(ext):
+        return {}
+    if not handlers[ext].parallel:
+        jobs = 1
+    if batch:
+        return lint_files(to_check, ext)
+
+    def analyze(changed_file):
+        try:
+            return lint_files([changed_file], ext)[changed_file]
+        except Exception as e:
+            logger.exception('Error occurred while checking file %s.', changed_file)
+            return -1, e
+
+    return dict(zip(to_check, run_concurrently(analyze, to_check, jobs, schedule_cost(ext))))
+
+
+def reconcile_comments(file_results, comment_index, extensions, jobs=1, dry_run=False):
+    """The function sends only comment mutations, that are needed to bring
+    pull request comments to the state of file_results.
+
+    Args:
+        file_results (dict of file: result): see analyze_files.
+        comment_index (CommentIndex): existing comments of pull request.
+        extensions (list of str): checked extensions.
+        jobs (int): number of concurrent requests.
+        dry_run (bool): print plan without sending anything.
+
+    Returns:
+        summary (dict): number of operations by action, 'failed' number
+            and 'plan' with the operations.
+    """
+    author = jecket.PRFile.checks_author_default
+    operations = reconcile.plan(file_results, comment_index, author, extensions)
+    print(reconcile.format_plan(operations))
+    summary = {'create': 0, 'update': 0, 'delete': 0, 'failed': 0, 'plan': operations}
+    for operation in operations:
+        summary[operation.action] += 1
+    if dry_run:
+        return summary
+
+    with ConcurrentClient(workers=max(jobs, 1)) as client:
+        responses = client.map(lambda operation: reconcile.apply_operation(operation, comment_index, author),
+                               operations)
+    summary['failed'] = sum(1 for code, _ in responses if not 200 <= code < 300)
+    return summary
+
+
+def summarize_results(results):
+    """The function aggregates per-file results.
+
+    Args:
+        results (dict of file: (code, message)): result for every file.
+
+    Returns:
+        summary (dict): numbers of checked, published, skipped and failed
+            files, and per-file results under 'files' key.
+    """
+    summary = {'checked': 0, 'published': 0, 'skipped': 0, 'failed': 0, 'files': results}
+    for code, _ in results.values():
+        if code == 0:
+            summary['skipped'] += 1
+            continue
+        summary['checked'] += 1
+        if 200 <= code < 300:
+            summary['published'] += 1
+        else:
+            summary['failed'] += 1
+    return summary
+
+
+def recorded(items, target):
+    """Generator, that yields items and appends them to target list."""
+    for item in items:
+        target.append(item)
+        yield item
+
+
+def check_pr(ext, jobs=1, batch=False, reconcile_mode=False, dry_run=False, changed_lines_only=False,
+             output=None):
+    """The function performs a check for changed files from a pull request
+    for given extensions. Commits, changed files and comment index are
+    requested once for all extensions.
+
+    Args:
+        ext: file extension, comma separated extensions or list of them,
+            None or 'auto' to check all changed files with registered
+            handlers.
+        jobs (int): number of files checked concurrently.
+        batch (bool): run one linter process for all files.
+        reconcile_mode (bool): check all files first, then send only
+            needed comment creates, updates and deletes.
+        dry_run (bool): with reconcile_mode, print plan only.
+        changed_lines_only (bool): report only violations on lines, that
+            pull request added or changed, and skip files with deletions
+            only.
+        output (str): write results to this results file instead of
+            sending them, see 'jecket publish'.
+
+    Returns:
+        summary (dict): aggregated results, see summarize_results,
+            reconcile_comments summary in reconcile mode, or write_results
+            summary with output.
+    """
+    global pr_comment_index, changed_lines
     logger.info('Start checking pull-request...')
     pr = jecket.PRCommits()
-    # Get list of commits SHA, that are in pull-request.
-    commit_list = pr.get_commits()
-    logger.debug('List of commits for pull request received: {}'.format(commit_list))
-    commit_set = set()
+    # Commit IDs are fed to git as pages of pull request commits arrive,
+    # so this phase includes commit requests (see http metrics).
+    commit_list = []
+    with metrics.phase('git_changes'):
+        changes = git_changes.changed_files(recorded(pr.iter_commits(cache=commits_cache), commit_list))
+    logger.debug('List of commits for pull request received: %s', truncated(commit_list))
+    # Deleted files can not be checked.
+    changed_files = [change.path for change in changes if change.status != 'D']
+    logger.debug('List of files changed in pull request received: %s', truncated(changed_files))
+    if changed_lines_only:
+        with metrics.phase('changed_lines'):
+            changed_lines = hunks.changed_lines(commit_list)
+        deletions_only = set(changed_file for changed_file in changed_files
+                             if not changed_lines.has_additions(changed_file))
+        if deletions_only:
+            logger.info('Skipping %s files with deleted lines only.', len(deletions_only))
+            changed_files = [changed_file for changed_file in changed_files if changed_file not in deletions_only]
+    extensions = resolve_extensions(ext, changed_files)
+    groups = group_by_extension(changed_files, extensions)
+    logger.info('Checked extensions: %s.', ', '.join(extensions) or 'none')
+
+    if output is not None:
+        with artifacts.ResultsWriter(output, commit_list[0] if commit_list else None, None, extensions,
+                                     'pr') as writer:
+            summary = write_results(groups, extensions, writer, jobs, batch)
+        logger.info('Pull-request check finished. Files: %s, checked: %s, failed: %s, results file: %s.',
+                    summary['files'], summary['checked'], summary['failed'], output)
+        return summary
+
+    if reconcile_mode or dry_run:
+        # Without complete list of existing comments plan can not be computed.
+        with metrics.phase('comment_index'):
+            pr_comment_index = jecket.PRComments().get_comment_index()
+        file_results = {}
+        with metrics.phase('analyze'):
+            for extension in extensions:
+                file_results.update(analyze_files(groups[extension], extension, jobs, batch))
+        with metrics.phase('reconcile'):
+            summary = reconcile_comments(file_results, pr_comment_index, extensions, jobs, dry_run)
+        logger.info('Comments reconciled. Created: %s, updated: %s, deleted: %s, failed: %s.',
+                    summary['create'], summary['update'], summary['delete'], summary['failed'])
+        return summary
+
+    try:
+        with metrics.phase('comment_index'):
+            pr_comment_index = jecket.PRComments().get_comment_index()
+    except Exception:
+        logger.exception('Error occurred while building comment index, comments will be requested per file.')
+        pr_comment_index = None
+
+    # Linter and request time inside this phase are in subprocess and
+    # http metrics.
+    results = dict((changed_file, (0, 'Not checked.')) for changed_file in changed_files)
+    with metrics.phase('check_files'):
+        for extension in extensions:
+            results.update(check_files(groups[extension], extension, jobs, batch))
+    summary = summarize_results(results)
+    logger.info('Pull-request check finished. Checked: %s, published: %s, skipped: %s, failed: %s.',
+                summary['checked'], summary['published'], summary['skipped'], summary['failed'])
+    if result_cache is not None:
+        summary['cache'] = result_cache.stats()
+    return summary
+
+
+def chunks(items, size):
+    """Splits list into consecutive parts of at most size items."""
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+def write_results(groups, extensions, writer, jobs=1, batch=False):
+    """The function checks files without sending results and appends
+    results of every file to results file as soon as it is checked.
+
+    Args:
+        groups (dict of extension: files): files to check.
+        extensions (list of str): checked extensions.
+        writer (ResultsWriter): results file.
+        jobs (int): number of files or batches checked concurrently.
+        batch (bool): run one linter process per JECKET_BATCH_SIZE files.
 
-    for commit_id in commit_list:
-        logger.info('Processing commit ID {}'.format(commit_id))
-        # Here we will get list of files, that have been changed in this
-        # commit, if command succeed.
-        cmd = 'git diff-tree --no-commit-id --name-only -r {}'.format(commit_id)
-        code, out = execute_linux_command(cmd)
-        logger.debug('List of files changed in commit received: {}'.format(out))
-        # Generate list of files
-        changed_files = [changed_file for changed_file in out.split('\n')]
-        for tfile in changed_files:
-            commit_set.add(tfile)
+    Returns:
+        summary (dict): number of 'files', 'checked' and 'failed' files and
+            results file 'output'.
+    """
+    batch_size = int(os.environ.get('JECKET_BATCH_SIZE', DEFAULT_BATCH_SIZE))
+    for extension in extensions:
+        if not supports_batch(extension):
+            logger.warning('Results of %s files can not be written to file, skipping them.', extension)
+            continue
+        to_check = [checked_file for checked_file in groups[extension] if should_check(checked_file, extension)]
+        parts = chunks(to_check, batch_size if batch else 1)
+
+        def check_part(part):
+            try:
+                results = lint_files(part, extension)
+            except Exception as e:
+                logger.exception('Error occurred while checking %s files.', len(part))
+                results = dict((checked_file, (-1, e)) for checked_file in part)
+            for checked_file in part:
+                writer.write(checked_file, extension, results[checked_file])
+            return 0, None
 
-    for changed_file in commit_set:
-        file_handler(changed_file, ext)
+        with metrics.phase('analyze'):
+            run_concurrently(check_part, parts, jobs if handlers[extension].parallel else 1, schedule_cost(extension))
+    return {'files': sum(len(groups[extension]) for extension in extensions), 'checked': writer.records,
+            'failed': writer.errors, 'output': writer.path}
 
 
-def check_all_project(ext):
-    print 'Check all project in a pull-request? Why would you do that?'
+def check_all_project(ext, jobs=1, batch=False, shard=None, output=None):
+    """The function checks all tracked files of the project, or one shard
+    of them, and writes results to results file instead of sending them.
 
+    Shards are balanced by file size and are the same on every agent, so
+    several agents can check one shard each and results files can be
+    merged after that.
 
-def main(func, ext, filename=''):
-    logging.getLogger(__name__)
+    Args:
+        ext: file extension, comma separated extensions or list of them,
+            None or 'auto' to check all files with registered handlers.
+        jobs (int): number of files or batches checked concurrently.
+        batch (bool): run one linter process per JECKET_BATCH_SIZE files.
+        shard (str or tuple): 'i/N' or (index, count), see
+            sharding.parse_shard. None checks all files.
+        output (str): results file, jecket_results.jsonl or
+            jecket_results_<i>_of_<N>.jsonl by default.
+
+    Returns:
+        summary (dict): number of 'files', 'checked' and 'failed' files and
+            results file 'output'.
+    """
+    if isinstance(shard, basestring):
+        shard = sharding.parse_shard(shard)
+    if output is None:
+        output = 'jecket_results{0}.jsonl'.format('_{0}_of_{1}'.format(shard[0] + 1, shard[1]) if shard else '')
+    with metrics.phase('git_changes'):
+        files = sharding.tracked_files()
+    extensions = [extension for extension in resolve_extensions(ext, files) if supports_batch(extension)]
+    files = [checked_file for checked_file in files if file_extension(checked_file) in extensions]
+    groups = group_by_extension(sharding.shard_files(files, shard), extensions)
+    logger.info('Checking project: %s files, extensions: %s.', sum(len(group) for group in groups.values()),
+                ', '.join(extensions) or 'none')
+    with artifacts.ResultsWriter(output, sharding.head_commit(), shard, extensions) as writer:
+        summary = write_results(groups, extensions, writer, jobs, batch)
+    logger.info('Project check finished. Files: %s, checked: %s, failed: %s.', summary['files'],
+                summary['checked'], summary['failed'])
+    return summary
+
+
+def main(func, ext, filename='', jobs=1, batch=False, cache_dir=None, cache_size=None, reconcile_mode=False,
+         dry_run=False, changed_lines_only=False, shard=None, output=None):
+    """The function runs static check command with result cache and
+    duration history, if they are enabled.
+
+    Returns:
+        summary (dict): summary of check_all_project, check_pr or of the
+            single file check, its 'failed' value is non-zero if any file
+            could not be checked or its results could not be sent.
+    """
+    global result_cache, commits_cache, duration_history
+    cache_dir = cache_dir or os.environ.get('JECKET_CACHE_DIR')
+    if cache_dir:
+        max_bytes = (cache_size or int(os.environ.get('JECKET_CACHE_SIZE_MB', 256))) * 1024 * 1024
+        result_cache = ResultCache(cache_dir, max_bytes)
+        # Separate instance keeps hit rate of check results, entries share
+        # the directory and its size limit.
+        commits_cache = ResultCache(os.path.join(cache_dir, 'commits'), max_bytes)
+    if scheduler.history_file():
+        duration_history = scheduler.DurationHistory(scheduler.history_file(), count_lines)
+    summary = None
     if func == 'all':
-        check_all_project(ext)
+        summary = check_all_project(ext, jobs, batch, shard, output)
     elif func == 'pr':
-        check_pr(ext)
+        summary = check_pr(ext, jobs, batch, reconcile_mode, dry_run, changed_lines_only, output)
     elif func == 'file':
-        check_single_file(ext, filename)
+        result = check_single_file(ext, filename, output)
+        if output is None:
+            logger.info('File check finished with code %s: %s', result[0], truncated(result[1]))
+            summary = summarize_results({filename: result})
+        else:
+            summary = result
+
+    if result_cache is not None:
+        logger.info('Result cache hit rate: %.1f%% (%s hits, %s misses).', result_cache.hit_rate * 100,
+                    result_cache.hits, result_cache.misses)
+        result_cache.evict()
+    if duration_history is not None:
+        duration_history.save()
+    return summary
 
 
 if __name__ == '__main__':
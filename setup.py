@@ -8,7 +8,7 @@ setup(
         license='MIT',
         author='Eduard Fazliev',
         author_email='napalmedd@gmail.com',
-        packages=find_packages(),
+        packages=find_packages(exclude=['tests']),
         scripts=['bin/jecket'],
         # data_files=[('/etc/jecket', ['conf/logger.yaml'])],
         install_requires=[
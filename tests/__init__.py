@@ -0,0 +1,4 @@
+import logging
+
+# Tests check results, not log output.
+logging.getLogger('jecket').addHandler(logging.NullHandler())
@@ -0,0 +1,38 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+
+class GitRepositoryTest(unittest.TestCase):
+    """Base test, that runs in a new git repository in temporary directory."""
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.directory = tempfile.mkdtemp(prefix='jecket_test_')
+        os.chdir(self.directory)
+        self.git('init', '-q')
+        self.git('config', 'user.email', 'test@example.com')
+        self.git('config', 'user.name', 'test')
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.directory)
+
+    def git(self, *args):
+        return subprocess.check_output(('git',) + args).strip()
+
+    def commit(self, files):
+        """Writes files (None content removes file), commits all changes
+        and returns commit SHA.
+        """
+        for name, text in files.items():
+            if text is None:
+                os.remove(name)
+            else:
+                with open(name, 'w') as f:
+                    f.write(text)
+        self.git('add', '-A')
+        self.git('commit', '-q', '-m', 'change')
+        return self.git('rev-parse', 'HEAD')
@@ -0,0 +1,108 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import jecket
+from jecket import artifacts, publish
+from jecket.artifacts import Results, ResultsWriter
+
+
+class ResultsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='jecket_test_')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def results_file(self, name, commit, results, shard=None):
+        path = os.path.join(self.directory, name)
+        with ResultsWriter(path, commit, shard, ['.java']) as writer:
+            for checked_file, result in results:
+                writer.write(checked_file, '.java', result)
+        return path
+
+    def test_error_does_not_replace_result(self):
+        results = Results()
+        results.add({'kind': 'result', 'path': 'A.java', 'ext': '.java', 'results': {'Violations: ': 1}})
+        results.add({'kind': 'result', 'path': 'A.java', 'ext': '.java', 'error': 'crashed'})
+        results.add({'kind': 'result', 'path': 'B.java', 'ext': '.java', 'error': 'crashed'})
+        results.add({'kind': 'result', 'path': 'B.java', 'ext': '.java', 'results': {'Violations: ': 0}})
+        results.add({'kind': 'unknown', 'path': 'C.java'})
+        self.assertEqual(results.file_results(), {'A.java': {'Violations: ': 1}, 'B.java': {'Violations: ': 0}})
+
+    def test_later_file_wins(self):
+        first = self.results_file('first.jsonl', 'abc', [('A.java', {'Violations: ': 1}), ('B.java', (-1, 'crashed'))],
+                                  (0, 2))
+        second = self.results_file('second.jsonl', 'abc', [('A.java', {'Violations: ': 0}),
+                                                           ('C.java', {'Violations: ': 2})], (1, 2))
+        output = os.path.join(self.directory, 'merged.jsonl')
+        merged = artifacts.merge([first, second], output)
+        expected = {'A.java': {'Violations: ': 0}, 'B.java': (-1, 'crashed'), 'C.java': {'Violations: ': 2}}
+        self.assertEqual(merged.file_results(), expected)
+        self.assertEqual(merged.commit, 'abc')
+        reloaded = artifacts.load([output])
+        self.assertEqual(reloaded.file_results(), expected)
+        self.assertEqual((reloaded.headers[0]['mode'], reloaded.extensions), ('merge', ['.java']))
+
+    def test_different_commits(self):
+        first = self.results_file('first.jsonl', 'abc', [])
+        second = self.results_file('second.jsonl', 'def', [])
+        self.assertIsNone(artifacts.load([first, second]).commit)
+
+    def test_invalid_lines_are_skipped(self):
+        path = self.results_file('results.jsonl', 'abc', [('A.java', {'Violations: ': 1})])
+        with open(path, 'a') as f:
+            f.write('\n[1, 2]\n{"kind": "result", "path": "B.ja')
+        self.assertEqual(list(artifacts.load([path]).file_results()), ['A.java'])
+
+
+class PRFile(object):
+    """Records sent results instead of requests to BitBucket."""
+
+    sent = []
+    lock = threading.Lock()
+
+    def __init__(self, checked_file):
+        self.checked_file = checked_file
+
+    def send_static_check_results(self, results, comment_index):
+        with self.lock:
+            self.sent.append(self.checked_file)
+        return (500, 'Internal error') if self.checked_file == 'C.java' else (204, '')
+
+
+class PRComments(object):
+
+    def get_comment_index(self):
+        return None
+
+
+class PublishTest(unittest.TestCase):
+
+    def setUp(self):
+        self.saved = (jecket.PRFile, jecket.PRComments)
+        jecket.PRFile, jecket.PRComments = PRFile, PRComments
+        PRFile.sent = []
+
+    def tearDown(self):
+        jecket.PRFile, jecket.PRComments = self.saved
+
+    def test_posts_once_per_file(self):
+        results = Results()
+        for path, result in [('A.java', {'Violations: ': 1}), ('B.java', {'Violations: ': 0}),
+                             ('C.java', {'Violations: ': 0}), ('D.java', (-1, 'crashed')),
+                             ('A.java', {'Violations: ': 2})]:
+            record = {'kind': 'result', 'path': path, 'ext': '.java'}
+            record.update({'error': result[1]} if type(result) == tuple else {'results': result})
+            results.add(record)
+        summary = publish.publish(results, jobs=3)
+        self.assertEqual(sorted(PRFile.sent), ['A.java', 'B.java', 'C.java'])
+        self.assertEqual((summary['published'], summary['skipped'], summary['failed']), (2, 1, 1))
+        self.assertEqual(summary['files']['C.java'], (500, 'Internal error'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import json
+import threading
+import time
+import unittest
+from StringIO import StringIO
+
+import jecket
+from jecket import batch
+from jecket.batch import ordering_key, parse_operations, run_batch
+
+
+class PRState(object):
+    """Records requests instead of sending them to BitBucket."""
+
+    calls = []
+    lock = threading.Lock()
+    git_commit = 'head'
+
+    def record(self, *call):
+        # The first request of a target is the slowest one, so targets are
+        # reordered, if they are not run one after another.
+        time.sleep(0.05 if call[-1].endswith('1') else 0.0)
+        with self.lock:
+            self.calls.append(call)
+
+    def send_build_status(self, state, key, url):
+        self.record('status', self.git_commit, state, key)
+        return 204, ''
+
+    def send_comment(self, text):
+        if text == 'fail':
+            raise RuntimeError('connection reset')
+        self.record('pr-comment', text)
+        return 201, '{"id": 1}'
+
+
+class PRFile(PRState):
+
+    def __init__(self, checked_file):
+        self.checked_file = checked_file
+
+    def send_static_check_results(self, results, comment_index):
+        self.record('file', self.checked_file, results['text'])
+        return (404, 'Not found') if results['text'] == 'missing' else (204, '')
+
+
+class PRComments(object):
+
+    def get_comment_index(self):
+        return None
+
+
+def operations_file(*operations):
+    return StringIO('\n'.join(operation if isinstance(operation, str) else json.dumps(operation)
+                              for operation in operations))
+
+
+class ParseOperationsTest(unittest.TestCase):
+
+    def test_valid_operations(self):
+        operations = parse_operations(operations_file(
+            {'op': 'set-status', 'state': 'in-progress', 'commit': 'abc'},
+            '',
+            {'op': 'send-file-results', 'path': 'A.java', 'results': {}, 'id': 'a'}))
+        self.assertEqual([(operation['op'], operation['line'], operation['id']) for operation in operations],
+                         [('set-status', 1, 1), ('send-file-results', 3, 'a')])
+
+    def test_invalid_operations_get_error(self):
+        operations = parse_operations(operations_file(
+            '{"op": "set-status", ', '[1]', {'op': 'merge'}, {'op': 'send-pr-comment'},
+            {'op': 'set-status', 'state': 'broken'}))
+        self.assertEqual([operation['op'] for operation in operations], [None] * 5)
+        self.assertEqual([operation['line'] for operation in operations], [1, 2, 3, 4, 5])
+        self.assertIn('JSON object', operations[1]['error'])
+        self.assertIn("unknown op u'merge'", operations[2]['error'])
+        self.assertEqual(operations[3]['error'], 'missing fields: text.')
+        self.assertIn('state must be', operations[4]['error'])
+
+    def test_ordering_key(self):
+        self.assertEqual(ordering_key({'op': 'set-status', 'state': 'failed', 'commit': 'abc'}), ('status', 'abc'))
+        self.assertEqual(ordering_key({'op': 'send-pr-comment', 'text': 'x'}), ('pr-comment',))
+        self.assertEqual(ordering_key({'op': 'send-file-results', 'path': 'A.java'}), ('file', 'A.java'))
+        self.assertEqual(ordering_key({'op': 'send-file-results', 'path': 'A.java', 'group': 1}), ('group', 1))
+
+
+class RunBatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.saved = (jecket.PRState, jecket.PRFile, jecket.PRComments)
+        jecket.PRState, jecket.PRFile, jecket.PRComments = PRState, PRFile, PRComments
+        PRState.calls = []
+
+    def tearDown(self):
+        jecket.PRState, jecket.PRFile, jecket.PRComments = self.saved
+
+    def run_batch(self, *operations):
+        output = StringIO()
+        summary = run_batch(parse_operations(operations_file(*operations)), output, workers=4)
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        return summary, dict((record['id'], record) for record in records)
+
+    def test_operations_of_target_keep_file_order(self):
+        summary, records = self.run_batch(
+            {'op': 'send-file-results', 'path': 'A.java', 'results': {'text': 'a1'}},
+            {'op': 'send-file-results', 'path': 'B.java', 'results': {'text': 'b1'}},
+            {'op': 'send-pr-comment', 'text': 'c1'},
+            {'op': 'send-file-results', 'path': 'A.java', 'results': {'text': 'a2'}},
+            {'op': 'send-pr-comment', 'text': 'c2'},
+            {'op': 'set-status', 'state': 'successful', 'key': 's1'},
+            {'op': 'set-status', 'state': 'failed', 'key': 's2'},
+            {'op': 'send-file-results', 'path': 'B.java', 'results': {'text': 'b2'}})
+        self.assertEqual(summary, {'ok': 8, 'failed': 0})
+        for target in (('file', 'A.java'), ('file', 'B.java'), ('pr-comment',), ('status', 'head')):
+            calls = [call[-1] for call in PRState.calls if call[:len(target)] == target]
+            self.assertEqual(calls, sorted(calls))
+            self.assertEqual(len(calls), 2)
+        self.assertEqual(records[3]['response'], {'id': 1})
+
+    def test_errors_are_reported_per_operation(self):
+        summary, records = self.run_batch(
+            '{"op": "set-',
+            {'op': 'send-pr-comment', 'text': 'fail'},
+            {'op': 'send-file-results', 'path': 'A.java', 'results': {'text': 'missing'}},
+            {'op': 'send-pr-comment', 'text': 'c1'})
+        self.assertEqual(summary, {'ok': 1, 'failed': 3})
+        self.assertEqual((records[1]['op'], records[1]['code'], records[1]['ok']), (None, -1, False))
+        self.assertEqual((records[2]['code'], records[2]['error']), (-1, 'connection reset'))
+        self.assertEqual((records[3]['code'], records[3]['error']), (404, 'Not found'))
+        # Failed operation does not stop later operations of the same target.
+        self.assertTrue(records[4]['ok'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import threading
+import time
+import unittest
+
+from jecket import concurrent_client, http_pool
+from jecket.concurrent_client import ConcurrentClient, get_semaphore
+
+
+class ConcurrentClientTest(unittest.TestCase):
+
+    def setUp(self):
+        self.semaphore = concurrent_client._semaphore
+        self.min_pool_maxsize = http_pool._min_pool_maxsize
+        self.concurrency = os.environ.get('JECKET_HTTP_CONCURRENCY')
+        concurrent_client._semaphore = None
+
+    def tearDown(self):
+        concurrent_client._semaphore = self.semaphore
+        http_pool._min_pool_maxsize = self.min_pool_maxsize
+        if self.concurrency is None:
+            os.environ.pop('JECKET_HTTP_CONCURRENCY', None)
+        else:
+            os.environ['JECKET_HTTP_CONCURRENCY'] = self.concurrency
+
+    def test_semaphore_size_from_environment(self):
+        os.environ['JECKET_HTTP_CONCURRENCY'] = '3'
+        semaphore = get_semaphore()
+        self.assertIs(get_semaphore(), semaphore)
+        self.assertEqual([semaphore.acquire(False) for _ in range(4)], [True, True, True, False])
+        for _ in range(3):
+            semaphore.release()
+        self.assertRaises(ValueError, semaphore.release)
+
+    def test_requests_in_flight_are_bounded(self):
+        os.environ['JECKET_HTTP_CONCURRENCY'] = '2'
+        lock = threading.Lock()
+        in_flight = [0]
+        peak = [0]
+
+        def request(item):
+            with lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            time.sleep(0.02)
+            with lock:
+                in_flight[0] -= 1
+            return 0, item
+
+        # Workers are shared by all clients, limit is applied across them.
+        with ConcurrentClient(workers=6) as first, ConcurrentClient(workers=6) as second:
+            pending = [first.submit(request, item) for item in range(6)]
+            results = second.map(request, range(6, 12))
+            results = [result.get() for result in pending] + results
+        self.assertEqual(results, [(0, item) for item in range(12)])
+        self.assertEqual(peak[0], 2)
+
+    def test_errors_are_returned_as_results(self):
+        error = RuntimeError('connection reset')
+
+        def request(item):
+            if item == 1:
+                raise error
+            return 0, item
+
+        with ConcurrentClient(workers=2) as client:
+            self.assertEqual(client.map(request, range(3)), [(0, 0), (-1, error), (0, 2)])
+            # Semaphore is released after error, later requests still run.
+            self.assertEqual(client.submit(request, 5).get(), (0, 5))
+
+
+if __name__ == '__main__':
+    unittest.main()
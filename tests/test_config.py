@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from jecket import config
+from jecket.jecket_exceptions import IncorrectConfigFileException
+
+
+class GetConfigTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='jecket_test_')
+        self.path = os.path.join(self.directory, 'jecket.conf')
+        self.environ = dict(os.environ)
+        for variable in config.ENV_OVERRIDES.values():
+            os.environ.pop(variable, None)
+        config.reset()
+
+    def tearDown(self):
+        config.reset()
+        os.environ.clear()
+        os.environ.update(self.environ)
+        shutil.rmtree(self.directory)
+
+    def write(self, content):
+        with open(self.path, 'w') as f:
+            f.write(content)
+
+    def test_yaml_config_with_environment_overrides(self):
+        self.write('base_link: https://bitbucket.test\nusername: user\npassword: secret\npr_id: 12\n')
+        os.environ['PR_ID'] = '13'
+        settings = config.get_config(self.path)
+        self.assertEqual(settings.base_link, 'https://bitbucket.test')
+        self.assertEqual(settings.username, 'user')
+        self.assertEqual(settings.pr_id, '13')
+        self.assertIs(config.get_config(self.path), settings)
+
+    def test_old_three_lines_config(self):
+        self.write('http://bitbucket.test\nuser\nsecret\n')
+        self.assertEqual(config.get_config(self.path).password, 'secret')
+
+    def test_invalid_config(self):
+        self.write('base_link: bitbucket.test\nusername: user\npassword: secret\n')
+        with self.assertRaises(IncorrectConfigFileException):
+            config.get_config(self.path)
+
+    def test_missing_config_is_remembered_until_reset(self):
+        os.environ['PMD_RULES'] = 'java-basic'
+        settings = config.get_config(self.path, required=False)
+        self.assertEqual(settings.get('pmd_rules'), 'java-basic')
+        self.assertIsNone(settings.base_link)
+        with self.assertRaises(IncorrectConfigFileException):
+            config.get_config(self.path)
+
+        self.write('base_link: https://bitbucket.test\nusername: user\npassword: secret\n')
+        self.assertIs(config.get_config(self.path, required=False), settings)
+        with self.assertRaises(IncorrectConfigFileException):
+            config.get_config(self.path)
+
+        config.reset()
+        self.assertEqual(config.get_config(self.path, required=False).base_link, 'https://bitbucket.test')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+from StringIO import StringIO
+
+from jecket import git_changes
+from jecket.git_changes import NULL_SHA, ChangedFile
+from tests.git_repository import GitRepositoryTest
+
+
+A, B, C = 'a' * 40, 'b' * 40, 'c' * 40
+
+
+class FoldChangesTest(unittest.TestCase):
+
+    def test_single_commit(self):
+        changes = git_changes.fold_changes([('new.go', NULL_SHA, A), ('old.go', B, NULL_SHA), ('x.go', A, B)])
+        self.assertEqual(changes, [ChangedFile('new.go', 'A', NULL_SHA, A), ChangedFile('old.go', 'D', B, NULL_SHA),
+                                   ChangedFile('x.go', 'M', A, B)])
+
+    def test_newest_commit_first(self):
+        # x.go: A -> B in the first commit, B -> C in the second one.
+        self.assertEqual(git_changes.fold_changes([('x.go', B, C), ('x.go', A, B)]),
+                         [ChangedFile('x.go', 'M', A, C)])
+
+    def test_added_then_modified_is_added(self):
+        self.assertEqual(git_changes.fold_changes([('x.go', A, B), ('x.go', NULL_SHA, A)]),
+                         [ChangedFile('x.go', 'A', NULL_SHA, B)])
+
+    def test_added_then_deleted_and_reverted_files_are_dropped(self):
+        records = [('tmp.go', A, NULL_SHA), ('tmp.go', NULL_SHA, A), ('x.go', B, A), ('x.go', A, B)]
+        self.assertEqual(git_changes.fold_changes(records), [])
+
+    def test_deleted_then_added_back_is_modified(self):
+        self.assertEqual(git_changes.fold_changes([('x.go', NULL_SHA, B), ('x.go', A, NULL_SHA)]),
+                         [ChangedFile('x.go', 'M', A, B)])
+
+
+class ParseRawRecordsTest(unittest.TestCase):
+
+    def test_records_split_between_chunks(self):
+        raw = ''.join(':100644 100644 {0} {1} M\0{2}\0'.format(A, B, name)
+                      for name in ('a.go', 'dir/with space.go', 'b.go' * 20000))
+        records = list(git_changes.parse_raw_records(StringIO(raw)))
+        self.assertEqual(records, [('a.go', A, B), ('dir/with space.go', A, B), ('b.go' * 20000, A, B)])
+
+    def test_empty_output(self):
+        self.assertEqual(list(git_changes.parse_raw_records(StringIO(''))), [])
+
+
+class ChangedFilesTest(GitRepositoryTest):
+
+    def test_pull_request_commits(self):
+        self.commit({'kept.go': 'a\n', 'gone.go': 'x\n', 'reverted.go': 'r\n'})
+        first = self.commit({'kept.go': 'b\n', 'tmp.go': 't\n', 'reverted.go': 'changed\n'})
+        second = self.commit({'tmp.go': None, 'gone.go': None, 'reverted.go': 'r\n', 'new.go': 'n\n'})
+        changes = git_changes.changed_files(iter([second, first]))
+        self.assertEqual([(change.path, change.status) for change in changes],
+                         [('gone.go', 'D'), ('kept.go', 'M'), ('new.go', 'A')])
+        self.assertEqual(changes[1].new_sha, self.git('rev-parse', '{0}:kept.go'.format(second)))
+
+
+if __name__ == '__main__':
+    unittest.main()
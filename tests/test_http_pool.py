@@ -0,0 +1,60 @@
+import os
+import unittest
+
+from jecket import http_pool
+
+
+def adapter_settings(session):
+    adapter = session.get_adapter('https://bitbucket.test/')
+    return adapter._pool_connections, adapter._pool_maxsize, adapter._pool_block
+
+
+class PoolSettingsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.environ = dict(os.environ)
+        for variable in ('JECKET_POOL_CONNECTIONS', 'JECKET_POOL_MAXSIZE', 'JECKET_POOL_BLOCK', 'JECKET_KEEP_ALIVE'):
+            os.environ.pop(variable, None)
+        self.session, http_pool._session = http_pool._session, None
+        self.min_pool_maxsize, http_pool._min_pool_maxsize = http_pool._min_pool_maxsize, 0
+
+    def tearDown(self):
+        http_pool.close_session()
+        http_pool._session = self.session
+        http_pool._min_pool_maxsize = self.min_pool_maxsize
+        os.environ.clear()
+        os.environ.update(self.environ)
+
+    def test_defaults(self):
+        self.assertEqual(http_pool.pool_settings(), {'pool_connections': 4, 'pool_maxsize': 10, 'pool_block': False,
+                                                     'keep_alive': True})
+
+    def test_environment_variables(self):
+        os.environ.update({'JECKET_POOL_CONNECTIONS': '2', 'JECKET_POOL_MAXSIZE': '3', 'JECKET_POOL_BLOCK': 'Yes',
+                           'JECKET_KEEP_ALIVE': '0'})
+        self.assertEqual(http_pool.pool_settings(), {'pool_connections': 2, 'pool_maxsize': 3, 'pool_block': True,
+                                                     'keep_alive': False})
+        session = http_pool.get_session('user', 'secret')
+        self.assertEqual(adapter_settings(session), (2, 3, True))
+        self.assertEqual(session.headers['Connection'], 'close')
+
+    def test_pool_grows_for_workers(self):
+        os.environ['JECKET_POOL_MAXSIZE'] = '3'
+        session = http_pool.get_session('user', 'secret')
+        http_pool.ensure_pool_size(8)
+        self.assertEqual(http_pool.pool_settings()['pool_maxsize'], 8)
+        self.assertEqual(adapter_settings(session)[1], 8)
+        # Pool never shrinks.
+        http_pool.ensure_pool_size(2)
+        self.assertEqual(adapter_settings(session)[1], 8)
+
+    def test_session_is_shared(self):
+        session = http_pool.get_session('user', 'secret')
+        self.assertIs(http_pool.get_session('other', 'password'), session)
+        self.assertEqual((session.auth.username, session.auth.password), ('other', 'password'))
+        http_pool.close_session()
+        self.assertIsNot(http_pool.get_session('user', 'secret'), session)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+import os
+import textwrap
+import unittest
+
+from jecket import hunks
+from jecket.reports import LintResult
+from tests.git_repository import GitRepositoryTest
+
+
+def parse(text):
+    return hunks.parse_diff(textwrap.dedent(text).splitlines(True))
+
+
+def ranges(index, path):
+    lines = index.files[path]
+    return zip(lines.starts, lines.ends)
+
+
+class ParseDiffTest(unittest.TestCase):
+
+    def test_added_and_changed_lines(self):
+        index = parse('''\
+            diff --git a/src/A.java b/src/A.java
+            index 1111111..2222222 100644
+            --- a/src/A.java
+            +++ b/src/A.java
+            @@ -3 +3 @@ class A {
+            -    int x;
+            +    int y;
+            @@ -10,0 +11,2 @@ class A {
+            +    void f() {}
+            +    void g() {}
+            @@ -20,2 +22,0 @@ class A {
+            -    void h() {}
+            -    void i() {}
+            ''')
+        self.assertEqual(ranges(index, 'src/A.java'), [(3, 3), (11, 12)])
+        self.assertEqual(index.hunks, 2)
+        self.assertTrue(index.contains('src/A.java', 12))
+        self.assertFalse(index.contains('src/A.java', 13))
+
+    def test_content_lines_that_look_like_headers(self):
+        index = parse('''\
+            diff --git a/a.txt b/a.txt
+            --- a/a.txt
+            +++ b/a.txt
+            @@ -1,2 +1,3 @@
+            --- a/old
+            -++ b/old
+            +++ b/not_a_file
+            +--- a/x
+            +diff --git a/y b/y
+            diff --git a/b.txt b/b.txt
+            --- a/b.txt
+            +++ b/b.txt
+            @@ -0,0 +1 @@
+            +x
+            ''')
+        self.assertEqual(sorted(index.files), ['a.txt', 'b.txt'])
+        self.assertEqual(ranges(index, 'a.txt'), [(1, 3)])
+        self.assertEqual(ranges(index, 'b.txt'), [(1, 1)])
+
+    def test_deleted_file(self):
+        index = parse('''\
+            diff --git a/gone.go b/gone.go
+            deleted file mode 100644
+            --- a/gone.go
+            +++ /dev/null
+            @@ -1,2 +0,0 @@
+            -package gone
+            -+++ b/gone.go
+            ''')
+        self.assertEqual(index.files, {})
+
+    def test_renamed_file_with_deletions_only(self):
+        index = parse('''\
+            diff --git a/old.py b/new.py
+            similarity index 90%
+            rename from old.py
+            rename to new.py
+            --- a/old.py
+            +++ b/new.py
+            @@ -5 +4,0 @@
+            -import os
+            ''')
+        self.assertEqual(sorted(index.files), ['new.py'])
+        self.assertFalse(index.has_additions('new.py'))
+        self.assertTrue(index.has_additions('unknown.py'))
+
+    def test_quoted_path_and_no_newline_marker(self):
+        index = parse('''\
+            diff --git "a/dir/with space\\321\\217.txt" "b/dir/with space\\321\\217.txt"
+            --- "a/dir/with space\\321\\217.txt"
+            +++ "b/dir/with space\\321\\217.txt"
+            @@ -1 +1 @@
+            -old
+            \\ No newline at end of file
+            +new
+            \\ No newline at end of file
+            @@ -3,0 +4 @@
+            +tail
+            ''')
+        self.assertEqual(ranges(index, 'dir/with space\xd1\x8f.txt'), [(1, 1), (4, 4)])
+
+    def test_filter_keeps_changed_lines_and_file_errors(self):
+        index = parse('''\
+            diff --git a/A.java b/A.java
+            --- a/A.java
+            +++ b/A.java
+            @@ -1,0 +2,2 @@
+            +a
+            +b
+            ''')
+        result = LintResult('pmd', 'A.java')
+        for line in (1, 2, 3, 4, None):
+            result.add(line, 'rule', 'warning')
+        self.assertEqual([location[0] for location in index.filter(result).locations], [2, 3, None])
+
+
+class ChangedLinesTest(GitRepositoryTest):
+
+    def test_pull_request_diff(self):
+        self.commit({'a.txt': 'one\ntwo\n', 'gone.txt': 'x\n'})
+        first = self.commit({'a.txt': 'one\n++ plus\ntwo\n', 'new file.txt': 'n\n'})
+        second = self.commit({'a.txt': 'one\n++ plus\ntwo\n-- minus\n', 'gone.txt': None})
+        index = hunks.changed_lines([second, first])
+        self.assertEqual(sorted(index.files), ['a.txt', 'new file.txt'])
+        self.assertEqual(ranges(index, 'a.txt'), [(2, 2), (4, 4)])
+        self.assertEqual(ranges(index, 'new file.txt'), [(1, 1)])
+
+    def test_root_commit(self):
+        root = self.commit({'a.txt': 'one\n'})
+        self.assertEqual(ranges(hunks.changed_lines([root]), 'a.txt'), [(1, 1)])
+
+    def test_target_branch_merged_into_pull_request(self):
+        self.commit({'a.txt': 'one\ntwo\n'})
+        self.git('branch', 'target')
+        self.git('checkout', '-q', '-b', 'feature')
+        first = self.commit({'a.txt': 'one\nchanged\n'})
+        self.git('checkout', '-q', 'target')
+        self.commit({'b.txt': 'target\n'})
+        self.git('checkout', '-q', 'feature')
+        self.git('merge', '-q', '--no-edit', 'target')
+        commits = [self.git('rev-parse', 'HEAD'), first]
+        self.assertEqual(sorted(hunks.changed_lines(commits, 'target').files), ['a.txt'])
+        environ = dict(os.environ)
+        try:
+            os.environ['JECKET_TARGET_BRANCH'] = 'target'
+            self.assertEqual(sorted(hunks.changed_lines(commits).files), ['a.txt'])
+            # Without target branch its merged lines are counted as changed.
+            del os.environ['JECKET_TARGET_BRANCH']
+            self.assertEqual(sorted(hunks.changed_lines(commits).files), ['a.txt', 'b.txt'])
+            self.assertEqual(sorted(hunks.changed_lines(commits, 'missing').files), ['a.txt', 'b.txt'])
+        finally:
+            os.environ.clear()
+            os.environ.update(environ)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import os
+import subprocess
+import sys
+import unittest
+
+import jecket
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Prints, which modules are imported after every step.
+PROBE = '''
+import sys
+import jecket
+def loaded():
+    return ','.join(str(int(name in sys.modules)) for name in ('jecket.prfile', 'requests', 'jecket.set_conf'))
+print(loaded())
+jecket.set_conf
+print(loaded())
+jecket.PRFile
+print(loaded())
+'''
+
+
+class LazyModuleTest(unittest.TestCase):
+
+    def test_imports_on_attribute_access(self):
+        output = subprocess.check_output([sys.executable, '-c', PROBE], cwd=ROOT)
+        self.assertEqual(output.split(), ['0,0,0', '0,0,1', '1,0,1'])
+
+    def test_attributes(self):
+        from jecket.prfile import PRFile
+        self.assertIs(jecket.PRFile, PRFile)
+        self.assertIs(jecket.static_check, sys.modules['jecket.static_check'])
+        self.assertRaises(AttributeError, getattr, jecket, 'missing')
+        self.assertTrue(set(jecket.__all__) <= set(dir(jecket)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import logging
+import unittest
+
+from jecket import logs
+from jecket.logs import truncated
+
+
+class TruncatedTest(unittest.TestCase):
+
+    def setUp(self):
+        self.max_payload = logs.max_payload
+
+    def tearDown(self):
+        logs.max_payload = self.max_payload
+
+    def test_limit_boundary(self):
+        self.assertEqual(str(truncated('abcde', 5)), 'abcde')
+        self.assertEqual(str(truncated('abcdef', 5)), 'abcde... [truncated 1 of 6 characters]')
+        self.assertEqual(str(truncated('abcdef', 0)), 'abcdef')
+
+    def test_default_limit_and_repr(self):
+        logs.max_payload = 4
+        self.assertEqual(str(truncated({'a': 1})), "{'a'... [truncated 4 of 8 characters]")
+        logs.max_payload = 8
+        self.assertEqual(repr(truncated({'a': 1})), "{'a': 1}")
+
+    def test_converted_only_when_emitted(self):
+        class Payload(object):
+            calls = 0
+
+            def __repr__(self):
+                Payload.calls += 1
+                return 'payload'
+
+        logger = logging.getLogger('jecket.test_logs')
+        logger.setLevel(logging.INFO)
+        logger.debug('Payload: %s', truncated(Payload()))
+        self.assertEqual(Payload.calls, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
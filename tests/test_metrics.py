@@ -0,0 +1,64 @@
+import os
+import re
+import shutil
+import tempfile
+import unittest
+
+from jecket import metrics
+from jecket.metrics import Metrics
+
+SAMPLE = re.compile(r'^[a-z_]+(\{[a-z_]+="(?:[^"\\]|\\.)*"(,[a-z_]+="(?:[^"\\]|\\.)*")*\})? [-+0-9.e]+$')
+
+
+class PrometheusTest(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = Metrics()
+        url = 'http://bitbucket.test/rest/api/1.0/projects/P/repos/r/pull-requests/7/comments/12'
+        self.metrics.record_http('post', url, 0.5, 201, sent_bytes=100, received_bytes=50)
+        self.metrics.record_http('POST', url, 1.5, None)
+        self.metrics.record_retry('POST', url)
+        self.metrics.record_subprocess('pmd', 2.0, 4)
+        self.metrics.record_schedule('files "all"', 4, 10, 3.0, 3.5)
+        with self.metrics.phase('analyze'):
+            pass
+
+    def test_text_format(self):
+        lines = self.metrics.to_prometheus().splitlines()
+        names = []
+        for line in lines:
+            if line.startswith('# HELP '):
+                names.append(line.split()[2])
+            elif line.startswith('# TYPE '):
+                self.assertEqual(line, '# TYPE {0} gauge'.format(names[-1]))
+            else:
+                self.assertRegexpMatches(line, SAMPLE)
+                self.assertTrue(line.startswith(names[-1]))
+        self.assertEqual(len(names), len(set(names)))
+        self.assertIn('jecket_http_requests{endpoint="comments",method="POST"} 2', lines)
+        self.assertIn('jecket_http_errors{endpoint="comments",method="POST"} 1', lines)
+        self.assertIn('jecket_http_retries{endpoint="comments",method="POST"} 1', lines)
+        self.assertIn('jecket_http_sent_bytes{endpoint="comments",method="POST"} 100', lines)
+        self.assertIn('jecket_subprocess_failures{tool="pmd"} 1', lines)
+        self.assertIn('jecket_phase_count{phase="analyze"} 1', lines)
+        self.assertIn('jecket_schedule_actual_seconds{jobs="4",schedule="files \\"all\\""} 3.5', lines)
+
+    def test_emit_textfile(self):
+        directory = tempfile.mkdtemp(prefix='jecket_test_')
+        saved, metrics._metrics = metrics._metrics, self.metrics
+        try:
+            path = os.path.join(directory, 'jecket.prom')
+            metrics.emit(os.path.join(directory, 'metrics.json'), path)
+            with open(path) as f:
+                content = f.read()
+            self.assertTrue(content.startswith('# HELP jecket_run_duration_seconds '))
+            self.assertIn('jecket_subprocess_runs{tool="pmd"} 1\n', content)
+            # Temporary files are renamed, collector never sees them.
+            self.assertEqual(sorted(os.listdir(directory)), ['jecket.prom', 'metrics.json'])
+        finally:
+            metrics._metrics = saved
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
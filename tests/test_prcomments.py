@@ -0,0 +1,136 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import jecket
+from jecket import config
+from jecket.jecket_exceptions import IncorrectJsonException
+from jecket.result_cache import ResultCache
+
+
+class BitBucketTest(unittest.TestCase):
+    """Base test with config file and paged responses instead of BitBucket."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='jecket_test_')
+        self.environ = dict(os.environ)
+        self.config_path = jecket.PRFile.config
+        for variable in config.ENV_OVERRIDES.values():
+            os.environ.pop(variable, None)
+        jecket.PRFile.config = os.path.join(self.directory, 'jecket.conf')
+        with open(jecket.PRFile.config, 'w') as f:
+            f.write('base_link: http://bitbucket.test\nusername: user\npassword: secret\n'
+                    'slug: PRJ\nproject: repo\npr_id: 7\n')
+        config.reset()
+        self.requests = []
+
+    def tearDown(self):
+        jecket.PRFile.config = self.config_path
+        config.reset()
+        os.environ.clear()
+        os.environ.update(self.environ)
+        shutil.rmtree(self.directory)
+
+    def serve(self, pr_file, pages, code=200):
+        """Replaces GET requests of pr_file with pages, every page is a list
+        of values. Requests are recorded as (url, start, limit).
+        """
+        def send_get_request(url, params):
+            self.requests.append((url, params.get('start'), params.get('limit')))
+            if code != 200:
+                return code, '{"errors": []}'
+            number = params['start'] // 10
+            page = {'values': pages[number], 'isLastPage': number == len(pages) - 1}
+            if not page['isLastPage']:
+                page['nextPageStart'] = (number + 1) * 10
+            return code, json.dumps(page)
+
+        pr_file.send_get_request = send_get_request
+        return pr_file
+
+
+class IterCommitsTest(BitBucketTest):
+
+    def commits(self, git_commit=None, cache=None):
+        pr = self.serve(jecket.PRCommits(), [[{'id': 'c3'}, {'id': 'c2'}], [{'id': 'c1'}]])
+        pr.git_commit = git_commit
+        return pr.get_commits(limit=2, cache=cache)
+
+    def test_reads_all_pages(self):
+        self.assertEqual(self.commits(), ['c3', 'c2', 'c1'])
+        url = 'http://bitbucket.test/rest/api/1.0/projects/PRJ/repos/repo/pull-requests/7/commits'
+        self.assertEqual(self.requests, [(url, 0, 2), (url, 10, 2)])
+
+    def test_error_response(self):
+        pr = self.serve(jecket.PRCommits(), [], code=401)
+        self.assertRaises(IncorrectJsonException, pr.get_commits)
+
+    def test_cached_when_head_is_newest_commit(self):
+        cache = ResultCache(os.path.join(self.directory, 'cache'))
+        self.assertEqual(self.commits('c3', cache), ['c3', 'c2', 'c1'])
+        self.assertEqual(self.commits('c3', cache), ['c3', 'c2', 'c1'])
+        self.assertEqual(len(self.requests), 2)
+
+    def test_not_cached_for_other_head(self):
+        cache = ResultCache(os.path.join(self.directory, 'cache'))
+        # Merge commit built by CI is not a commit of pull request.
+        self.commits('merge', cache)
+        self.commits('merge', cache)
+        self.assertEqual(len(self.requests), 4)
+        # Commit list is not cached without head commit.
+        self.commits(None, cache)
+        self.commits(None, cache)
+        self.assertEqual(len(self.requests), 8)
+
+
+def activity(comment_id, path, author, action='COMMENTED', version=0):
+    return {'action': action, 'commentAnchor': {'path': path} if path else None,
+            'comment': {'id': comment_id, 'version': version, 'text': 'text {0}'.format(comment_id),
+                        'author': {'name': author}}}
+
+
+class CommentIndexTest(BitBucketTest):
+
+    def test_builds_index_from_all_pages(self):
+        pr = self.serve(jecket.PRComments(), [
+            [activity(1, 'A.java', 'jenkins', version=2), activity(2, None, 'jenkins'),
+             activity(3, 'A.java', 'jenkins', action='APPROVED')],
+            [activity(4, 'A.java', 'developer'), activity(1, 'A.java', 'jenkins', version=2),
+             activity(5, 'A.java', 'jenkins'), activity(6, 'B.java', 'jenkins')]])
+        index = pr.get_comment_index(limit=3)
+        self.assertEqual([request[1:] for request in self.requests], [(0, 3), (10, 3)])
+        # Activities are newest first, the newest comment of author wins.
+        self.assertEqual(index.comments, {('A.java', 'jenkins'): (1, 2, 'text 1'),
+                                          ('A.java', 'developer'): (4, 0, 'text 4'),
+                                          ('B.java', 'jenkins'): (6, 0, 'text 6')})
+        self.assertEqual(index.check_comments('A.java', 'jenkins'), (0, (1, 2)))
+        self.assertEqual(index.check_comments('C.java', 'jenkins'), (0, 'New comment required.'))
+
+    def test_update_from_response(self):
+        index = jecket.CommentIndex()
+        index.update_from_response('A.java', 'jenkins', (201, '{"id": 8, "version": 0, "text": "new"}'))
+        index.update_from_response('A.java', 'jenkins', (409, '{"id": 9, "version": 0}'))
+        index.update_from_response('B.java', 'jenkins', (200, 'not json'))
+        self.assertEqual(index.comments, {('A.java', 'jenkins'): (8, 0, 'new')})
+
+
+class FileCommentsTest(BitBucketTest):
+
+    def test_reads_all_pages(self):
+        values = [activity(4, 'A.java', 'developer')['comment'], activity(5, 'A.java', 'jenkins', version=3)['comment']]
+        pr = self.serve(jecket.PRFile('A.java'), [values[:1], values[1:]])
+        self.assertEqual(pr.get_all_comments_for_file(), (0, values))
+        self.assertEqual([request[1] for request in self.requests], [0, 10])
+        self.assertEqual(pr.check_comments_from_specific_author('jenkins'), (0, (5, 3)))
+        self.assertEqual(pr.check_comments_from_specific_author('reviewer'), (0, 'New comment required.'))
+
+    def test_error_response(self):
+        pr = self.serve(jecket.PRFile('A.java'), [], code=500)
+        self.assertEqual(pr.get_all_comments_for_file(), (-1, '500: {"errors": []}'))
+        self.assertEqual(pr.check_comments_from_specific_author('jenkins'), (-1, '500: {"errors": []}'))
+
+
+if __name__ == '__main__':
+    unittest.main()
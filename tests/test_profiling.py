@@ -0,0 +1,62 @@
+import os
+import pstats
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from jecket import profiling
+
+
+def spin(seconds):
+    end = time.time() + seconds
+    while time.time() < end:
+        pass
+
+
+def sleeper(seconds):
+    with profiling.blocking('subprocess'):
+        time.sleep(seconds)
+
+
+class ProfileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='jecket_test_')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_writes_pstats_and_collapsed_stacks(self):
+        prefix = os.path.join(self.directory, 'profile')
+        with profiling.profile(prefix, interval=0.002) as profiler:
+            threads = [threading.Thread(target=spin, args=(0.2,)), threading.Thread(target=sleeper, args=(0.2,))]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertIsNone(profiling._profiler)
+
+        # Calls of worker threads are merged into one profile.
+        functions = set(name for _, _, name in pstats.Stats(prefix + '.pstats').stats)
+        self.assertTrue(set(['spin', 'sleeper']) <= functions)
+
+        stacks = {}
+        with open(prefix + '.collapsed') as f:
+            for line in f:
+                stack, count = line.rsplit(' ', 1)
+                stacks[stack] = int(count)
+        self.assertTrue(any(stack.endswith('test_profiling:spin;[python]') for stack in stacks))
+        self.assertTrue(any('test_profiling:sleeper' in stack and stack.endswith('[blocked:subprocess]')
+                            for stack in stacks))
+        self.assertEqual(sum(stacks.values()), sum(profiler.tags.values()))
+        self.assertAlmostEqual(sum(profiler.summary().values()), 1.0)
+
+    def test_blocking_without_profiler(self):
+        with profiling.blocking('http'):
+            self.assertEqual(profiling._blocking.get(threading.current_thread().ident, []), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
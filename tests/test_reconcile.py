@@ -0,0 +1,82 @@
+import unittest
+
+import jecket
+from jecket import reconcile
+
+
+AUTHOR = 'jenkins'
+LINK = 'http://jenkins.test/job/1/'
+
+
+def comment_text(results, link='http://jenkins.test/job/0/'):
+    return jecket.PRFile.generate_comment_text(results, link)
+
+
+class PlanTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = jecket.CommentIndex()
+
+    def plan(self, file_results, extensions=('.java',)):
+        return reconcile.plan(file_results, self.index, AUTHOR, list(extensions), LINK)
+
+    def test_creates_comment_for_new_violations(self):
+        operations = self.plan({'A.java': {'PMD errors: ': 2}})
+        self.assertEqual([(operation.action, operation.path) for operation in operations], [('create', 'A.java')])
+        self.assertEqual(operations[0].text, comment_text({'PMD errors: ': 2}, LINK))
+
+    def test_keeps_comment_with_same_results_and_other_build_link(self):
+        self.index.add('A.java', AUTHOR, 1, 0, comment_text({'PMD errors: ': 2}))
+        self.assertEqual(self.plan({'A.java': {'PMD errors: ': 2}}), [])
+
+    def test_updates_comment_with_changed_results(self):
+        self.index.add('A.java', AUTHOR, 1, 3, comment_text({'PMD errors: ': 2}))
+        operations = self.plan({'A.java': {'PMD errors: ': 1}})
+        self.assertEqual([(operation.action, operation.comment_id, operation.version) for operation in operations],
+                         [('update', 1, 3)])
+
+    def test_deletes_comment_of_clean_file(self):
+        self.index.add('A.java', AUTHOR, 1, 3, comment_text({'PMD errors: ': 2}))
+        operations = self.plan({'A.java': {'PMD errors: ': 0, 'Checkstyle': 'violations: 0, errors: 0'}})
+        self.assertEqual([(operation.action, operation.comment_id) for operation in operations], [('delete', 1)])
+
+    def test_deletes_stale_comment_of_file_not_in_pull_request(self):
+        self.index.add('Removed.java', AUTHOR, 5, 0, comment_text({'PMD errors: ': 2}))
+        operations = self.plan({})
+        self.assertEqual([(operation.action, operation.path) for operation in operations], [('delete', 'Removed.java')])
+
+    def test_keeps_comments_of_other_authors_and_extensions(self):
+        self.index.add('A.java', 'someone', 1, 0, 'Looks good.')
+        self.index.add('main.go', AUTHOR, 2, 0, comment_text({'golint': 1}))
+        self.assertEqual(self.plan({'A.java': {'PMD errors: ': 0}}), [])
+
+    def test_skips_file_that_could_not_be_checked(self):
+        self.index.add('A.java', AUTHOR, 1, 0, comment_text({'PMD errors: ': 2}))
+        self.assertEqual(self.plan({'A.java': (-1, 'PMD is not installed.'), 'B.java': (-1, 'timeout')}), [])
+
+    def test_skips_file_with_failed_tool(self):
+        self.index.add('A.java', AUTHOR, 1, 0, comment_text({'PMD errors: ': 2}))
+        file_results = {
+            'A.java': {'PMD errors: ': 0, 'Checkstyle': (-1, 'Checkstyle crashed.')},
+            'B.java': {'PMD errors: ': 3, 'Checkstyle': (-1, 'Checkstyle crashed.')},
+        }
+        self.assertEqual(self.plan(file_results), [])
+
+    def test_operations_are_sorted_by_path(self):
+        self.index.add('A.java', AUTHOR, 1, 0, comment_text({'PMD errors: ': 2}))
+        operations = self.plan({'B.java': {'PMD errors: ': 1}, 'C.java': {'PMD errors: ': 1}})
+        self.assertEqual([operation.path for operation in operations], ['A.java', 'B.java', 'C.java'])
+
+
+class IsCleanTest(unittest.TestCase):
+
+    def test_numbers_and_messages(self):
+        self.assertTrue(reconcile.is_clean({'PMD errors: ': 0, 'Checkstyle': 'violations: 0, errors: 0'}))
+        self.assertFalse(reconcile.is_clean({'Checkstyle': 'violations: 0, errors: 2'}))
+
+    def test_error_tuple_is_not_clean(self):
+        self.assertFalse(reconcile.is_clean({'PMD errors: ': (-1, 'failed')}))
+
+
+if __name__ == '__main__':
+    unittest.main()
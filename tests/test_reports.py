@@ -0,0 +1,183 @@
+import json
+import unittest
+from StringIO import StringIO
+
+from jecket import reports
+from jecket.reports import LintResult, iter_json_array, parse_checkstyle, parse_golint, parse_pmd, parse_tailor
+
+
+PMD_REPORT = """<?xml version="1.0" encoding="UTF-8"?>
+<pmd xmlns="http://pmd.sourceforge.net/report/2.0.0" version="6.0.0">
+<file name="/work/src/A.java">
+<violation beginline="3" endline="3" rule="UnusedImports" priority="4">
+Avoid unused imports such as 'java.util.List'
+</violation>
+<violation beginline="10" rule="EmptyCatchBlock" priority="3">Avoid empty catch blocks</violation>
+</file>
+<file name="/work/src/B.java">
+<violation beginline="1" rule="UnusedImports" priority="4">Avoid unused imports</violation>
+</file>
+<error filename="/work/src/C.java" msg="ParseException"/>
+</pmd>
+"""
+
+CHECKSTYLE_REPORT = """<?xml version="1.0" encoding="UTF-8"?>
+<checkstyle version="8.0">
+<file name="src/A.java">
+<error line="7" column="5" severity="warning" message="Missing a Javadoc comment."
+ source="com.puppycrawl.tools.checkstyle.checks.javadoc.JavadocMethodCheck"/>
+<error line="12" severity="error" message="Line is longer than 100 characters."
+ source="com.puppycrawl.tools.checkstyle.checks.sizes.LineLengthCheck"/>
+</file>
+<file name="src/Clean.java">
+</file>
+</checkstyle>
+"""
+
+
+class LintResultTest(unittest.TestCase):
+
+    def test_counts_and_round_trip(self):
+        result = LintResult('pmd', 'A.java')
+        result.add(3, 'UnusedImports', '4', 'unused')
+        result.add(None, 'UnusedImports', '3')
+        result.skipped = True
+        self.assertEqual((result.total, result.count('4'), result.count('1')), (2, 1, 0))
+        self.assertEqual(result.by_rule, {'UnusedImports': 2})
+        copy = LintResult.from_dict(json.loads(json.dumps(result.to_dict())))
+        self.assertEqual((copy.tool, copy.path, copy.total, copy.skipped), ('pmd', 'A.java', 2, True))
+        self.assertEqual(copy.locations, result.locations)
+
+
+class ParsePmdTest(unittest.TestCase):
+
+    def test_violations_per_file(self):
+        results = parse_pmd(StringIO(PMD_REPORT))
+        self.assertEqual(sorted(results), ['/work/src/A.java', '/work/src/B.java'])
+        result = results['/work/src/A.java']
+        self.assertEqual(result.locations, [(3, 'UnusedImports', '4', "Avoid unused imports such as 'java.util.List'"),
+                                            (10, 'EmptyCatchBlock', '3', 'Avoid empty catch blocks')])
+        self.assertEqual(results['/work/src/B.java'].total, 1)
+
+    def test_invalid_report(self):
+        # ElementTree.ParseError is subclass of SyntaxError.
+        self.assertRaises(SyntaxError, parse_pmd, StringIO('<pmd><file name="A.java">'))
+
+
+class ParseCheckstyleTest(unittest.TestCase):
+
+    def test_violations_per_file(self):
+        results = parse_checkstyle(StringIO(CHECKSTYLE_REPORT))
+        self.assertEqual(sorted(results), ['src/A.java'])
+        self.assertEqual(results['src/A.java'].locations,
+                         [(7, 'JavadocMethodCheck', 'warning', 'Missing a Javadoc comment.'),
+                          (12, 'LineLengthCheck', 'error', 'Line is longer than 100 characters.')])
+        self.assertEqual(results['src/A.java'].count('error'), 1)
+
+
+class ParseTailorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.chunk_size = reports.CHUNK_SIZE
+        # Items and keys are split between reads.
+        reports.CHUNK_SIZE = 7
+
+    def tearDown(self):
+        reports.CHUNK_SIZE = self.chunk_size
+
+    def test_violations_per_file(self):
+        report = json.dumps({
+            'summary': {'analyzed': 3},
+            'files': [
+                {'path': 'A.swift', 'parsed': True, 'violations': [
+                    {'severity': 'warning', 'rule': 'trailing-whitespace', 'location': {'line': 4, 'column': 9},
+                     'message': 'Line should not have any trailing whitespace'},
+                    {'severity': 'error', 'rule': 'max-line-length', 'location': {'line': 20},
+                     'message': 'Line should be 100 characters or less: "a, b"'}]},
+                {'path': 'B.swift', 'parsed': False, 'violations': []},
+                {'path': 'C.swift', 'parsed': True, 'violations': []},
+            ],
+        }, indent=2)
+        results = parse_tailor(StringIO(report))
+        self.assertEqual(sorted(results), ['A.swift', 'B.swift', 'C.swift'])
+        self.assertEqual([(location[0], location[1]) for location in results['A.swift'].locations],
+                         [(4, 'trailing-whitespace'), (20, 'max-line-length')])
+        self.assertEqual((results['A.swift'].count('error'), results['A.swift'].count('warning')), (1, 1))
+        self.assertTrue(results['B.swift'].skipped)
+        self.assertEqual((results['C.swift'].total, results['C.swift'].skipped), (0, False))
+
+    def test_raw_newlines_in_strings(self):
+        report = '{"files": [{"path": "A.swift", "violations": [{"message": "two\nlines"}]}]}'
+        self.assertEqual(parse_tailor(StringIO(report))['A.swift'].locations[0][3], 'two\nlines')
+
+    def test_missing_and_truncated_report(self):
+        self.assertEqual(parse_tailor(StringIO('{"summary": {}}')), {})
+        self.assertRaises(ValueError, parse_tailor, StringIO('{"files": [{"path": "A.swift", "viol'))
+
+
+class IterJsonArrayTest(unittest.TestCase):
+
+    def setUp(self):
+        self.chunk_size = reports.CHUNK_SIZE
+        self.decoder = json.JSONDecoder
+        reports.CHUNK_SIZE = 7
+
+    def tearDown(self):
+        reports.CHUNK_SIZE = self.chunk_size
+        json.JSONDecoder = self.decoder
+
+    def test_items_split_between_reads(self):
+        items = [1, -2.5e3, True, None, 'a]b\\"c', ['[', {'}': '\\'}], {'x': [1, 2], 'y': '"{'}, []]
+        report = json.dumps({'other': [0], 'files': items, 'after': 1})
+        self.assertEqual(list(iter_json_array(StringIO(report), 'files')), items)
+
+    def test_large_item_is_decoded_once(self):
+        calls = []
+
+        class CountingDecoder(self.decoder):
+
+            def raw_decode(self, s, idx=0):
+                calls.append(idx)
+                return super(CountingDecoder, self).raw_decode(s, idx)
+
+        json.JSONDecoder = CountingDecoder
+        violations = [{'rule': 'rule-{0}'.format(i), 'message': 'x' * 100} for i in range(5000)]
+        report = json.dumps({'files': [{'path': 'A.swift', 'violations': violations}, {'path': 'B.swift'}]})
+        items = list(iter_json_array(StringIO(report), 'files'))
+        self.assertEqual([item['path'] for item in items], ['A.swift', 'B.swift'])
+        self.assertEqual(items[0]['violations'], violations)
+        self.assertEqual(len(calls), 2)
+
+    def test_truncated_array(self):
+        self.assertRaises(ValueError, list, iter_json_array(StringIO('{"files": [1, 2'), 'files'))
+        self.assertRaises(ValueError, list, iter_json_array(StringIO('{"files": ["a\\'), 'files'))
+
+
+class ParseGolintTest(unittest.TestCase):
+
+    def test_attributes_lines_to_files(self):
+        results = parse_golint(StringIO('a/x.go:3:1: exported function Foo should have comment\n'
+                                        'a/x.go:7:2: error strings should not be capitalized\n'
+                                        'a/y.go:1:1: package comment should be of the form\n'))
+        self.assertEqual(sorted(results), ['a/x.go', 'a/y.go'])
+        self.assertEqual(results['a/x.go'].total, 2)
+        self.assertEqual([location[0] for location in results['a/x.go'].locations], [3, 7])
+        self.assertEqual(results['a/y.go'].locations[0][3], 'package comment should be of the form')
+
+    def test_message_may_contain_colons(self):
+        results = parse_golint(StringIO('x.go:3:1: should replace x += 1 with x++: see Effective Go\n'))
+        self.assertEqual(results['x.go'].locations[0][3], 'should replace x += 1 with x++: see Effective Go')
+
+    def test_collects_unattributed_lines(self):
+        unattributed = []
+        results = parse_golint(StringIO('open missing.go: no such file or directory\n\nx.go:2:1: comment\n'),
+                               unattributed)
+        self.assertEqual(unattributed, ['open missing.go: no such file or directory'])
+        self.assertEqual(sorted(results), ['x.go'])
+
+    def test_ignores_unattributed_lines_by_default(self):
+        self.assertEqual(parse_golint(StringIO('flag provided but not defined: -x\n')), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+
+from requests.exceptions import ConnectTimeout, ReadTimeout
+
+from jecket.request_policy import RequestPolicy
+
+
+class Response(object):
+
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class Sender(object):
+    """Returns or raises given outcomes one by one."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def __call__(self, timeout):
+        outcome = self.outcomes[min(self.calls, len(self.outcomes) - 1)]
+        self.calls += 1
+        if isinstance(outcome, Exception):
+            raise outcome
+        return Response(outcome)
+
+
+class SendTest(unittest.TestCase):
+
+    def setUp(self):
+        self.policy = RequestPolicy(max_retries=3, backoff_base=0.0, backoff_max=0.0)
+
+    def send(self, method, *outcomes):
+        sender = Sender(*outcomes)
+        try:
+            return self.policy.send(sender, method, 'http://bitbucket.test/'), sender.calls
+        except Exception as e:
+            return e, sender.calls
+
+    def test_get_is_retried_on_server_errors_and_timeouts(self):
+        response, calls = self.send('GET', 502, ReadTimeout('slow'), 200)
+        self.assertEqual((response.status_code, calls), (200, 3))
+
+    def test_retries_are_limited(self):
+        response, calls = self.send('GET', 503)
+        self.assertEqual((response.status_code, calls), (503, 4))
+        error, calls = self.send('GET', ReadTimeout('slow'))
+        self.assertIsInstance(error, ReadTimeout)
+        self.assertEqual(calls, 4)
+
+    def test_mutations_are_not_retried_after_they_may_be_processed(self):
+        for method in ('POST', 'PUT', 'DELETE'):
+            for status in (500, 502, 503, 504):
+                response, calls = self.send(method, status, 200)
+                self.assertEqual((method, response.status_code, calls), (method, status, 1))
+            error, calls = self.send(method, ReadTimeout('slow'), 200)
+            self.assertIsInstance(error, ReadTimeout)
+            self.assertEqual(calls, 1)
+
+    def test_mutations_are_retried_if_they_were_not_processed(self):
+        for method in ('POST', 'PUT', 'DELETE'):
+            response, calls = self.send(method, 429, ConnectTimeout('no connection'), 201)
+            self.assertEqual((method, response.status_code, calls), (method, 201, 3))
+
+    def test_retry_methods(self):
+        self.policy = RequestPolicy(max_retries=3, backoff_base=0.0, backoff_max=0.0,
+                                    retry_methods=('GET', 'put'))
+        response, calls = self.send('PUT', 503, 200)
+        self.assertEqual((response.status_code, calls), (200, 2))
+
+    def test_retry_after(self):
+        self.assertEqual(RequestPolicy(backoff_max=30.0).retry_after(Response(429, {'Retry-After': '7'})), 7.0)
+        self.assertEqual(RequestPolicy(backoff_max=5.0).retry_after(Response(429, {'Retry-After': '7'})), 5.0)
+        self.assertIsNone(RequestPolicy().retry_after(Response(429, {'Retry-After': 'soon'})))
+
+
+if __name__ == '__main__':
+    unittest.main()
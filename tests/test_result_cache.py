@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from jecket.result_cache import ResultCache, fingerprint, git_blob_sha
+
+
+class ResultCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='jecket_test_')
+        self.cache = ResultCache(os.path.join(self.directory, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def files(self):
+        return sorted(name for _, _, files in os.walk(self.cache.directory) for name in files)
+
+    def test_round_trip(self):
+        value = {'Violations: ': 2, 'locations': [[3, 'rule', 'warning', 'message']]}
+        self.assertIsNone(self.cache.get('ab' * 20))
+        self.cache.put('ab' * 20, value)
+        self.assertEqual(self.cache.get('ab' * 20), value)
+        self.assertEqual(self.cache.stats(), {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+        self.assertEqual(self.files(), ['{0}.json'.format('ab' * 20)])
+
+    def test_failed_write_keeps_previous_entry(self):
+        self.cache.put('ab' * 20, {'Violations: ': 0})
+        # json.dump fails after part of the value is written.
+        self.cache.put('ab' * 20, {'Violations: ': 0, 'locations': [object()]})
+        self.assertEqual(self.cache.get('ab' * 20), {'Violations: ': 0})
+        self.assertEqual(self.files(), ['{0}.json'.format('ab' * 20)])
+
+    def test_evicts_least_recently_used(self):
+        keys = ['{0:02d}'.format(i) * 20 for i in range(3)]
+        for number, key in enumerate(keys):
+            self.cache.put(key, 'x' * 100)
+            os.utime(self.cache.entry_path(key), (100 + number, 100 + number))
+        size = os.path.getsize(self.cache.entry_path(keys[0]))
+        self.cache.max_bytes = 2 * size
+        # Hit makes the oldest entry the most recently used one.
+        self.assertEqual(self.cache.get(keys[0]), 'x' * 100)
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertEqual([self.cache.get(key) is not None for key in keys], [True, False, True])
+        self.assertEqual(self.cache.evict(), 0)
+
+    def test_key_depends_on_content_tool_and_rules(self):
+        path = os.path.join(self.directory, 'A.java')
+        rules = os.path.join(self.directory, 'rules.xml')
+        with open(path, 'w') as f:
+            f.write('hello\n')
+        with open(rules, 'w') as f:
+            f.write('<rules/>\n')
+        # The same as 'git hash-object A.java'.
+        self.assertEqual(git_blob_sha(path), 'ce013625030ba8dba906f756967f9e9ca394464a')
+        ruleset = fingerprint([rules, 'quickstart'])
+        key = ResultCache.key(git_blob_sha(path), 'pmd', '6.0.0', ruleset)
+        self.assertEqual(ResultCache.key(git_blob_sha(path), 'pmd', '6.0.0', ruleset), key)
+        self.assertNotEqual(ResultCache.key(git_blob_sha(path), 'pmd', '6.1.0', ruleset), key)
+        self.assertNotEqual(ResultCache.key(git_blob_sha(path), 'checkstyle', '6.0.0', ruleset), key)
+        with open(rules, 'w') as f:
+            f.write('<rules><rule/></rules>\n')
+        self.assertNotEqual(fingerprint([rules, 'quickstart']), ruleset)
+        with open(path, 'w') as f:
+            f.write('hello, world\n')
+        self.assertNotEqual(ResultCache.key(git_blob_sha(path), 'pmd', '6.0.0', ruleset), key)
+
+
+if __name__ == '__main__':
+    unittest.main()
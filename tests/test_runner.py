@@ -0,0 +1,108 @@
+import errno
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from jecket import runner
+
+
+class Interrupted(BaseException):
+    pass
+
+
+class RunTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='jecket_test_')
+        self.pid_file = os.path.join(self.directory, 'pid')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def assertGroupKilled(self):
+        with open(self.pid_file) as f:
+            pid = int(f.read())
+        # Killed children are reparented to init, give it time to reap them.
+        for _ in range(50):
+            try:
+                os.killpg(pid, 0)
+            except OSError as e:
+                self.assertEqual(e.errno, errno.ESRCH)
+                return
+            time.sleep(0.1)
+        self.fail('Process group {0} is still running.'.format(pid))
+
+    def test_captures_output_and_error(self):
+        with runner.run(['sh', '-c', 'echo out; echo err >&2; exit 3'], timeout=10) as result:
+            self.assertEqual(result.code, 3)
+            self.assertFalse(result.ok)
+            self.assertEqual(result.read_output(), 'out\n')
+            self.assertEqual(result.read_error(), 'err\n')
+
+    def test_spills_large_output(self):
+        os.environ['JECKET_OUTPUT_MEMORY'] = '1024'
+        try:
+            with runner.run(['sh', '-c', 'head -c 100000 /dev/zero'], timeout=10) as result:
+                self.assertTrue(result.ok)
+                self.assertEqual(len(result.read_output()), 100000)
+                self.assertEqual(len(result.read_output(10)), 10)
+        finally:
+            del os.environ['JECKET_OUTPUT_MEMORY']
+
+    def test_missing_command(self):
+        with runner.run(['jecket-missing-command'], timeout=10) as result:
+            self.assertEqual(result.code, -1)
+            self.assertIn('No such file', result.describe())
+
+    def test_timeout_kills_process_group(self):
+        start = time.time()
+        command = 'echo $$ > {0}; sleep 30 & sleep 30'.format(self.pid_file)
+        with runner.run(['sh', '-c', command], timeout=0.5) as result:
+            self.assertTrue(result.timed_out)
+            self.assertFalse(result.ok)
+            self.assertLess(result.code, 0)
+            self.assertIn('timed out', result.describe())
+        self.assertLess(time.time() - start, 10)
+        self.assertGroupKilled()
+
+    def test_timed_out_command_has_no_parsed_result(self):
+        with runner.run(['sh', '-c', 'echo partial; sleep 30'], timeout=0.5, parser=lambda stream: stream.readline()) \
+                as result:
+            self.assertTrue(result.timed_out)
+            self.assertIsNone(result.parsed)
+
+    def test_parser_result_and_error(self):
+        with runner.run(['sh', '-c', 'echo 1; echo 2'], timeout=10,
+                        parser=lambda stream: sum(int(line) for line in stream)) as result:
+            self.assertTrue(result.ok)
+            self.assertEqual(result.parsed, 3)
+            self.assertIsNone(result.output)
+
+        def broken(stream):
+            stream.readline()
+            raise KeyError('parser bug')
+
+        with runner.run(['sh', '-c', 'echo 1; head -c 200000 /dev/zero'], timeout=10, parser=broken) as result:
+            # The rest of output is drained, the command is not blocked.
+            self.assertEqual(result.code, 0)
+            self.assertFalse(result.ok)
+            self.assertIsInstance(result.parse_error, KeyError)
+            self.assertIn('parser bug', result.describe())
+
+    def test_interrupted_parser_kills_command(self):
+        def interrupted(stream):
+            stream.readline()
+            raise Interrupted()
+
+        start = time.time()
+        command = 'echo $$ > {0}; echo 1; sleep 30 & sleep 30'.format(self.pid_file)
+        with self.assertRaises(Interrupted):
+            runner.run(['sh', '-c', command], timeout=0, parser=interrupted)
+        self.assertLess(time.time() - start, 10)
+        self.assertGroupKilled()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from jecket import scheduler
+
+
+class MakespanTest(unittest.TestCase):
+
+    def test_list_scheduling(self):
+        self.assertEqual(scheduler.makespan([5, 3, 3, 2, 1], 2), 7)
+        # The longest job started last runs alone.
+        self.assertEqual(scheduler.makespan([1, 1, 1, 1, 5], 2), 7)
+        self.assertEqual(scheduler.makespan([5, 1, 1, 1, 1], 2), 5)
+        self.assertEqual(scheduler.makespan([4, 1], 8), 4)
+        self.assertEqual(scheduler.makespan([4, 1], 1), 5)
+        self.assertEqual(scheduler.makespan([], 4), 0)
+
+
+class RunScheduledTest(unittest.TestCase):
+
+    def test_starts_longest_first_and_keeps_order_of_results(self):
+        started = []
+        costs = {'a': 1.0, 'b': 5.0, 'c': 3.0, 'd': 5.0}
+
+        def func(item):
+            started.append(item)
+            return item.upper()
+
+        results = scheduler.run_scheduled(func, ['a', 'b', 'c', 'd'], 1, costs.get)
+        self.assertEqual(started, ['b', 'd', 'c', 'a'])
+        self.assertEqual(results, ['A', 'B', 'C', 'D'])
+
+    def test_records_every_item_with_workers(self):
+        recorded = []
+        lock = threading.Lock()
+
+        def record(item, seconds, result):
+            with lock:
+                recorded.append((item, result))
+            self.assertGreaterEqual(seconds, 0)
+
+        items = range(20)
+        results = scheduler.run_scheduled(lambda item: item * 2, items, 4, lambda item: item % 7, record)
+        self.assertEqual(results, [item * 2 for item in items])
+        self.assertEqual(sorted(recorded), [(item, item * 2) for item in items])
+
+
+class DurationHistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='jecket_test_')
+        self.path = os.path.join(self.directory, 'history', 'durations.json')
+        self.sizes = {'a.java': 100, 'b.java': 300, 'c.java': 50}
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def history(self, **kwargs):
+        return scheduler.DurationHistory(self.path, self.sizes.get, **kwargs)
+
+    def test_estimates_files_without_history_by_size(self):
+        history = self.history()
+        self.assertEqual(history.expected('pmd', 'b.java'), 300 * scheduler.DEFAULT_SECONDS_PER_LINE)
+        history.record('pmd', 'a.java', 2.0)
+        self.assertEqual(history.expected('pmd', 'a.java'), 2.0)
+        # 2 s per 100 lines.
+        self.assertAlmostEqual(history.expected('pmd', 'b.java'), 6.0)
+        self.assertEqual(history.expected('tailor', 'b.java'), 300 * scheduler.DEFAULT_SECONDS_PER_LINE)
+
+    def test_smooths_measurements(self):
+        history = self.history()
+        history.record('pmd', 'a.java', 2.0)
+        history.record('pmd', 'a.java', 4.0)
+        self.assertAlmostEqual(history.expected('pmd', 'a.java'), 2.0 + (4.0 - 2.0) * scheduler.SMOOTHING)
+
+    def test_save_keeps_entries_of_other_runs(self):
+        first, second = self.history(), self.history()
+        first.record('pmd', 'a.java', 1.0)
+        second.record('pmd', 'b.java', 2.0)
+        first.save()
+        second.save()
+        loaded = self.history()
+        self.assertEqual(loaded.expected('pmd', 'a.java'), 1.0)
+        self.assertEqual(loaded.expected('pmd', 'b.java'), 2.0)
+
+    def test_save_drops_least_recently_updated_entries(self):
+        history = self.history(max_entries=2)
+        for path in ('a.java', 'b.java', 'c.java'):
+            history.record('pmd', path, 1.0)
+            history.entries[history.key('pmd', path)][2] = len(history.updated)
+        history.save()
+        with open(self.path) as f:
+            self.assertEqual(sorted(json.load(f)), [history.key('pmd', 'b.java'), history.key('pmd', 'c.java')])
+
+    def test_invalid_file_is_empty_history(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'w') as f:
+            f.write('{not json')
+        self.assertEqual(self.history().entries, {})
+
+
+class HistoryFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.saved = os.environ.pop('JECKET_HISTORY_FILE', None)
+
+    def tearDown(self):
+        os.environ.pop('JECKET_HISTORY_FILE', None)
+        if self.saved is not None:
+            os.environ['JECKET_HISTORY_FILE'] = self.saved
+
+    def test_history_is_opt_in(self):
+        self.assertIsNone(scheduler.history_file())
+        os.environ['JECKET_HISTORY_FILE'] = ''
+        self.assertIsNone(scheduler.history_file())
+        os.environ['JECKET_HISTORY_FILE'] = '~/durations.json'
+        self.assertEqual(scheduler.history_file(), os.path.expanduser('~/durations.json'))
+
+
+if __name__ == '__main__':
+    unittest.main()
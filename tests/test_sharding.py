@@ -0,0 +1,52 @@
+import random
+import unittest
+
+from jecket import sharding
+
+
+class ParseShardTest(unittest.TestCase):
+
+    def test_valid_shards(self):
+        self.assertEqual(sharding.parse_shard('1/1'), (0, 1))
+        self.assertEqual(sharding.parse_shard('3/4'), (2, 4))
+
+    def test_invalid_shards(self):
+        for value in ('0/3', '4/3', '1/0', '1', 'a/b', '1/2/3'):
+            self.assertRaises(ValueError, sharding.parse_shard, value)
+
+
+class PartitionTest(unittest.TestCase):
+
+    def test_balances_weights(self):
+        weights = {'a': 10, 'b': 7, 'c': 5, 'd': 4, 'e': 3, 'f': 1}
+        shards = sharding.partition(list(weights), 2, weights.get)
+        self.assertEqual(shards, [['a', 'd', 'f'], ['b', 'c', 'e']])
+        self.assertEqual([sum(weights[path] for path in shard) for shard in shards], [15, 15])
+
+    def test_covers_all_files_once(self):
+        files = ['src/{0}.java'.format(index) for index in range(100)]
+        weights = dict((path, index % 13) for index, path in enumerate(files))
+        shards = sharding.partition(files, 7, weights.get)
+        self.assertEqual(sorted(path for shard in shards for path in shard), sorted(files))
+        for shard in shards:
+            self.assertEqual(shard, sorted(shard))
+
+    def test_does_not_depend_on_input_order(self):
+        files = ['f{0}'.format(index) for index in range(50)]
+        weight = lambda path: len(path) % 3
+        expected = sharding.partition(files, 4, weight)
+        shuffled = list(files)
+        random.Random(1).shuffle(shuffled)
+        self.assertEqual(sharding.partition(shuffled, 4, weight), expected)
+
+    def test_more_shards_than_files(self):
+        self.assertEqual(sharding.partition(['a', 'b'], 4, lambda path: 1), [['a'], ['b'], [], []])
+
+    def test_shard_files(self):
+        files = ['c', 'a', 'b']
+        self.assertEqual(sharding.shard_files(files, None), ['a', 'b', 'c'])
+        self.assertEqual(sharding.shard_files(files, (1, 2), lambda path: 1), ['b'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,367 @@
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import textwrap
+import time
+import unittest
+
+from jecket import scheduler, static_check
+from jecket.result_cache import ResultCache
+
+
+FAKE_GOLINT = '''#!{python}
+import os
+import sys
+
+files = sys.argv[3:]
+with open(os.environ['FAKE_GOLINT_LOG'], 'a') as log:
+    log.write(' '.join(files) + '\\n')
+for name in files:
+    if 'broken' in name:
+        sys.stderr.write('can not lint: internal error\\n')
+    else:
+        sys.stdout.write('{{0}}:1:1: fake violation\\n'.format(name))
+'''
+
+# 'pmd/bin/run.sh pmd ... -r REPORT ...' and 'java -jar checkstyle.jar ... -o REPORT ...', reports without
+# violations. FAKE_LINT_FAIL makes both tools crash before writing report.
+FAKE_JAVA_TOOL = '''#!{python}
+import os
+import sys
+
+if os.environ.get('FAKE_LINT_FAIL'):
+    sys.exit('crashed')
+option = '-r' if '-r' in sys.argv else '-o'
+with open(sys.argv[sys.argv.index(option) + 1], 'w') as report:
+    report.write('<{{0}} version="fake"></{{0}}>\\n'.format('pmd' if option == '-r' else 'checkstyle'))
+'''
+
+
+class TemporaryDirectoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='jecket_test_')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write(textwrap.dedent(text))
+        return path
+
+
+class GoPackageTest(TemporaryDirectoryTest):
+
+    def test_skips_comments(self):
+        path = self.write('x.go', '''\
+            // Copyright notice.
+
+            /*
+            Package doc.
+            */
+            package main
+
+            import "fmt"
+            ''')
+        self.assertEqual(static_check.go_package(path), 'main')
+
+    def test_external_test_package(self):
+        self.assertEqual(static_check.go_package(self.write('x_test.go', 'package x_test\n')), 'x_test')
+
+    def test_missing_clause_and_file(self):
+        self.assertIsNone(static_check.go_package(self.write('x.go', 'import "fmt"\n')))
+        self.assertIsNone(static_check.go_package(os.path.join(self.directory, 'missing.go')))
+
+
+class GoLintResultsTest(TemporaryDirectoryTest):
+
+    def setUp(self):
+        super(GoLintResultsTest, self).setUp()
+        bin_dir = os.path.join(self.directory, 'bin')
+        golint = self.write('bin/golint', FAKE_GOLINT.format(python=sys.executable))
+        os.chmod(golint, os.stat(golint).st_mode | stat.S_IXUSR)
+        self.log = os.path.join(self.directory, 'golint.log')
+        self.environ = dict(os.environ)
+        os.environ['PATH'] = '{0}{1}{2}'.format(bin_dir, os.pathsep, os.environ.get('PATH', ''))
+        os.environ['FAKE_GOLINT_LOG'] = self.log
+        self.saved_changed_lines, static_check.changed_lines = static_check.changed_lines, None
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self.environ)
+        static_check.changed_lines = self.saved_changed_lines
+        super(GoLintResultsTest, self).tearDown()
+
+    def runs(self):
+        with open(self.log) as f:
+            return sorted(line.split() for line in f)
+
+    def test_runs_golint_once_per_package(self):
+        files = [self.write('a/x.go', 'package a\n'), self.write('a/x_test.go', 'package a_test\n'),
+                 self.write('a/y.go', 'package a\n'), self.write('b/z.go', 'package b\n')]
+        results = static_check.go_lint_results(files)
+        self.assertEqual(self.runs(), sorted([[files[0], files[2]], [files[1]], [files[3]]]))
+        self.assertEqual(dict((path, result.total) for path, result in results.items()),
+                         dict((path, 1) for path in files))
+
+    def test_unattributed_errors_fail_whole_package(self):
+        files = [self.write('a/broken.go', 'package a\n'), self.write('a/y.go', 'package a\n'),
+                 self.write('b/z.go', 'package b\n')]
+        results = static_check.go_lint_results(files)
+        for path in files[:2]:
+            self.assertEqual(type(results[path]), tuple)
+            self.assertEqual(results[path][0], -1)
+            self.assertIn('internal error', results[path][1])
+        self.assertEqual(results[files[2]].total, 1)
+
+
+
+class JavaLintResultsTest(TemporaryDirectoryTest):
+
+    def setUp(self):
+        super(JavaLintResultsTest, self).setUp()
+        for name in ('pmd/bin/run.sh', 'bin/java'):
+            path = self.write(name, FAKE_JAVA_TOOL.format(python=sys.executable))
+            os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR)
+        self.temporary = os.path.join(self.directory, 'tmp')
+        os.mkdir(self.temporary)
+        self.cwd = os.getcwd()
+        self.environ = dict(os.environ)
+        self.tempdir = tempfile.tempdir
+        os.chdir(self.directory)
+        os.environ['PATH'] = '{0}{1}{2}'.format(os.path.join(self.directory, 'bin'), os.pathsep,
+                                                os.environ.get('PATH', ''))
+        tempfile.tempdir = self.temporary
+        self.saved_changed_lines, static_check.changed_lines = static_check.changed_lines, None
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        os.environ.clear()
+        os.environ.update(self.environ)
+        tempfile.tempdir = self.tempdir
+        static_check.changed_lines = self.saved_changed_lines
+        super(JavaLintResultsTest, self).tearDown()
+
+    def assertNoBatchFiles(self):
+        self.assertEqual(os.listdir(self.temporary), [])
+        self.assertEqual([name for name in os.listdir(self.directory) if name.startswith('jecket_batch_')], [])
+
+    def test_batch_reports_are_removed(self):
+        files = ['A.java', 'B.java']
+        pmd, checkstyle = static_check.java_lint_results(files)
+        self.assertEqual([pmd[path].total for path in files], [0, 0])
+        self.assertEqual([checkstyle[path].total for path in files], [0, 0])
+        self.assertNoBatchFiles()
+
+    def test_batch_reports_are_removed_after_failure(self):
+        os.environ['FAKE_LINT_FAIL'] = '1'
+        pmd, checkstyle = static_check.java_lint_results(['A.java', 'B.java'])
+        self.assertEqual(type(pmd['A.java']), tuple)
+        self.assertEqual(type(checkstyle['B.java']), tuple)
+        self.assertNoBatchFiles()
+
+
+
+class DurationHistoryRecordTest(TemporaryDirectoryTest):
+
+    def setUp(self):
+        super(DurationHistoryRecordTest, self).setUp()
+        self.cwd = os.getcwd()
+        os.chdir(self.directory)
+        for name in ('a.lint', 'b.lint', 'c.txt'):
+            self.write(name, 'x\n')
+        self.saved = (dict(static_check.handlers), static_check.duration_history, static_check.result_cache,
+                      static_check.send_file_results)
+        self.sent = []
+        static_check.register_handler('.lint', None, self.lint)
+        static_check.duration_history = scheduler.DurationHistory()
+        static_check.result_cache = None
+        static_check.send_file_results = self.send
+
+    def tearDown(self):
+        static_check.handlers.clear()
+        (handlers, static_check.duration_history, static_check.result_cache,
+         static_check.send_file_results) = self.saved
+        static_check.handlers.update(handlers)
+        os.chdir(self.cwd)
+        super(DurationHistoryRecordTest, self).tearDown()
+
+    @staticmethod
+    def lint(changed_files):
+        time.sleep(0.05)
+        return dict((changed_file, {'Violations: ': 0}) for changed_file in changed_files)
+
+    def send(self, target_file, results):
+        time.sleep(0.5)
+        self.sent.append(target_file)
+        return 204, ''
+
+    def test_records_linter_run_without_sending(self):
+        results = static_check.check_files(['a.lint', 'b.lint', 'c.txt'], '.lint', jobs=2)
+        self.assertEqual(results['a.lint'], (204, ''))
+        self.assertEqual(sorted(self.sent), ['a.lint', 'b.lint'])
+        history = static_check.duration_history
+        for path in ('a.lint', 'b.lint'):
+            self.assertLess(history.expected('lint', path), 0.4)
+            self.assertGreaterEqual(history.expected('lint', path), 0.05)
+        self.assertNotIn(history.key('lint', 'c.txt'), history.entries)
+
+    def test_batches_of_several_files_are_not_recorded(self):
+        static_check.lint_files(['a.lint', 'b.lint'], '.lint')
+        self.assertEqual(static_check.duration_history.entries, {})
+
+
+class LintFilesCacheTest(TemporaryDirectoryTest):
+
+    def setUp(self):
+        super(LintFilesCacheTest, self).setUp()
+        self.cwd = os.getcwd()
+        os.chdir(self.directory)
+        for name in ('a.lint', 'b.lint'):
+            self.write(name, '{0}\n'.format(name))
+        self.saved = (dict(static_check.handlers), dict(static_check._cache_signatures), static_check.result_cache,
+                      static_check.duration_history, static_check.changed_lines)
+        self.linted = []
+        static_check.register_handler('.lint', None, self.lint, signature=lambda: ('lint', '1.0', 'rules'))
+        static_check._cache_signatures.pop('.lint', None)
+        static_check.result_cache = ResultCache(os.path.join(self.directory, 'cache'))
+        static_check.duration_history = None
+        static_check.changed_lines = None
+
+    def tearDown(self):
+        static_check.handlers.clear()
+        static_check._cache_signatures.clear()
+        (handlers, signatures, static_check.result_cache, static_check.duration_history,
+         static_check.changed_lines) = self.saved
+        static_check.handlers.update(handlers)
+        static_check._cache_signatures.update(signatures)
+        os.chdir(self.cwd)
+        super(LintFilesCacheTest, self).tearDown()
+
+    def lint(self, changed_files):
+        self.linted.append(sorted(changed_files))
+        results = {}
+        for changed_file in changed_files:
+            with open(changed_file) as f:
+                results[changed_file] = (-1, 'crashed') if 'broken' in f.read() else {'Violations: ': 1}
+        return results
+
+    def test_cache_hit_skips_linter(self):
+        expected = {'a.lint': {'Violations: ': 1}, 'b.lint': {'Violations: ': 1}}
+        self.assertEqual(static_check.lint_files(['a.lint', 'b.lint'], '.lint'), expected)
+        self.assertEqual(static_check.lint_files(['a.lint', 'b.lint'], '.lint'), expected)
+        self.assertEqual(self.linted, [['a.lint', 'b.lint']])
+        self.assertEqual(static_check.result_cache.stats()['hits'], 2)
+
+    def test_changed_and_failed_files_are_linted_again(self):
+        static_check.lint_files(['a.lint', 'b.lint'], '.lint')
+        self.write('b.lint', 'broken\n')
+        self.assertEqual(static_check.lint_files(['a.lint', 'b.lint'], '.lint')['b.lint'], (-1, 'crashed'))
+        static_check.lint_files(['a.lint', 'b.lint'], '.lint')
+        self.assertEqual(self.linted, [['a.lint', 'b.lint'], ['b.lint'], ['b.lint']])
+
+
+class MainSummaryTest(TemporaryDirectoryTest):
+
+    def setUp(self):
+        super(MainSummaryTest, self).setUp()
+        self.cwd = os.getcwd()
+        os.chdir(self.directory)
+        self.write('a.lint', 'ok\n')
+        self.write('b.lint', 'broken\n')
+        self.environ = dict(os.environ)
+        for variable in ('JECKET_CACHE_DIR', 'JECKET_HISTORY_FILE'):
+            os.environ.pop(variable, None)
+        self.saved = (dict(static_check.handlers), static_check.result_cache, static_check.duration_history,
+                      static_check.changed_lines, static_check.send_file_results)
+        static_check.register_handler('.lint', None, self.lint)
+        static_check.result_cache = static_check.duration_history = static_check.changed_lines = None
+        static_check.send_file_results = lambda target_file, results: (204, '')
+
+    def tearDown(self):
+        static_check.handlers.clear()
+        (handlers, static_check.result_cache, static_check.duration_history, static_check.changed_lines,
+         static_check.send_file_results) = self.saved
+        static_check.handlers.update(handlers)
+        os.environ.clear()
+        os.environ.update(self.environ)
+        os.chdir(self.cwd)
+        super(MainSummaryTest, self).tearDown()
+
+    @staticmethod
+    def lint(changed_files):
+        return dict((changed_file, (-1, 'crashed') if changed_file.startswith('b') else {'Violations: ': 0})
+                    for changed_file in changed_files)
+
+    def test_single_file_summary(self):
+        summary = static_check.main('file', '.lint', 'a.lint')
+        self.assertEqual((summary['published'], summary['failed']), (1, 0))
+        summary = static_check.main('file', 'auto', 'b.lint')
+        self.assertEqual((summary['checked'], summary['failed']), (1, 1))
+
+    def test_results_file_summary(self):
+        summary = static_check.main('file', '.lint', 'b.lint', output=os.path.join(self.directory, 'results.jsonl'))
+        self.assertEqual((summary['files'], summary['failed']), (1, 1))
+
+
+class HandlerRegistryTest(TemporaryDirectoryTest):
+
+    def setUp(self):
+        super(HandlerRegistryTest, self).setUp()
+        self.cwd = os.getcwd()
+        os.chdir(self.directory)
+        for name in ('a.one', 'b.batch', 'c.java', 'd.txt'):
+            self.write(name, 'x\n')
+        self.saved = (dict(static_check.handlers), static_check.result_cache, static_check.duration_history,
+                      static_check.changed_lines, static_check.send_file_results)
+        self.calls = []
+        static_check.register_handler('.one', lambda changed_file: self.call('one', changed_file))
+        static_check.register_handler('.batch', None, lambda changed_files: dict(
+            (changed_file, self.call('batch', changed_file)) for changed_file in changed_files))
+        static_check.result_cache = static_check.duration_history = static_check.changed_lines = None
+        static_check.send_file_results = lambda target_file, results: (204, results)
+
+    def tearDown(self):
+        static_check.handlers.clear()
+        (handlers, static_check.result_cache, static_check.duration_history, static_check.changed_lines,
+         static_check.send_file_results) = self.saved
+        static_check.handlers.update(handlers)
+        os.chdir(self.cwd)
+        super(HandlerRegistryTest, self).tearDown()
+
+    def call(self, handler, changed_file):
+        self.calls.append((handler, changed_file))
+        return (201, 'sent') if handler == 'one' else {'Violations: ': 0}
+
+    def test_builtin_handlers_are_batch_handlers(self):
+        for ext in ('.java', '.swift', '.go'):
+            self.assertTrue(static_check.supports_cache(ext))
+            self.assertIsNone(static_check.handlers[ext].file_handler)
+
+    def test_dispatch_by_extension(self):
+        self.assertEqual(static_check.file_handler('a.one', '.one'), (201, 'sent'))
+        self.assertEqual(static_check.file_handler('b.batch', '.batch'), (204, {'Violations: ': 0}))
+        self.assertEqual(static_check.file_handler('d.txt', '.txt'), (0, 'Not checked. Unsupported extension.'))
+        self.assertEqual(static_check.file_handler('d.txt', '.one'), (0, 'Not checked.'))
+        self.assertEqual(static_check.file_handler('missing.one', '.one'), (0, 'Not checked.'))
+        self.assertEqual(self.calls, [('one', 'a.one'), ('batch', 'b.batch')])
+
+    def test_resolve_extensions(self):
+        resolve = static_check.resolve_extensions
+        files = ['a.one', 'x/b.batch', 'c.java', 'd.txt', 'Makefile']
+        self.assertEqual(resolve(None, files), ['.batch', '.java', '.one'])
+        self.assertEqual(resolve('auto', files), ['.batch', '.java', '.one'])
+        self.assertEqual(resolve(['auto'], []), [])
+        # Explicit extensions are kept, even if no handler is registered.
+        self.assertEqual(resolve('go, .java,,txt', files), ['.go', '.java', '.txt'])
+        self.assertEqual(resolve(['.swift', 'swift']), ['.swift'])
+
+
+if __name__ == '__main__':
+    unittest.main()